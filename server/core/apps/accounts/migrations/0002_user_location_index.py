@@ -0,0 +1,19 @@
+# Generated by Django 6.0.1 on 2026-10-19 09:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("accounts", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="user",
+            index=models.Index(
+                fields=["latitude", "longitude"], name="accounts_us_latitud_c64afb_idx"
+            ),
+        ),
+    ]
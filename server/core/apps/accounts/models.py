@@ -282,6 +282,7 @@ class User(AbstractUser):
         indexes = [
             models.Index(fields=["user_type"]),
             models.Index(fields=["wilaya", "city"]),
+            models.Index(fields=["latitude", "longitude"]),
             models.Index(fields=["is_verified"]),
             models.Index(fields=["rating"]),
             models.Index(fields=["created_at"]),
@@ -323,7 +324,7 @@ class User(AbstractUser):
             if reviews.exists():
                 avg_rating = reviews.aggregate(models.Avg("rating"))["rating__avg"]
                 self.rating = round(avg_rating, 2) if avg_rating else 0.00
-                self.save(update_fields=["rating"])
+                self.save(update_fields=["rating", "updated_at"])
 
     def get_crop_types_display(self):
         """Retourne les types de cultures formatés"""
@@ -7,6 +7,7 @@ from django.utils.encoding import force_str
 from django.utils.http import urlsafe_base64_decode
 from django.contrib.auth.tokens import PasswordResetTokenGenerator
 
+from betteragri.conditional import ConditionalGetMixin
 from .models import User, UserProfile
 from .serializers import (
     UserRegistrationSerializer,
@@ -79,9 +80,29 @@ class LogoutView(APIView):
             return Response(status=status.HTTP_400_BAD_REQUEST)
 
 
-class UserProfileView(generics.RetrieveUpdateAPIView):
+class UserProfileView(ConditionalGetMixin, generics.RetrieveUpdateAPIView):
     serializer_class = UserSerializer
     permission_classes = [permissions.IsAuthenticated]
+    conditional_private = True
+
+    def get_etag_parts(self):
+        # Utilisateur déjà chargé par l'authentification; profil étendu lu
+        # une seule fois pour l'ETag et Last-Modified
+        self.profile_updated_at = (
+            UserProfile.objects.filter(user=self.request.user)
+            .values_list("updated_at", flat=True)
+            .first()
+        )
+        return [
+            self.request.user.pk,
+            self.request.user.updated_at,
+            self.profile_updated_at,
+        ]
+
+    def get_last_modified(self):
+        return max(
+            filter(None, [self.request.user.updated_at, self.profile_updated_at])
+        )
 
     def get_object(self):
         return self.request.user
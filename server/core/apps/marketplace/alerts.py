@@ -0,0 +1,104 @@
+"""
+Alertes de liste de souhaits: baisse de prix et retour en stock.
+
+Les changements de prix et de stock sont ajoutés à ProductChange. Le
+traitement périodique joint les seuls produits modifiés à Wishlist en une
+requête, compare avec l'état déjà connu de l'utilisateur (notified_price,
+notified_in_stock), envoie une notification groupée par utilisateur puis
+consomme le journal.
+"""
+
+import logging
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Exists, F, OuterRef, Q, Subquery
+from django.utils import timezone
+
+from apps.accounts.models import User
+from apps.notifications.utils import send_wishlist_alert_notification
+from .models import Product, ProductChange, Wishlist
+
+logger = logging.getLogger(__name__)
+
+ALERT_INTERVAL = 5 * 60  # secondes entre deux traitements (celery beat)
+# Changements trop récents: traités au passage suivant (transactions en cours)
+ALERT_LAG = timedelta(minutes=1)
+
+
+def record_changes(product_ids, kind):
+    ProductChange.objects.bulk_create(
+        ProductChange(product_id=product_id, kind=kind) for product_id in product_ids
+    )
+
+
+def process_wishlist_alerts(now=None):
+    """
+    Traiter les changements journalisés; retourne (utilisateurs notifiés,
+    produits modifiés).
+    """
+    until = (now or timezone.now()) - ALERT_LAG
+    changes = ProductChange.objects.filter(changed_at__lte=until)
+    changed = changes.values("product_id")
+
+    with transaction.atomic():
+        # Jointure des produits modifiés avec les listes de souhaits
+        alerts = list(
+            Wishlist.objects.filter(
+                product_id__in=changed,
+                product__status=Product.ProductStatus.ACTIVE,
+                product__available_quantity__gt=0,
+            )
+            .filter(
+                Q(notified_in_stock=False)
+                | Q(product__price_per_unit__lt=F("notified_price"))
+            )
+            .order_by("user_id", "product_id")
+            .values(
+                "user_id",
+                "product_id",
+                "product__name",
+                "product__price_per_unit",
+                "product__unit",
+                "notified_price",
+                "notified_in_stock",
+            )
+        )
+        product_count = changes.values("product_id").distinct().count()
+
+        # L'état courant devient l'état connu, hausses et ruptures comprises
+        product = Product.objects.filter(pk=OuterRef("product_id"))
+        Wishlist.objects.filter(product_id__in=changed).update(
+            notified_price=Subquery(product.values("price_per_unit")[:1]),
+            notified_in_stock=Exists(
+                product.filter(
+                    status=Product.ProductStatus.ACTIVE, available_quantity__gt=0
+                )
+            ),
+        )
+        changes.delete()
+
+    by_user = defaultdict(lambda: {"price_drops": [], "back_in_stock": []})
+    for alert in alerts:
+        item = {
+            "product_id": alert["product_id"],
+            "name": alert["product__name"],
+            "price": str(alert["product__price_per_unit"]),
+            "unit": alert["product__unit"],
+        }
+        if not alert["notified_in_stock"]:
+            by_user[alert["user_id"]]["back_in_stock"].append(item)
+        else:
+            item["previous_price"] = str(alert["notified_price"])
+            by_user[alert["user_id"]]["price_drops"].append(item)
+
+    users = User.objects.in_bulk(by_user)
+    for user_id, items in by_user.items():
+        try:
+            send_wishlist_alert_notification(users[user_id], **items)
+        except Exception as error:
+            # Une notification en échec ne bloque pas les autres utilisateurs
+            logger.warning("Alerte de liste de souhaits (%s): %s", user_id, error)
+
+    return len(by_user), product_count
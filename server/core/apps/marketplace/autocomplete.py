@@ -0,0 +1,191 @@
+"""
+Suggestions de saisie (autocomplétion) servies depuis un index en mémoire.
+
+L'index regroupe les noms de produits, les catégories, les villes et les
+noms de fermes des produits en vente. Chaque suggestion est indexée par son
+libellé normalisé (sans accents: "zouerat" trouve "Zouérat") et par chacun
+de ses mots suivants ("de zouerat", "zouerat"), dans une liste triée: les
+termes commençant par un préfixe forment une plage trouvée par bisection.
+
+La popularité d'une suggestion est la somme des vues de ses produits, plus
+leur nombre. Les meilleures suggestions des préfixes courts (peu de
+caractères, plages très longues) sont précalculées.
+
+L'index est reconstruit dans chaque processus quand les tags "products" ou
+"categories" du cache du catalogue changent (au plus une fois toutes les
+AUTOCOMPLETE_MIN_AGE secondes), et au plus tard après AUTOCOMPLETE_MAX_AGE.
+"""
+
+import heapq
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+
+from django.db.models import Count, Sum
+
+from apps.accounts.models import User
+from .cache import get_tag_versions
+from .geocoding import normalize_text
+from .models import Category, Product
+
+AUTOCOMPLETE_LIMIT = 8
+AUTOCOMPLETE_MAX_LIMIT = 20
+AUTOCOMPLETE_PRECOMPUTED = 2  # préfixes d'au plus 2 caractères précalculés
+AUTOCOMPLETE_CHECK_INTERVAL = 2  # secondes entre deux lectures des tags
+AUTOCOMPLETE_MIN_AGE = 30  # secondes avant une reconstruction après un tag
+AUTOCOMPLETE_MAX_AGE = 600  # reconstruction périodique (vues, fermes)
+AUTOCOMPLETE_TAGS = ("products", "categories")
+SUGGESTION_KINDS = ("product", "category", "city", "farm")
+
+
+class Suggestion(dict):
+    """Suggestion renvoyée par l'API; la popularité sert au tri"""
+
+    def __init__(self, label, kind, popularity, **extra):
+        super().__init__(label=label, type=kind, **extra)
+        self.popularity = popularity
+
+
+def suggestion_rows():
+    """Suggestions (libellé, type, popularité, champs supplémentaires)"""
+    products = Product.objects.filter(status="active", available_quantity__gt=0)
+    popularity = Sum("views_count") + Count("id")
+    city_labels = dict(User.CITIES)
+
+    # Variantes d'écriture d'un même nom regroupées sous la plus populaire
+    names = defaultdict(list)
+    for name, score in (
+        products.values_list("name")
+        .annotate(score=popularity)
+        .values_list("name", "score")
+    ):
+        names[normalize_text(name)].append((score, name))
+    for variants in names.values():
+        yield max(variants)[1], "product", sum(score for score, _ in variants), {}
+
+    categories = dict(
+        products.exclude(category=None)
+        .values_list("category_id")
+        .annotate(score=popularity)
+        .values_list("category_id", "score")
+    )
+    for category_id, name in Category.objects.filter(
+        id__in=categories.keys()
+    ).values_list("id", "name"):
+        yield name, "category", categories[category_id], {"id": category_id}
+
+    for city, score in (
+        products.exclude(farmer__city="")
+        .values_list("farmer__city")
+        .annotate(score=popularity)
+        .values_list("farmer__city", "score")
+    ):
+        yield city_labels.get(city, city), "city", score, {"value": city}
+
+    for farmer_id, farm_name, score in (
+        products.exclude(farmer__farm_name="")
+        .values_list("farmer_id", "farmer__farm_name")
+        .annotate(score=popularity)
+        .values_list("farmer_id", "farmer__farm_name", "score")
+    ):
+        yield farm_name, "farm", score, {"farmer": farmer_id}
+
+
+def index_terms(label):
+    """Libellé normalisé et chacun de ses suffixes commençant par un mot"""
+    words = normalize_text(label).split()
+    return {" ".join(words[start:]) for start in range(len(words))}
+
+
+class AutocompleteIndex:
+    def __init__(self, rows, versions=None):
+        self.versions = versions
+        self.built_at = self.checked_at = time.monotonic()
+        self.suggestions = [
+            Suggestion(label, kind, popularity, **extra)
+            for label, kind, popularity, extra in rows
+        ]
+
+        pairs = sorted(
+            (term, position)
+            for position, suggestion in enumerate(self.suggestions)
+            for term in index_terms(suggestion["label"])
+        )
+        self.terms = [term for term, _ in pairs]
+        self.positions = [position for _, position in pairs]
+
+        # Préfixes courts: meilleures suggestions, tous types et par type
+        short = defaultdict(set)
+        for term, position in pairs:
+            for length in range(1, min(len(term), AUTOCOMPLETE_PRECOMPUTED) + 1):
+                short[term[:length]].add(position)
+        self.top = {}
+        for prefix, positions in short.items():
+            for kind in (None,) + SUGGESTION_KINDS:
+                self.top[prefix, kind] = self.rank(
+                    positions, AUTOCOMPLETE_MAX_LIMIT, kind
+                )
+
+    def rank(self, positions, limit, kind=None):
+        candidates = (self.suggestions[position] for position in positions)
+        if kind:
+            candidates = (item for item in candidates if item["type"] == kind)
+        return heapq.nlargest(
+            limit, candidates, key=lambda item: (item.popularity, -len(item["label"]))
+        )
+
+    def search(self, text, limit=AUTOCOMPLETE_LIMIT, kind=None):
+        prefix = normalize_text(text)
+        if not prefix:
+            return []
+        if len(prefix) <= AUTOCOMPLETE_PRECOMPUTED:
+            return self.top.get((prefix, kind), [])[:limit]
+
+        start = bisect_left(self.terms, prefix)
+        end = bisect_left(self.terms, prefix + "\uffff", start)
+        return self.rank(set(self.positions[start:end]), limit, kind)
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def build_index():
+    # Versions lues avant les données: une modification pendant la
+    # construction déclenchera la suivante
+    versions = get_tag_versions(AUTOCOMPLETE_TAGS)
+    return AutocompleteIndex(list(suggestion_rows()), versions=versions)
+
+
+def get_index():
+    """Index du processus, reconstruit s'il est périmé"""
+    global _index
+    index = _index
+    now = time.monotonic()
+    if index is None:
+        with _index_lock:
+            if _index is None:
+                _index = build_index()
+            return _index
+
+    if now - index.checked_at < AUTOCOMPLETE_CHECK_INTERVAL:
+        return index
+    index.checked_at = now
+
+    age = now - index.built_at
+    stale = age >= AUTOCOMPLETE_MAX_AGE or (
+        age >= AUTOCOMPLETE_MIN_AGE
+        and get_tag_versions(AUTOCOMPLETE_TAGS) != index.versions
+    )
+    # Une seule reconstruction; les autres requêtes servent l'ancien index
+    if stale and _index_lock.acquire(blocking=False):
+        try:
+            _index = build_index()
+        finally:
+            _index_lock.release()
+    return _index
+
+
+def autocomplete(text, limit=AUTOCOMPLETE_LIMIT, kind=None):
+    return get_index().search(text, min(limit, AUTOCOMPLETE_MAX_LIMIT), kind)
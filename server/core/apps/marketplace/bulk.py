@@ -0,0 +1,243 @@
+"""
+Import et export en masse des produits (CSV / JSON Lines).
+
+L'import valide les lignes par lots, écrit chaque lot avec bulk_create /
+bulk_update et n'envoie qu'une notification pour tout le fichier.
+L'export est produit ligne par ligne depuis un curseur côté serveur.
+"""
+
+import csv
+import io
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from itertools import islice
+
+from django.db import transaction
+from django.utils import timezone
+
+from apps.notifications.utils import send_product_import_notification
+from .cache import invalidate_tags
+from .alerts import record_changes
+from .coverage import update_coverage
+from .models import Category, Product, ProductChange
+from .prices import price_key, record_prices
+from .serializers import ProductImportSerializer
+
+FILE_FORMATS = ("csv", "jsonl")
+IMPORT_CHUNK_SIZE = 200
+MAX_IMPORT_ROWS = 10000
+MAX_REPORTED_ERRORS = 100
+
+EXPORT_FIELDS = [
+    "id",
+    "category_id",
+    "name",
+    "description",
+    "price_per_unit",
+    "unit",
+    "available_quantity",
+    "harvest_date",
+    "expiry_date",
+    "organic",
+    "quality_grade",
+    "farm_location",
+    "delivery_radius",
+    "status",
+    "created_at",
+    "updated_at",
+]
+# En-têtes compatibles avec l'import (category_id -> category)
+EXPORT_HEADERS = ["category" if f == "category_id" else f for f in EXPORT_FIELDS]
+
+
+def guess_file_format(filename):
+    extension = filename.rsplit(".", 1)[-1].lower() if "." in filename else ""
+    return {"csv": "csv", "jsonl": "jsonl", "ndjson": "jsonl"}.get(extension)
+
+
+def read_rows(uploaded_file, file_format):
+    """Générer (numéro de ligne, données, erreur) sans charger tout le fichier"""
+    text = io.TextIOWrapper(uploaded_file, encoding="utf-8-sig")
+
+    if file_format == "csv":
+        reader = csv.DictReader(text)
+        for row in reader:
+            # Cellules vides: valeur par défaut (création) ou inchangée (mise à jour)
+            yield reader.line_num, {
+                key.strip(): value.strip()
+                for key, value in row.items()
+                if key and value is not None and value.strip() != ""
+            }, None
+        return
+
+    for line_number, line in enumerate(text, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as error:
+            yield line_number, None, f"JSON invalide: {error}"
+            continue
+        if not isinstance(row, dict):
+            yield line_number, None, "Chaque ligne doit être un objet JSON"
+            continue
+        yield line_number, row, None
+
+
+def import_products(farmer, rows):
+    """Créer / mettre à jour les produits d'un agriculteur; retourne un résumé"""
+    summary = {"created": 0, "updated": 0, "error_count": 0, "errors": []}
+
+    rows = iter(rows)
+    total = 0
+    while True:
+        chunk = list(islice(rows, IMPORT_CHUNK_SIZE))
+        if not chunk:
+            break
+
+        total += len(chunk)
+        if total > MAX_IMPORT_ROWS:
+            add_error(
+                summary,
+                chunk[0][0],
+                f"Import limité à {MAX_IMPORT_ROWS} lignes; le reste est ignoré",
+            )
+            break
+
+        import_chunk(farmer, chunk, summary)
+
+    summary["errors"].sort(key=lambda error: error["line"])
+    if summary["created"] or summary["updated"]:
+        invalidate_tags("products")
+        send_product_import_notification(
+            farmer, created=summary["created"], updated=summary["updated"]
+        )
+
+    return summary
+
+
+def add_error(summary, line, errors):
+    summary["error_count"] += 1
+    if len(summary["errors"]) < MAX_REPORTED_ERRORS:
+        summary["errors"].append({"line": line, "errors": errors})
+
+
+def import_chunk(farmer, chunk, summary):
+    # Validation de chaque ligne, sans requête
+    validated = []
+    for line, row, error in chunk:
+        if error:
+            add_error(summary, line, error)
+            continue
+
+        serializer = ProductImportSerializer(data=row, partial="id" in row)
+        if serializer.is_valid():
+            validated.append((line, dict(serializer.validated_data)))
+        else:
+            add_error(summary, line, serializer.errors)
+
+    # Références résolues en une requête par lot
+    category_ids = {data["category"] for _, data in validated if data.get("category")}
+    known_categories = set(
+        Category.objects.filter(pk__in=category_ids).values_list("id", flat=True)
+    )
+    existing = Product.objects.filter(farmer=farmer).in_bulk(
+        [data["id"] for _, data in validated if "id" in data]
+    )
+
+    now = timezone.now()
+    to_create = []
+    to_update = {}
+    repriced = {}
+    restocked = {}
+    update_fields = set()
+
+    for line, data in validated:
+        if "category" in data:
+            category_id = data.pop("category")
+            if category_id is not None and category_id not in known_categories:
+                add_error(summary, line, {"category": "Catégorie inconnue."})
+                continue
+            data["category_id"] = category_id
+
+        product_id = data.pop("id", None)
+        if product_id is None:
+            data.setdefault(
+                "status",
+                (
+                    Product.ProductStatus.ACTIVE
+                    if data["available_quantity"] > 0
+                    else Product.ProductStatus.DRAFT
+                ),
+            )
+            to_create.append(Product(farmer=farmer, **data))
+            continue
+
+        product = existing.get(product_id)
+        if product is None:
+            add_error(summary, line, {"id": "Produit introuvable."})
+            continue
+
+        previous_price = price_key(product)
+        previous_stock = (product.available_quantity, product.status)
+        for field, value in data.items():
+            setattr(product, field, value)
+        product.updated_at = now
+        update_fields.update(data)
+        to_update[product.pk] = product
+        if price_key(product) != previous_price:
+            repriced[product.pk] = product
+        if (product.available_quantity, product.status) != previous_stock:
+            restocked[product.pk] = product
+
+    with transaction.atomic():
+        Product.objects.bulk_create(to_create, batch_size=IMPORT_CHUNK_SIZE)
+        if to_update:
+            Product.objects.bulk_update(
+                to_update.values(), sorted(update_fields | {"updated_at"})
+            )
+        # bulk_create / bulk_update n'envoient pas de signaux
+        record_prices([*to_create, *repriced.values()], wilaya=farmer.wilaya)
+        record_changes(repriced, ProductChange.Kind.PRICE)
+        record_changes(restocked, ProductChange.Kind.STOCK)
+        covered = [product.pk for product in to_create]
+        if {"delivery_radius", "status"} & update_fields:
+            covered.extend(to_update)
+        update_coverage(Product.objects.filter(pk__in=covered))
+
+    summary["created"] += len(to_create)
+    summary["updated"] += len(to_update)
+    invalidate_tags(*(f"product:{product_id}" for product_id in to_update))
+
+
+class Echo:
+    """Pseudo-fichier pour csv.writer: retourne la ligne au lieu de l'écrire"""
+
+    def write(self, value):
+        return value
+
+
+def export_value(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+def export_rows(queryset, file_format):
+    """Générer le fichier d'export ligne par ligne (curseur côté serveur)"""
+    rows = queryset.order_by("id").values_list(*EXPORT_FIELDS).iterator(chunk_size=1000)
+
+    if file_format == "csv":
+        writer = csv.writer(Echo())
+        yield writer.writerow(EXPORT_HEADERS)
+        for row in rows:
+            yield writer.writerow([export_value(value) for value in row])
+        return
+
+    for row in rows:
+        yield json.dumps(
+            dict(zip(EXPORT_HEADERS, map(export_value, row))), ensure_ascii=False
+        ) + "\n"
@@ -0,0 +1,171 @@
+"""
+Cache des lectures du catalogue, invalidé par tags.
+
+Chaque entrée mémorise la version des tags dont elle dépend ("products",
+"product:12", "categories"...). Les signaux incrémentent la version d'un tag
+à chaque modification: les entrées qui en dépendent deviennent périmées sans
+avoir à connaître leurs clés.
+
+Une entrée périmée (tag modifié ou durée dépassée) est encore servie aux
+requêtes concurrentes pendant qu'une seule d'entre elles, détentrice du
+verrou, la recalcule (stale-while-revalidate).
+"""
+
+import hashlib
+import time
+
+from django.core.cache import cache
+
+from betteragri.conditional import ConditionalGetMixin
+
+CATALOG_CACHE_TIMEOUT = 300  # secondes avant rafraîchissement
+CATALOG_CACHE_STALE = 600  # durée supplémentaire pendant laquelle servir du périmé
+CATALOG_CACHE_LOCK_TIMEOUT = 30
+CATALOG_CACHE_LOCK_WAIT = 2.0
+
+KEY_PREFIX = "catalog"
+OUTCOMES = ("hit", "stale", "miss")
+NAMES_KEY = f"{KEY_PREFIX}:names"
+
+
+def tag_key(tag):
+    return f"{KEY_PREFIX}:tag:{tag}"
+
+
+def get_tag_versions(tags):
+    """Version courante de chaque tag (initialisée si absente)"""
+    keys = {tag: tag_key(tag) for tag in tags}
+    found = cache.get_many(keys.values())
+
+    versions = {}
+    for tag, key in keys.items():
+        if key not in found:
+            # Valeur initiale unique: une version évincée ne peut pas revenir
+            # à une valeur déjà vue par une entrée en cache
+            cache.add(key, time.time_ns(), timeout=None)
+            found[key] = cache.get(key)
+        versions[tag] = found[key]
+    return versions
+
+
+def invalidate_tags(*tags):
+    """Rendre périmées toutes les entrées qui dépendent de ces tags"""
+    for tag in tags:
+        key = tag_key(tag)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, time.time_ns(), timeout=None)
+
+
+def record(name, outcome):
+    key = f"{KEY_PREFIX}:stats:{name}:{outcome}"
+    try:
+        cache.incr(key)
+    except ValueError:
+        if not cache.add(key, 1, timeout=None):
+            cache.incr(key)
+            return
+        # Premier enregistrement: mémoriser le nom pour les statistiques
+        names = cache.get(NAMES_KEY, set())
+        if name not in names:
+            cache.set(NAMES_KEY, names | {name}, timeout=None)
+
+
+def get_stats():
+    """Succès, périmés et échecs par cache, avec le taux de succès"""
+    names = sorted(cache.get(NAMES_KEY, set()))
+    keys = {
+        (name, outcome): f"{KEY_PREFIX}:stats:{name}:{outcome}"
+        for name in names
+        for outcome in OUTCOMES
+    }
+    values = cache.get_many(keys.values())
+
+    stats = {}
+    for name in names:
+        counts = {outcome: values.get(keys[(name, outcome)], 0) for outcome in OUTCOMES}
+        total = sum(counts.values())
+        served = counts["hit"] + counts["stale"]
+        counts["hit_rate"] = round(served / total, 4) if total else None
+        stats[name] = counts
+    return stats
+
+
+def reset_stats():
+    names = cache.get(NAMES_KEY, set())
+    cache.delete_many(
+        [
+            f"{KEY_PREFIX}:stats:{name}:{outcome}"
+            for name in names
+            for outcome in OUTCOMES
+        ]
+    )
+
+
+def cached(name, params, tags, compute, timeout=CATALOG_CACHE_TIMEOUT):
+    """
+    Retourner la valeur en cache pour (name, params), ou la calculer avec
+    compute(). La valeur doit être sérialisable (données de réponse).
+    """
+    digest = hashlib.md5(str(params).encode()).hexdigest()
+    key = f"{KEY_PREFIX}:{name}:{digest}"
+    lock_key = f"{key}:lock"
+
+    versions = get_tag_versions(tags)
+    entry = cache.get(key)
+
+    if entry is not None:
+        if entry["versions"] == versions and entry["expires_at"] > time.time():
+            record(name, "hit")
+            return entry["value"]
+
+        # Périmée: un seul recalcul, les autres servent l'ancienne valeur
+        if not cache.add(lock_key, 1, timeout=CATALOG_CACHE_LOCK_TIMEOUT):
+            record(name, "stale")
+            return entry["value"]
+    elif not cache.add(lock_key, 1, timeout=CATALOG_CACHE_LOCK_TIMEOUT):
+        # Aucune valeur: attendre brièvement le calcul en cours
+        deadline = time.monotonic() + CATALOG_CACHE_LOCK_WAIT
+        while time.monotonic() < deadline:
+            time.sleep(0.05)
+            entry = cache.get(key)
+            if entry is not None:
+                record(name, "hit")
+                return entry["value"]
+        record(name, "miss")
+        return compute()
+
+    record(name, "miss")
+    try:
+        value = compute()
+        cache.set(
+            key,
+            {
+                "versions": versions,
+                "expires_at": time.time() + timeout,
+                "value": value,
+            },
+            timeout=timeout + CATALOG_CACHE_STALE,
+        )
+    finally:
+        cache.delete(lock_key)
+    return value
+
+
+class TaggedConditionalMixin(ConditionalGetMixin):
+    """
+    Requêtes conditionnelles sur les lectures du catalogue: l'ETag est
+    dérivé des versions des tags dont dépend la réponse (get_etag_tags()).
+    """
+
+    etag_tags = ()
+
+    def get_etag_tags(self):
+        return self.etag_tags
+
+    def get_etag_parts(self):
+        tags = self.get_etag_tags()
+        if not tags:
+            return None
+        return sorted(get_tag_versions(tags).items())
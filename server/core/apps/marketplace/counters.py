@@ -0,0 +1,182 @@
+"""
+Compteurs à écriture différée (vues, commandes...).
+
+Les incréments sont accumulés dans Redis (HINCRBY atomique, partagé par tous
+les workers), puis écrits périodiquement en base par lots avec des
+expressions F() (tâche flush_buffered_counters ou commande flush_counters).
+
+Sans Redis (cache local des tests, serveur Redis injoignable), chaque
+incrément est écrit directement en base.
+"""
+
+import logging
+import threading
+import uuid
+from collections import defaultdict
+
+from django.apps import apps
+from django.db import transaction
+from django.db.models import F
+
+from .cache import invalidate_tags
+
+try:
+    from redis.exceptions import ConnectionError as RedisConnectionError
+    from redis.exceptions import TimeoutError as RedisTimeoutError
+
+    REDIS_UNAVAILABLE = (RedisConnectionError, RedisTimeoutError)
+except ImportError:
+    REDIS_UNAVAILABLE = ()
+
+logger = logging.getLogger(__name__)
+
+
+class RedisCounterBackend:
+    """Stockage des incréments dans un hash Redis partagé par tous les workers"""
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def incr(self, key, member, amount):
+        return self.connection.hincrby(key, member, amount)
+
+    def get(self, key, member):
+        return int(self.connection.hget(key, member) or 0)
+
+    def drain(self, key):
+        # RENAME est atomique: les incréments suivants repartent d'un hash vide
+        flushing_key = f"{key}:flushing:{uuid.uuid4().hex}"
+        from redis.exceptions import ResponseError
+
+        try:
+            self.connection.rename(key, flushing_key)
+        except ResponseError:
+            # Clé inexistante: rien à écrire
+            return {}
+
+        pipeline = self.connection.pipeline()
+        pipeline.hgetall(flushing_key)
+        pipeline.delete(flushing_key)
+        counts, _ = pipeline.execute()
+
+        return {int(member): int(amount) for member, amount in counts.items()}
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_counter_backend():
+    """Hash Redis du cache par défaut; None si le cache n'est pas django-redis"""
+    global _backend
+
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                try:
+                    from django_redis import get_redis_connection
+
+                    _backend = RedisCounterBackend(get_redis_connection("default"))
+                except (ImportError, NotImplementedError):
+                    _backend = False
+
+    return _backend or None
+
+
+class BufferedCounter:
+    """Compteur entier d'un modèle, incrémenté en mémoire et écrit par lots"""
+
+    def __init__(self, model_label: str, field: str, tag: str = None):
+        self.model_label = model_label
+        self.field = field
+        # Préfixe des tags du cache ("product" -> "product:<pk>") à invalider
+        # après écriture: les réponses en cache ajoutent seulement les
+        # incréments en attente
+        self.tag = tag
+        self.key = f"counters:{model_label}:{field}"
+
+    @property
+    def model(self):
+        return apps.get_model(self.model_label)
+
+    def incr(self, pk, amount: int = 1) -> int:
+        """Ajouter un incrément; retourne le total pas encore lu en base"""
+        backend = get_counter_backend()
+        if backend is not None:
+            try:
+                return backend.incr(self.key, int(pk), amount)
+            except REDIS_UNAVAILABLE as error:
+                logger.warning("Redis indisponible (%s): %s", self.key, error)
+
+        # Écriture directe: l'incrément ne sera pas repris par flush()
+        self.model.objects.filter(pk=pk).update(**{self.field: F(self.field) + amount})
+        self.invalidate([pk])
+        return amount
+
+    def pending(self, pk) -> int:
+        """Incréments pas encore écrits en base"""
+        backend = get_counter_backend()
+        if backend is None:
+            return 0
+        try:
+            return backend.get(self.key, int(pk))
+        except REDIS_UNAVAILABLE:
+            return 0
+
+    def flush(self, batch_size: int = 500) -> int:
+        """Écrire les incréments accumulés; retourne le nombre de lignes mises à jour"""
+        backend = get_counter_backend()
+        if backend is None:
+            return 0
+        counts = backend.drain(self.key)
+        if not counts:
+            return 0
+
+        # Regrouper par valeur d'incrément: un UPDATE par (valeur, lot)
+        by_amount = defaultdict(list)
+        for pk, amount in counts.items():
+            if amount:
+                by_amount[amount].append(pk)
+
+        updated = 0
+        try:
+            with transaction.atomic():
+                for amount, pks in by_amount.items():
+                    for start in range(0, len(pks), batch_size):
+                        updated += self.model.objects.filter(
+                            pk__in=pks[start : start + batch_size]
+                        ).update(**{self.field: F(self.field) + amount})
+        except Exception:
+            # Remettre les incréments en attente pour le prochain passage
+            for pk, amount in counts.items():
+                backend.incr(self.key, pk, amount)
+            raise
+
+        self.invalidate(counts)
+        return updated
+
+    def invalidate(self, pks):
+        """Rendre périmées les réponses en cache des objets écrits"""
+        if self.tag:
+            tags = [f"{self.tag}:{pk}" for pk in pks]
+            transaction.on_commit(lambda: invalidate_tags(*tags))
+
+
+COUNTERS = {}
+
+
+def register_counter(model_label: str, field: str, tag: str = None) -> BufferedCounter:
+    counter = COUNTERS.get((model_label, field))
+    if counter is None:
+        counter = BufferedCounter(model_label, field, tag)
+        COUNTERS[(model_label, field)] = counter
+    return counter
+
+
+def flush_all_counters() -> dict:
+    """Écrire tous les compteurs enregistrés"""
+    return {counter.key: counter.flush() for counter in list(COUNTERS.values())}
+
+
+product_views = register_counter("marketplace.Product", "views_count", tag="product")
+product_orders = register_counter("marketplace.Product", "orders_count", tag="product")
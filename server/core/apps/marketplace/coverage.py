@@ -0,0 +1,148 @@
+"""
+Index de couverture de livraison: quels produits peuvent être livrés en un point.
+
+Pour chaque produit (agriculteur localisé, rayon de livraison non nul), les
+cellules geohash touchées par le disque de livraison sont enregistrées dans
+DeliveryCoverageCell, avec un indicateur "entièrement couverte". La
+précision dépend du rayon (la plus fine qui reste sous COVERAGE_MAX_CELLS
+cellules): les cellules d'un point sont les préfixes de son geohash.
+
+Une recherche lit les cellules du point de l'acheteur: les produits des
+cellules entièrement couvertes sont retenus directement, la distance exacte
+n'est calculée que pour ceux des cellules en bordure du disque.
+
+L'index est tenu à jour par les signaux (rayon, statut, position de
+l'agriculteur) et par l'import en masse.
+"""
+
+import math
+
+import numpy as np
+from django.db import transaction
+from django.db.models import F, FloatField, Q
+from django.db.models.functions import Cast
+
+from .geo import (
+    bounding_box,
+    geohash_cell_size,
+    geohash_encode,
+    geohash_encode_many,
+    haversine_expression,
+    haversine_vectorized,
+)
+from .models import DeliveryCoverageCell, Product
+
+COVERAGE_PRECISIONS = (5, 4, 3, 2)  # de la plus fine à la plus grossière
+COVERAGE_MAX_CELLS = 400  # cellules par produit au plus (sauf précision 2)
+# Marge (km) des cellules en bordure: la distance exacte tranche ensuite
+COVERAGE_MARGIN_KM = 0.05
+# Statuts indexés: le passage actif <-> épuisé (mouvements de stock, en
+# UPDATE sans signaux) ne modifie pas l'index; le statut est filtré à la lecture
+COVERAGE_STATUSES = (Product.ProductStatus.ACTIVE, Product.ProductStatus.SOLD_OUT)
+
+
+def cell_grid(lat, lon, radius_km, precision):
+    """Indices (lignes, colonnes) des cellules couvrant la boîte englobante"""
+    lat_step, lon_step = geohash_cell_size(precision)
+    min_lat, max_lat, min_lon, max_lon = bounding_box(lat, lon, radius_km)
+    rows = np.arange(
+        math.floor((min_lat + 90) / lat_step), math.floor((max_lat + 90) / lat_step) + 1
+    )
+    columns = np.arange(
+        math.floor((min_lon + 180) / lon_step),
+        math.floor((max_lon + 180) / lon_step) + 1,
+    )
+    return rows, columns, lat_step, lon_step
+
+
+def coverage_cells(lat, lon, radius_km):
+    """Cellules (geohash, entièrement couverte) touchées par le disque"""
+    for precision in COVERAGE_PRECISIONS:
+        rows, columns, lat_step, lon_step = cell_grid(lat, lon, radius_km, precision)
+        if len(rows) * len(columns) <= COVERAGE_MAX_CELLS:
+            break
+
+    south, west = np.meshgrid(rows * lat_step - 90, columns * lon_step - 180)
+    south, west = south.ravel(), west.ravel()
+    north, east = south + lat_step, west + lon_step
+
+    # Point de la cellule le plus proche du centre, coin le plus éloigné
+    nearest = haversine_vectorized(
+        lat, lon, np.clip(lat, south, north), np.clip(lon, west, east)
+    )
+    farthest = np.max(
+        [
+            haversine_vectorized(lat, lon, corner_lat, corner_lon)
+            for corner_lat in (south, north)
+            for corner_lon in (west, east)
+        ],
+        axis=0,
+    )
+
+    touched = nearest <= radius_km + COVERAGE_MARGIN_KM
+    codes = geohash_encode_many(
+        (south + north)[touched] / 2, (west + east)[touched] / 2, precision
+    )
+    return list(zip(codes.tolist(), (farthest <= radius_km)[touched].tolist()))
+
+
+def update_coverage(products, rebuild=False):
+    """
+    Recalculer la couverture des produits d'un queryset (de tous les
+    produits si rebuild). Retourne le nombre de cellules enregistrées.
+    """
+    rows = products.values_list(
+        "id", "status", "delivery_radius", "farmer__latitude", "farmer__longitude"
+    )
+    cells_by_disc = {}  # (lat, lon, rayon) -> cellules, partagées entre produits
+    count = 0
+
+    with transaction.atomic():
+        if rebuild:
+            DeliveryCoverageCell.objects.all().delete()
+        else:
+            DeliveryCoverageCell.objects.filter(
+                product__in=products.values("id")
+            ).delete()
+
+        batch = []
+        for product_id, status, radius, lat, lon in rows.iterator(chunk_size=2000):
+            if status not in COVERAGE_STATUSES or not radius or None in (lat, lon):
+                continue
+            disc = (float(lat), float(lon), float(radius))
+            if disc not in cells_by_disc:
+                cells_by_disc[disc] = coverage_cells(*disc)
+            batch.extend(
+                DeliveryCoverageCell(geohash=geohash, product_id=product_id, full=full)
+                for geohash, full in cells_by_disc[disc]
+            )
+            if len(batch) >= 5000:
+                DeliveryCoverageCell.objects.bulk_create(batch, batch_size=1000)
+                count += len(batch)
+                batch = []
+
+        DeliveryCoverageCell.objects.bulk_create(batch, batch_size=1000)
+    return count + len(batch)
+
+
+def deliverable_to(queryset, lat, lon):
+    """Produits du queryset livrables au point (lat, lon)"""
+    point = geohash_encode(lat, lon, max(COVERAGE_PRECISIONS))
+    cells = DeliveryCoverageCell.objects.filter(
+        geohash__in=[point[:precision] for precision in COVERAGE_PRECISIONS]
+    )
+
+    # Cellules en bordure: distance exacte agriculteur -> acheteur
+    border = (
+        Product.objects.filter(id__in=cells.filter(full=False).values("product_id"))
+        .annotate(
+            delivery_distance=haversine_expression(
+                lat, lon, "farmer__latitude", "farmer__longitude"
+            )
+        )
+        .filter(delivery_distance__lte=Cast(F("delivery_radius"), FloatField()))
+        .values("id")
+    )
+    return queryset.filter(
+        Q(id__in=cells.filter(full=True).values("product_id")) | Q(id__in=border)
+    )
@@ -0,0 +1,61 @@
+"""
+Facettes de recherche (catégorie, wilaya, bio, qualité).
+
+Toutes les facettes sont calculées en une seule requête groupée sur les
+combinaisons (catégorie, wilaya, bio, qualité), puis agrégées en Python:
+le nombre de groupes reste petit même pour un grand catalogue.
+"""
+
+from collections import Counter
+
+from django.db.models import Count
+
+FACET_FIELDS = (
+    "category_id",
+    "category__name",
+    "farmer__wilaya",
+    "organic",
+    "quality_grade",
+)
+
+
+def product_facets(queryset):
+    """Nombre de produits par valeur de facette pour le queryset filtré"""
+    groups = (
+        queryset.order_by()
+        .values(*FACET_FIELDS)
+        .annotate(count=Count("id"))
+        .values_list(*FACET_FIELDS, "count")
+    )
+
+    categories = Counter()
+    category_names = {}
+    wilayas = Counter()
+    organic = Counter()
+    quality_grades = Counter()
+
+    for category_id, category_name, wilaya, is_organic, grade, count in groups:
+        if category_id is not None:
+            categories[category_id] += count
+            category_names[category_id] = category_name
+        if wilaya:
+            wilayas[wilaya] += count
+        organic[is_organic] += count
+        quality_grades[grade] += count
+
+    return {
+        "category": [
+            {"id": category_id, "name": category_names[category_id], "count": count}
+            for category_id, count in categories.most_common()
+        ],
+        "wilaya": [
+            {"value": value, "count": count} for value, count in wilayas.most_common()
+        ],
+        "organic": [
+            {"value": value, "count": count} for value, count in organic.most_common()
+        ],
+        "quality_grade": [
+            {"value": value, "count": count}
+            for value, count in quality_grades.most_common()
+        ],
+    }
@@ -0,0 +1,442 @@
+"""
+Outils géospatiaux pour le marketplace (distances, boîtes englobantes,
+index spatial en mémoire des agriculteurs).
+"""
+
+import threading
+import time
+from math import radians, cos
+
+import numpy as np
+from django.db import transaction
+from django.db.models import ExpressionWrapper, F, FloatField, Value
+from django.db.models.functions import ASin, Cast, Cos, Least, Power, Radians, Sin, Sqrt
+
+from .cache import get_tag_versions, invalidate_tags
+
+EARTH_RADIUS_KM = 6371
+KM_PER_DEGREE_LAT = 111.32
+
+
+def parse_point(value):
+    """Coordonnées "lat,lon" d'un paramètre (ValueError si invalides)"""
+    try:
+        lat, lon = (float(part) for part in value.split(","))
+    except (AttributeError, TypeError, ValueError):
+        raise ValueError(f"Coordonnées invalides: {value}")
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+        raise ValueError(f"Coordonnées invalides: {value}")
+    return lat, lon
+
+
+def bounding_box(lat: float, lon: float, radius_km: float):
+    """Boîte englobante (min_lat, max_lat, min_lon, max_lon) d'un cercle"""
+    delta_lat = radius_km / KM_PER_DEGREE_LAT
+    # Éviter la division par zéro près des pôles
+    delta_lon = radius_km / (KM_PER_DEGREE_LAT * max(cos(radians(lat)), 0.01))
+
+    return (
+        max(lat - delta_lat, -90.0),
+        min(lat + delta_lat, 90.0),
+        max(lon - delta_lon, -180.0),
+        min(lon + delta_lon, 180.0),
+    )
+
+
+def haversine_expression(lat: float, lon: float, lat_field: str, lon_field: str):
+    """
+    Expression SQL calculant la distance Haversine (km) entre un point fixe
+    et les colonnes lat_field/lon_field.
+    """
+    lat1 = radians(lat)
+    lon1 = radians(lon)
+    lat2 = Radians(Cast(F(lat_field), FloatField()))
+    lon2 = Radians(Cast(F(lon_field), FloatField()))
+
+    a = Power(Sin((lat2 - Value(lat1)) / 2), 2) + Value(cos(lat1)) * Cos(lat2) * Power(
+        Sin((lon2 - Value(lon1)) / 2), 2
+    )
+
+    # LEAST() protège asin() des erreurs d'arrondi (a > 1)
+    return ExpressionWrapper(
+        Value(2 * EARTH_RADIUS_KM) * ASin(Sqrt(Least(a, Value(1.0)))),
+        output_field=FloatField(),
+    )
+
+
+def nearby_products(queryset, lat: float, lon: float, radius_km: float):
+    """
+    Produits dont l'agriculteur se trouve à moins de radius_km du point
+    (lat, lon) et dont le rayon de livraison couvre ce point.
+
+    La boîte englobante utilise l'index (latitude, longitude) des
+    utilisateurs; la distance exacte est ensuite calculée en SQL.
+    """
+    min_lat, max_lat, min_lon, max_lon = bounding_box(lat, lon, radius_km)
+
+    return (
+        queryset.filter(
+            farmer__latitude__range=(min_lat, max_lat),
+            farmer__longitude__range=(min_lon, max_lon),
+        )
+        .annotate(
+            distance=haversine_expression(
+                lat, lon, "farmer__latitude", "farmer__longitude"
+            )
+        )
+        .filter(distance__lte=radius_km)
+        .filter(distance__lte=Cast(F("delivery_radius"), FloatField()))
+        .order_by("distance", "id")
+    )
+
+
+# GEOHASH
+GEOHASH_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+
+def geohash_encode(lat: float, lon: float, precision: int = 5) -> str:
+    """Encoder des coordonnées en geohash"""
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    geohash = []
+    bits = 0
+    bit_count = 0
+    even = True
+
+    while len(geohash) < precision:
+        target, value = (lon_range, lon) if even else (lat_range, lat)
+        middle = (target[0] + target[1]) / 2
+        bits <<= 1
+        if value >= middle:
+            bits |= 1
+            target[0] = middle
+        else:
+            target[1] = middle
+        even = not even
+        bit_count += 1
+
+        if bit_count == 5:
+            geohash.append(GEOHASH_BASE32[bits])
+            bits = 0
+            bit_count = 0
+
+    return "".join(geohash)
+
+
+def geohash_encode_many(lats, lons, precision: int = 5):
+    """Encoder des tableaux de coordonnées en geohash (vectorisé)"""
+    total_bits = precision * 5
+    lon_bits = (total_bits + 1) // 2
+    lat_bits = total_bits // 2
+
+    lat_idx = np.clip(
+        ((np.asarray(lats) + 90.0) / 180.0 * (1 << lat_bits)).astype(np.int64),
+        0,
+        (1 << lat_bits) - 1,
+    )
+    lon_idx = np.clip(
+        ((np.asarray(lons) + 180.0) / 360.0 * (1 << lon_bits)).astype(np.int64),
+        0,
+        (1 << lon_bits) - 1,
+    )
+
+    # Entrelacer les bits: longitude d'abord, puis latitude
+    codes = np.zeros(len(lat_idx), dtype=np.int64)
+    for bit in range(total_bits):
+        if bit % 2 == 0:
+            value = (lon_idx >> (lon_bits - 1 - bit // 2)) & 1
+        else:
+            value = (lat_idx >> (lat_bits - 1 - bit // 2)) & 1
+        codes = (codes << 1) | value
+
+    unique_codes, inverse = np.unique(codes, return_inverse=True)
+    strings = np.array(
+        [
+            "".join(
+                GEOHASH_BASE32[(int(code) >> (5 * (precision - 1 - i))) & 31]
+                for i in range(precision)
+            )
+            for code in unique_codes
+        ],
+        dtype=object,
+    )
+    return strings[inverse]
+
+
+def geohash_cell_size(precision: int):
+    """Taille (degrés lat, degrés lon) d'une cellule geohash"""
+    total_bits = precision * 5
+    lon_bits = (total_bits + 1) // 2
+    lat_bits = total_bits // 2
+    return 180.0 / (1 << lat_bits), 360.0 / (1 << lon_bits)
+
+
+def geohash_cells_in_box(min_lat, max_lat, min_lon, max_lon, precision: int):
+    """Ensemble des cellules geohash couvrant une boîte englobante"""
+    lat_step, lon_step = geohash_cell_size(precision)
+    cells = set()
+
+    lat = min_lat
+    while True:
+        lon = min_lon
+        while True:
+            cells.add(geohash_encode(lat, lon, precision))
+            if lon >= max_lon:
+                break
+            lon = min(lon + lon_step, max_lon)
+        if lat >= max_lat:
+            break
+        lat = min(lat + lat_step, max_lat)
+
+    return cells
+
+
+def haversine_vectorized(lat: float, lon: float, lats, lons):
+    """Distances Haversine (km) entre un point et des tableaux de coordonnées"""
+    lat1 = np.radians(lat)
+    lat2 = np.radians(lats)
+    dlat = lat2 - lat1
+    dlon = np.radians(lons) - np.radians(lon)
+
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlon / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+# INDEX SPATIAL DES AGRICULTEURS
+class FarmerLocationIndex:
+    """
+    Index spatial en mémoire des agriculteurs.
+
+    Les coordonnées sont stockées dans des tableaux float64 contigus et
+    regroupées par cellule geohash; une recherche ne calcule la distance
+    exacte (vectorisée avec NumPy) que pour les cellules candidates.
+    """
+
+    def __init__(self, precision: int = 4, capacity: int = 1024):
+        self.precision = precision
+        self._lock = threading.RLock()
+        self._ids = np.full(capacity, -1, dtype=np.int64)
+        self._lats = np.zeros(capacity, dtype=np.float64)
+        self._lons = np.zeros(capacity, dtype=np.float64)
+        self._size = 0
+        self._positions = {}  # id agriculteur -> position dans les tableaux
+        self._free = []  # positions libérées réutilisables
+        self._position_cells = {}  # position -> geohash
+        self._cells = {}  # geohash -> positions
+        self._cell_arrays = {}  # geohash -> np.ndarray (cache)
+        self.built_at = self.checked_at = None
+        self.version = None  # version du tag "farmer_locations" à la construction
+
+    def __len__(self):
+        return len(self._positions)
+
+    def build(self, rows):
+        """Construire l'index à partir d'itérables (id, lat, lon)"""
+        ids, lats, lons = [], [], []
+        for farmer_id, lat, lon in rows:
+            ids.append(farmer_id)
+            lats.append(float(lat))
+            lons.append(float(lon))
+
+        capacity = max(len(ids) * 2, 1024)
+        with self._lock:
+            self._ids = np.full(capacity, -1, dtype=np.int64)
+            self._lats = np.zeros(capacity, dtype=np.float64)
+            self._lons = np.zeros(capacity, dtype=np.float64)
+            self._ids[: len(ids)] = ids
+            self._lats[: len(lats)] = lats
+            self._lons[: len(lons)] = lons
+            self._size = len(ids)
+            self._positions = {farmer_id: pos for pos, farmer_id in enumerate(ids)}
+            self._free = []
+            self._position_cells = {}
+            self._cells = {}
+            self._cell_arrays = {}
+
+            cells = geohash_encode_many(
+                self._lats[: self._size], self._lons[: self._size], self.precision
+            )
+            for pos, cell in enumerate(cells):
+                self._position_cells[pos] = cell
+                self._cells.setdefault(cell, []).append(pos)
+
+            self.built_at = time.monotonic()
+
+    def upsert(self, farmer_id, lat, lon):
+        """Ajouter ou déplacer un agriculteur"""
+        lat, lon = float(lat), float(lon)
+        with self._lock:
+            pos = self._positions.get(farmer_id)
+            if pos is not None:
+                if self._lats[pos] == lat and self._lons[pos] == lon:
+                    return
+                self._remove_from_cell(pos)
+            else:
+                pos = self._allocate()
+                self._positions[farmer_id] = pos
+                self._ids[pos] = farmer_id
+
+            self._lats[pos] = lat
+            self._lons[pos] = lon
+            cell = geohash_encode(lat, lon, self.precision)
+            self._position_cells[pos] = cell
+            self._cells.setdefault(cell, []).append(pos)
+            self._cell_arrays.pop(cell, None)
+
+    def remove(self, farmer_id):
+        """Retirer un agriculteur de l'index"""
+        with self._lock:
+            pos = self._positions.pop(farmer_id, None)
+            if pos is None:
+                return
+            self._remove_from_cell(pos)
+            self._ids[pos] = -1
+            self._free.append(pos)
+
+    def query(self, lat: float, lon: float, radius_km: float):
+        """
+        Agriculteurs à moins de radius_km du point.
+        Retourne (ids, distances) triés par distance croissante.
+        """
+        cells = geohash_cells_in_box(*bounding_box(lat, lon, radius_km), self.precision)
+
+        with self._lock:
+            candidates = [
+                self._cell_array(cell) for cell in cells if cell in self._cells
+            ]
+            if not candidates:
+                return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+
+            positions = np.concatenate(candidates)
+            ids = self._ids[positions]
+            distances = haversine_vectorized(
+                lat, lon, self._lats[positions], self._lons[positions]
+            )
+
+        mask = distances <= radius_km
+        ids, distances = ids[mask], distances[mask]
+        order = np.argsort(distances, kind="stable")
+        return ids[order], distances[order]
+
+    def _allocate(self):
+        if self._free:
+            return self._free.pop()
+
+        if self._size == len(self._ids):
+            extra = len(self._ids)
+            self._ids = np.concatenate([self._ids, np.full(extra, -1, dtype=np.int64)])
+            self._lats = np.concatenate([self._lats, np.zeros(extra, dtype=np.float64)])
+            self._lons = np.concatenate([self._lons, np.zeros(extra, dtype=np.float64)])
+
+        pos = self._size
+        self._size += 1
+        return pos
+
+    def _remove_from_cell(self, pos):
+        cell = self._position_cells.pop(pos, None)
+        positions = self._cells.get(cell)
+        if positions and pos in positions:
+            positions.remove(pos)
+            if not positions:
+                del self._cells[cell]
+        self._cell_arrays.pop(cell, None)
+
+    def _cell_array(self, cell):
+        array = self._cell_arrays.get(cell)
+        if array is None:
+            array = np.fromiter(self._cells[cell], dtype=np.int64)
+            self._cell_arrays[cell] = array
+        return array
+
+
+# Index partagé par le processus. Les modifications validées sont appliquées
+# immédiatement dans le worker qui les a faites et incrémentent la version du
+# tag "farmer_locations": les autres workers reconstruisent leur index dès
+# qu'ils voient la nouvelle version (lue au plus toutes les
+# FARMER_INDEX_CHECK_INTERVAL secondes), et au plus tard après FARMER_INDEX_TTL.
+FARMER_INDEX_TTL = 600  # secondes
+FARMER_INDEX_CHECK_INTERVAL = 2  # secondes entre deux lectures du tag
+FARMER_INDEX_TAG = "farmer_locations"
+
+_farmer_index = None
+_farmer_index_lock = threading.Lock()
+
+
+def _build_farmer_index():
+    from apps.accounts.models import User
+
+    # Version lue avant les données: une modification pendant la
+    # construction déclenchera la suivante
+    version = get_tag_versions([FARMER_INDEX_TAG])[FARMER_INDEX_TAG]
+    index = FarmerLocationIndex()
+    index.build(
+        User.objects.filter(
+            user_type="farmer", latitude__isnull=False, longitude__isnull=False
+        ).values_list("id", "latitude", "longitude")
+    )
+    index.version = version
+    index.checked_at = index.built_at
+    return index
+
+
+def get_farmer_index():
+    """Index des agriculteurs du processus, reconstruit s'il est périmé"""
+    global _farmer_index
+    index = _farmer_index
+    if index is None:
+        with _farmer_index_lock:
+            if _farmer_index is None:
+                _farmer_index = _build_farmer_index()
+            return _farmer_index
+
+    now = time.monotonic()
+    if now - index.checked_at < FARMER_INDEX_CHECK_INTERVAL:
+        return index
+    index.checked_at = now
+
+    stale = (
+        now - index.built_at >= FARMER_INDEX_TTL
+        or get_tag_versions([FARMER_INDEX_TAG])[FARMER_INDEX_TAG] != index.version
+    )
+    # Une seule reconstruction; les autres requêtes servent l'ancien index
+    if stale and _farmer_index_lock.acquire(blocking=False):
+        try:
+            _farmer_index = _build_farmer_index()
+        finally:
+            _farmer_index_lock.release()
+    return _farmer_index
+
+
+def update_farmer_location(user):
+    """Répercuter la position d'un utilisateur dans les index, après validation"""
+    user_id = user.id
+    location = None
+    if (
+        user.user_type == "farmer"
+        and user.latitude is not None
+        and user.longitude is not None
+    ):
+        location = (user.latitude, user.longitude)
+
+    def apply():
+        index = _farmer_index
+        if index is not None:
+            if location is None:
+                index.remove(user_id)
+            else:
+                index.upsert(user_id, *location)
+        invalidate_tags(FARMER_INDEX_TAG)
+
+    transaction.on_commit(apply)
+
+
+def remove_farmer_location(user_id):
+    """Retirer un utilisateur des index, après validation"""
+
+    def apply():
+        index = _farmer_index
+        if index is not None:
+            index.remove(user_id)
+        invalidate_tags(FARMER_INDEX_TAG)
+
+    transaction.on_commit(apply)
@@ -0,0 +1,244 @@
+"""
+Géocodage Nominatim avec cache persistant et limitation de débit.
+
+Nominatim accepte au plus une requête par seconde. Chaque recherche passe par:
+
+1. le cache Django puis la table GeocodeCache, avec expiration (clé: requête
+   normalisée, ou coordonnées arrondies pour le géocodage inverse);
+2. la fusion des recherches identiques en cours, tous processus confondus:
+   celle qui obtient le verrou (cache.add) part vers Nominatim, les autres
+   attendent son résultat;
+3. une limite de débit partagée dans le cache (1 requête/s pour tous les
+   workers) et une session HTTP réutilisée (pool de connexions, nouvelles
+   tentatives sur 429/5xx).
+"""
+
+import hashlib
+import logging
+import math
+import re
+import threading
+import time
+import unicodedata
+from datetime import timedelta
+
+import requests
+from django.core.cache import cache
+from django.utils import timezone
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from .models import GeocodeCache
+
+logger = logging.getLogger(__name__)
+
+NOMINATIM_URL = "https://nominatim.openstreetmap.org"
+USER_AGENT = "BetterAgri-Mauritanie/1.0"
+REQUEST_TIMEOUT = 10
+
+GEOCODE_TTL = timedelta(days=30)
+GEOCODE_MISS_TTL = timedelta(days=1)  # recherches sans résultat
+COORDINATE_PRECISION = 3  # décimales (~110 m)
+RATE_LIMIT = 1.0  # requêtes par seconde (politique d'utilisation de Nominatim)
+RATE_LIMIT_WAIT = 15.0  # attente maximale d'un créneau (secondes)
+LOOKUP_LOCK_TIMEOUT = 60  # durée maximale d'une recherche en cours (secondes)
+LOOKUP_POLL_INTERVAL = 0.2  # attente du résultat d'une autre recherche
+
+
+def normalize_text(text):
+    """Minuscules, sans accents ni ponctuation, espaces simplifiés"""
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    return " ".join(re.sub(r"[^\w]+", " ", text.casefold()).split())
+
+
+class CacheRateLimiter:
+    """
+    Limite de débit partagée par tous les processus via le cache (Redis).
+
+    Le temps est découpé en créneaux de 1/rate seconde; cache.add (atomique)
+    réserve le premier créneau libre à venir. Chaque requête part au début
+    de son créneau: deux requêtes sont toujours espacées d'au moins 1/rate.
+    """
+
+    def __init__(self, key, rate):
+        self.key = key
+        self.interval = 1 / rate
+
+    def acquire(self, timeout):
+        """Réserver un créneau et l'attendre; False si aucun avant `timeout`"""
+        now = time.time()
+        first = math.ceil(now / self.interval)
+        last = math.floor((now + timeout) / self.interval)
+        for slot in range(first, last + 1):
+            start = slot * self.interval
+            expires = math.ceil(start + self.interval - now) + 1
+            if cache.add(f"{self.key}:{slot}", 1, timeout=expires):
+                delay = start - time.time()
+                if delay > 0:
+                    time.sleep(delay)
+                return True
+        return False
+
+
+def build_session():
+    session = requests.Session()
+    session.headers["User-Agent"] = USER_AGENT
+    retry = Retry(
+        total=2,
+        backoff_factor=1,
+        status_forcelist=(429, 502, 503, 504),
+        allowed_methods=("GET",),
+    )
+    session.mount("https://", HTTPAdapter(pool_maxsize=10, max_retries=retry))
+    return session
+
+
+class Geocoder:
+    def __init__(self, session=None, rate=RATE_LIMIT):
+        self.session = session or build_session()
+        self.limiter = CacheRateLimiter("geocode:rate", rate)
+
+    def search(self, query, city=None, country="Mauritanie", refresh=False):
+        """Premier résultat de la recherche, None si introuvable"""
+        text = f"{query}, {city}, {country}" if city else f"{query}, {country}"
+        return self.lookup(
+            GeocodeCache.Kind.SEARCH,
+            normalize_text(text)[:255],
+            lambda: self.fetch_search(text),
+            refresh,
+        )
+
+    def reverse(self, lat, lon, refresh=False):
+        """Adresse des coordonnées (arrondies), None si introuvable"""
+        lat, lon = round(lat, COORDINATE_PRECISION), round(lon, COORDINATE_PRECISION)
+        return self.lookup(
+            GeocodeCache.Kind.REVERSE,
+            f"{lat:.{COORDINATE_PRECISION}f},{lon:.{COORDINATE_PRECISION}f}",
+            lambda: self.fetch_reverse(lat, lon),
+            refresh,
+        )
+
+    def lookup(self, kind, key, fetch, refresh=False):
+        cache_key = f"geocode:{kind}:{hashlib.md5(key.encode()).hexdigest()}"
+        if not refresh:
+            entry = self.stored(kind, key, cache_key)
+            if entry is not None:
+                return entry["result"]
+
+        # Une seule recherche en cours par clé, tous processus confondus
+        lock_key = f"{cache_key}:lock"
+        if cache.add(lock_key, 1, timeout=LOOKUP_LOCK_TIMEOUT):
+            try:
+                return self.fetch_and_store(kind, key, cache_key, fetch)
+            finally:
+                cache.delete(lock_key)
+
+        deadline = time.monotonic() + LOOKUP_LOCK_TIMEOUT
+        while cache.get(lock_key) is not None and time.monotonic() < deadline:
+            time.sleep(LOOKUP_POLL_INTERVAL)
+        entry = self.stored(kind, key, cache_key)
+        return entry["result"] if entry is not None else None
+
+    def stored(self, kind, key, cache_key):
+        """Résultat encore valide du cache Django ou de GeocodeCache"""
+        entry = cache.get(cache_key)
+        if entry is None:
+            entry = (
+                GeocodeCache.objects.filter(
+                    kind=kind, key=key, expires_at__gt=timezone.now()
+                )
+                .values("result", "expires_at")
+                .first()
+            )
+            if entry is not None:
+                self.remember(cache_key, entry)
+        return entry
+
+    def fetch_and_store(self, kind, key, cache_key, fetch):
+        if not self.limiter.acquire(timeout=RATE_LIMIT_WAIT):
+            logger.warning("Géocodage abandonné (limite de débit): %s", key)
+            return None
+
+        try:
+            result = fetch()
+        except (requests.RequestException, ValueError) as error:
+            # Erreur passagère: rien n'est mis en cache
+            logger.warning("Erreur Nominatim (%s): %s", key, error)
+            return None
+
+        expires_at = timezone.now() + (GEOCODE_TTL if result else GEOCODE_MISS_TTL)
+        GeocodeCache.objects.update_or_create(
+            kind=kind, key=key, defaults={"result": result, "expires_at": expires_at}
+        )
+        self.remember(cache_key, {"result": result, "expires_at": expires_at})
+        return result
+
+    @staticmethod
+    def remember(cache_key, entry):
+        timeout = (entry["expires_at"] - timezone.now()).total_seconds()
+        if timeout > 0:
+            cache.set(cache_key, entry, timeout=timeout)
+
+    def fetch_search(self, text):
+        response = self.session.get(
+            f"{NOMINATIM_URL}/search",
+            params={
+                "q": text,
+                "format": "json",
+                "limit": 5,
+                "countrycodes": "mr",  # Code pays Mauritanie
+                "accept-language": "fr",
+            },
+            timeout=REQUEST_TIMEOUT,
+        )
+        response.raise_for_status()
+        results = response.json()
+        if not results:
+            return None
+        return {
+            "name": results[0].get("display_name", ""),
+            "latitude": float(results[0]["lat"]),
+            "longitude": float(results[0]["lon"]),
+            "type": results[0].get("type", ""),
+            "importance": results[0].get("importance", 0),
+        }
+
+    def fetch_reverse(self, lat, lon):
+        response = self.session.get(
+            f"{NOMINATIM_URL}/reverse",
+            params={
+                "lat": lat,
+                "lon": lon,
+                "format": "json",
+                "zoom": 16,
+                "accept-language": "fr",
+            },
+            timeout=REQUEST_TIMEOUT,
+        )
+        response.raise_for_status()
+        data = response.json()
+        if "error" in data:
+            return None
+        address = data.get("address", {})
+        return {
+            "address": data.get("display_name", ""),
+            "road": address.get("road", ""),
+            "city": address.get("city", ""),
+            "state": address.get("state", ""),
+            "country": address.get("country", ""),
+        }
+
+
+_geocoder = None
+_geocoder_lock = threading.Lock()
+
+
+def get_geocoder():
+    """Géocodeur partagé du processus (session HTTP)"""
+    global _geocoder
+    if _geocoder is None:
+        with _geocoder_lock:
+            if _geocoder is None:
+                _geocoder = Geocoder()
+    return _geocoder
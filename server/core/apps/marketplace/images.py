@@ -0,0 +1,149 @@
+"""
+Variantes redimensionnées des images produits (WebP et JPEG).
+
+Chaque image source (main_image et entrées de `images`) est déclinée en
+plusieurs largeurs, sans métadonnées EXIF, sous un nom dérivé du contenu:
+une variante identique n'est jamais écrite deux fois et peut être mise en
+cache indéfiniment par les navigateurs.
+
+Product.image_variants:
+    {"<nom de la source>": {"webp": {"320": "<nom>", ...}, "jpeg": {...}}}
+"""
+
+import hashlib
+import logging
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from PIL import Image, ImageOps
+
+from .cache import invalidate_tags
+from .models import Product
+
+logger = logging.getLogger(__name__)
+
+VARIANT_WIDTHS = (320, 640, 1280)
+VARIANT_DIRECTORY = "products/variants"
+VARIANT_FORMATS = {
+    "webp": ("WEBP", {"quality": 80, "method": 4}),
+    "jpeg": ("JPEG", {"quality": 82, "optimize": True, "progressive": True}),
+}
+
+
+def image_sources(product):
+    """Noms (stockage) des images du produit"""
+    sources = []
+    if product.main_image:
+        sources.append(product.main_image.name)
+    for image in product.images or []:
+        # Les URL externes ne sont pas hébergées: pas de variantes
+        if isinstance(image, str) and image and "://" not in image:
+            sources.append(image)
+    return sources
+
+
+def missing_variants(product):
+    variants = product.image_variants or {}
+    return [source for source in image_sources(product) if source not in variants]
+
+
+def render_variant(image, width, image_format, options):
+    """Redimensionner et encoder une image; retourne les octets"""
+    if image.width > width:
+        height = round(image.height * width / image.width)
+        image = image.resize((width, height), Image.LANCZOS)
+
+    buffer = BytesIO()
+    # Aucune donnée EXIF n'est transmise à save(): métadonnées supprimées
+    image.save(buffer, image_format, **options)
+    return buffer.getvalue()
+
+
+def generate_variants(source, storage=default_storage):
+    """Générer toutes les variantes d'une image source"""
+    with storage.open(source, "rb") as file:
+        image = Image.open(file)
+        # Appliquer l'orientation EXIF avant de la supprimer
+        image = ImageOps.exif_transpose(image)
+        image = image.convert("RGB")
+
+    # Au moins une variante, même pour une petite image
+    widths = [width for width in VARIANT_WIDTHS if width < image.width]
+    widths.append(min(image.width, VARIANT_WIDTHS[-1]))
+
+    variants = {}
+    for extension, (image_format, options) in VARIANT_FORMATS.items():
+        variants[extension] = {}
+        for width in sorted(set(widths)):
+            content = render_variant(image, width, image_format, options)
+            digest = hashlib.sha256(content).hexdigest()[:20]
+            name = f"{VARIANT_DIRECTORY}/{digest}_{width}.{extension}"
+            if not storage.exists(name):
+                name = storage.save(name, ContentFile(content))
+            variants[extension][str(width)] = name
+    return variants
+
+
+def process_product_images(product_id, force=False):
+    """
+    Générer les variantes manquantes d'un produit et mettre à jour
+    image_variants; retourne le nombre d'images traitées.
+    """
+    product = Product.objects.filter(pk=product_id).first()
+    if product is None:
+        return 0
+
+    existing = {} if force else dict(product.image_variants or {})
+    variants = {}
+    processed = 0
+    for source in image_sources(product):
+        if source in existing:
+            variants[source] = existing[source]
+            continue
+        try:
+            variants[source] = generate_variants(source)
+            processed += 1
+        except (OSError, ValueError) as error:
+            # Fichier absent ou illisible: l'image originale reste servie
+            logger.warning("Variantes impossibles pour %s: %s", source, error)
+
+    # Les sources retirées du produit disparaissent de image_variants
+    if variants != (product.image_variants or {}):
+        Product.objects.filter(pk=product_id).update(image_variants=variants)
+        invalidate_tags("products", f"product:{product_id}")
+    return processed
+
+
+def products_missing_variants(force=False):
+    """Identifiants des produits dont des variantes sont à générer"""
+    products = Product.objects.only("id", "main_image", "images", "image_variants")
+    for product in products.iterator(chunk_size=500):
+        if force or missing_variants(product):
+            yield product.pk
+
+
+def schedule_image_variants(product):
+    """Planifier la génération après validation de la transaction"""
+    from .tasks import generate_product_image_variants
+
+    def enqueue():
+        try:
+            generate_product_image_variants.delay(product.pk)
+        except Exception as error:
+            # Broker indisponible: rattrapé par generate_missing_image_variants
+            logger.warning(
+                "Tâche de variantes non planifiée (%s): %s", product.pk, error
+            )
+
+    transaction.on_commit(enqueue)
+
+
+def srcset(variants, image_format, build_url):
+    """Valeur srcset: "url 320w, url 640w, ..." """
+    widths = variants.get(image_format, {})
+    return ", ".join(
+        f"{build_url(default_storage.url(name))} {width}w"
+        for width, name in sorted(widths.items(), key=lambda item: int(item[0]))
+    )
@@ -0,0 +1,81 @@
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from apps.marketplace.geo import FarmerLocationIndex
+from apps.marketplace.services import OpenStreetMapService
+
+# Emprise approximative de la Mauritanie
+LAT_RANGE = (14.7, 27.3)
+LON_RANGE = (-17.1, -4.8)
+
+
+class Command(BaseCommand):
+    help = "Benchmark de l'index spatial des agriculteurs (données synthétiques)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--farmers", type=int, default=50000)
+        parser.add_argument("--queries", type=int, default=200)
+        parser.add_argument("--radius", type=float, default=50)
+        parser.add_argument("--seed", type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = np.random.default_rng(options["seed"])
+        count = options["farmers"]
+        radius = options["radius"]
+
+        lats = rng.uniform(*LAT_RANGE, size=count)
+        lons = rng.uniform(*LON_RANGE, size=count)
+        ids = np.arange(1, count + 1)
+
+        query_lats = rng.uniform(*LAT_RANGE, size=options["queries"])
+        query_lons = rng.uniform(*LON_RANGE, size=options["queries"])
+
+        # Construction de l'index
+        start = time.perf_counter()
+        index = FarmerLocationIndex()
+        index.build(zip(ids.tolist(), lats.tolist(), lons.tolist()))
+        build_ms = (time.perf_counter() - start) * 1000
+
+        # Ancienne approche: boucle Python sur tous les agriculteurs
+        osm = OpenStreetMapService()
+        farmers = list(zip(ids.tolist(), lats.tolist(), lons.tolist()))
+        loop_samples = min(options["queries"], 20)
+        start = time.perf_counter()
+        expected = []
+        for lat, lon in zip(query_lats[:loop_samples], query_lons[:loop_samples]):
+            matches = [
+                farmer_id
+                for farmer_id, f_lat, f_lon in farmers
+                if osm.calculate_distance(lat, lon, f_lat, f_lon) <= radius
+            ]
+            expected.append(set(matches))
+        loop_ms = (time.perf_counter() - start) * 1000 / loop_samples
+
+        # Index spatial
+        start = time.perf_counter()
+        results = [
+            index.query(lat, lon, radius) for lat, lon in zip(query_lats, query_lons)
+        ]
+        index_ms = (time.perf_counter() - start) * 1000 / len(results)
+
+        mismatches = sum(
+            1
+            for (found_ids, _), matches in zip(results, expected)
+            if set(found_ids.tolist()) != matches
+        )
+
+        # Mises à jour incrémentales
+        start = time.perf_counter()
+        for farmer_id in ids[:1000].tolist():
+            index.upsert(farmer_id, rng.uniform(*LAT_RANGE), rng.uniform(*LON_RANGE))
+        upsert_us = (time.perf_counter() - start) * 1e6 / 1000
+
+        self.stdout.write(f"Agriculteurs: {count}, rayon: {radius} km")
+        self.stdout.write(f"Construction de l'index: {build_ms:.1f} ms")
+        self.stdout.write(f"Boucle Python: {loop_ms:.2f} ms/requête")
+        self.stdout.write(f"Index spatial: {index_ms:.3f} ms/requête")
+        self.stdout.write(f"Accélération: x{loop_ms / index_ms:.0f}")
+        self.stdout.write(f"Mise à jour incrémentale: {upsert_us:.1f} µs")
+        self.stdout.write(f"Résultats divergents: {mismatches}/{loop_samples}")
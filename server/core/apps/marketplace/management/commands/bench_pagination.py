@@ -0,0 +1,117 @@
+import time
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from apps.accounts.models import User
+from apps.marketplace.models import Product
+from betteragri.pagination import KeysetPagination
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark de la liste des produits: page N en pagination par numéro "
+        "de page (COUNT + OFFSET) et en pagination keyset (created_at, id)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--page", type=int, default=500)
+        parser.add_argument("--page-size", type=int, default=20)
+        parser.add_argument("--repeat", type=int, default=20)
+        parser.add_argument(
+            "--seed",
+            type=int,
+            default=0,
+            help="Créer N produits synthétiques (annulés à la fin du benchmark)",
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            if options["seed"]:
+                self.seed_products(options["seed"])
+            self.run_benchmark(options)
+            # Ne rien conserver des données synthétiques
+            transaction.set_rollback(True)
+
+    def seed_products(self, count):
+        farmer = User.objects.create_user(
+            username="bench_pagination_farmer",
+            email="bench_pagination@example.com",
+            password=None,
+            user_type="farmer",
+        )
+        Product.objects.bulk_create(
+            (
+                Product(
+                    farmer=farmer,
+                    name=f"Produit {index}",
+                    description="Benchmark",
+                    price_per_unit=1,
+                    available_quantity=1,
+                    harvest_date=date.today(),
+                    farm_location="Nouakchott",
+                    status="active",
+                    main_image="products/main/bench.jpg",
+                )
+                for index in range(count)
+            ),
+            batch_size=2000,
+        )
+        # auto_now_add: étaler les dates pour un ordre réaliste
+        now = timezone.now()
+        products = list(Product.objects.filter(farmer=farmer).only("id"))
+        for offset, product in enumerate(products):
+            product.created_at = now - timedelta(seconds=offset // 3)
+        Product.objects.bulk_update(products, ["created_at"], batch_size=2000)
+
+    def run_benchmark(self, options):
+        page = options["page"]
+        page_size = options["page_size"]
+        repeat = options["repeat"]
+        ordering = KeysetPagination.ordering
+        queryset = Product.objects.select_related("farmer", "category").order_by(
+            *ordering
+        )
+
+        offset = (page - 1) * page_size
+        total = queryset.count()
+        if total <= offset:
+            self.stderr.write(
+                f"{total} produits: pas assez de lignes pour la page {page}"
+            )
+            return
+
+        # Pagination par numéro de page: COUNT(*) + OFFSET
+        start = time.perf_counter()
+        for _ in range(repeat):
+            queryset.count()
+            offset_rows = list(queryset[offset : offset + page_size])
+        offset_ms = (time.perf_counter() - start) * 1000 / repeat
+
+        # Pagination keyset: position de la dernière ligne de la page précédente
+        paginator = KeysetPagination()
+        paginator.ordering = ordering
+        last = queryset[offset - 1] if offset else None
+        condition = (
+            paginator.after_position(
+                [getattr(last, paginator.field_name(field)) for field in ordering]
+            )
+            if last
+            else None
+        )
+        keyset_queryset = queryset.filter(condition) if condition else queryset
+
+        start = time.perf_counter()
+        for _ in range(repeat):
+            keyset_rows = list(keyset_queryset[: page_size + 1])[:page_size]
+        keyset_ms = (time.perf_counter() - start) * 1000 / repeat
+
+        identical = [row.id for row in offset_rows] == [row.id for row in keyset_rows]
+
+        self.stdout.write(f"Produits: {total}, page {page} ({page_size} par page)")
+        self.stdout.write(f"Numéro de page (COUNT + OFFSET): {offset_ms:.2f} ms")
+        self.stdout.write(f"Keyset (created_at, id): {keyset_ms:.2f} ms")
+        self.stdout.write(f"Accélération: x{offset_ms / keyset_ms:.1f}")
+        self.stdout.write(f"Résultats identiques: {'oui' if identical else 'non'}")
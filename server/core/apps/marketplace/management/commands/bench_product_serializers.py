@@ -0,0 +1,115 @@
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import RequestFactory
+from rest_framework.renderers import JSONRenderer
+
+from apps.accounts.models import User
+from apps.marketplace.models import Product
+from apps.marketplace.serializers import ProductSerializer
+from apps.marketplace.sparse import (
+    compact_data,
+    compact_queryset,
+    narrow_queryset,
+    parse_fields,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark de la sérialisation d'une liste de produits: complète, "
+        "?fields= (champs et colonnes restreints) et ?view=compact (values())"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=100)
+        parser.add_argument("--repeat", type=int, default=20)
+        parser.add_argument("--fields", default="id,name,price_per_unit,unit")
+        parser.add_argument(
+            "--seed",
+            type=int,
+            default=0,
+            help="Créer N produits synthétiques (annulés à la fin du benchmark)",
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            if options["seed"]:
+                self.seed_products(options["seed"])
+            self.run_benchmark(options)
+            # Ne rien conserver des données synthétiques
+            transaction.set_rollback(True)
+
+    def seed_products(self, count):
+        farmer = User.objects.create_user(
+            username="bench_serializers_farmer",
+            email="bench_serializers@example.com",
+            password=None,
+            user_type="farmer",
+            latitude="18.0858",
+            longitude="-15.9785",
+        )
+        Product.objects.bulk_create(
+            (
+                Product(
+                    farmer=farmer,
+                    name=f"Produit {index}",
+                    description="Benchmark " * 20,
+                    price_per_unit=1,
+                    available_quantity=1,
+                    harvest_date=date.today(),
+                    farm_location="Nouakchott",
+                    status="active",
+                    main_image="products/main/bench.jpg",
+                )
+                for index in range(count)
+            ),
+            batch_size=2000,
+        )
+
+    def run_benchmark(self, options):
+        rows = options["rows"]
+        repeat = options["repeat"]
+        fields = parse_fields(options["fields"])
+        request = RequestFactory().get("/api/marketplace/products/")
+        renderer = JSONRenderer()
+
+        queryset = Product.objects.select_related("farmer", "category").order_by(
+            "-created_at", "-id"
+        )
+        if queryset.count() < rows:
+            self.stderr.write(f"Moins de {rows} produits: utiliser --seed")
+            return
+
+        variants = {
+            "complète": lambda: ProductSerializer(
+                queryset[:rows], many=True, context={"request": request}
+            ).data,
+            "?fields=": lambda: ProductSerializer(
+                narrow_queryset(queryset, fields)[:rows],
+                many=True,
+                context={"request": request},
+                fields=fields,
+            ).data,
+            "?view=compact": lambda: compact_data(
+                compact_queryset(queryset)[:rows], request
+            ),
+        }
+
+        self.stdout.write(f"{rows} produits par liste, {repeat} répétitions")
+        self.stdout.write(f"Champs: {', '.join(fields)}")
+        reference = None
+        for name, serialize in variants.items():
+            start = time.perf_counter()
+            for _ in range(repeat):
+                content = renderer.render(serialize())
+            elapsed_ms = (time.perf_counter() - start) * 1000 / repeat
+
+            reference = reference or (elapsed_ms, len(content))
+            self.stdout.write(
+                f"{name:<14} {elapsed_ms:8.2f} ms (x{reference[0] / elapsed_ms:.1f})"
+                f"  {len(content) / 1024:8.1f} Ko"
+                f" ({len(content) / reference[1]:.0%})"
+            )
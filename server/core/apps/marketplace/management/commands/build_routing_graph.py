@@ -0,0 +1,42 @@
+import os
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.marketplace.cache import invalidate_tags
+from apps.marketplace.routing import build_graph, save_graph
+
+
+class Command(BaseCommand):
+    help = (
+        "Construire le graphe routier (CSR) d'un extrait OpenStreetMap "
+        "(.osm, .osm.gz, .osm.bz2) utilisé pour les itinéraires"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Fichier OSM XML")
+        parser.add_argument(
+            "--output",
+            default=settings.ROUTING_GRAPH_PATH,
+            help="Fichier .npz produit (par défaut ROUTING_GRAPH_PATH)",
+        )
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        if not os.path.exists(path):
+            raise CommandError(f"Fichier introuvable: {path}")
+
+        start = time.perf_counter()
+        arrays = build_graph(path)
+        save_graph(arrays, options["output"])
+        # Itinéraires en cache calculés sur l'ancien graphe
+        invalidate_tags("routing")
+
+        self.stdout.write(
+            f"{len(arrays['vertex_lats'])} sommets, "
+            f"{len(arrays['edge_source'])} arêtes, "
+            f"{len(arrays['shape_lats'])} points de forme "
+            f"({os.path.getsize(options['output']) / 1024:.0f} Ko) "
+            f"en {time.perf_counter() - start:.1f} s"
+        )
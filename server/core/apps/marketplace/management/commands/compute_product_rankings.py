@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from apps.marketplace.rankings import RANKING_SIZE, compute_rankings
+
+
+class Command(BaseCommand):
+    help = "Recalculer les classements de produits (en vedette, tendance)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--size", type=int, default=RANKING_SIZE)
+
+    def handle(self, *args, **options):
+        count = compute_rankings(size=options["size"])
+        self.stdout.write(f"{count} classements calculés")
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from apps.marketplace.counters import flush_all_counters
+
+
+class Command(BaseCommand):
+    help = "Écrire en base les compteurs différés (vues, commandes)"
+
+    def handle(self, *args, **options):
+        for key, updated in flush_all_counters().items():
+            self.stdout.write(f"{key}: {updated} lignes mises à jour")
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+
+from apps.marketplace.images import process_product_images, products_missing_variants
+from apps.marketplace.tasks import generate_product_image_variants
+
+
+class Command(BaseCommand):
+    help = "Générer les variantes (WebP/JPEG redimensionnées) des images existantes"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--force", action="store_true", help="Régénérer toutes les variantes"
+        )
+        parser.add_argument(
+            "--async",
+            action="store_true",
+            dest="use_celery",
+            help="Planifier des tâches Celery au lieu de traiter immédiatement",
+        )
+
+    def handle(self, *args, **options):
+        scheduled = processed = 0
+        for product_id in products_missing_variants(force=options["force"]):
+            if options["use_celery"]:
+                generate_product_image_variants.delay(product_id, options["force"])
+                scheduled += 1
+            else:
+                processed += process_product_images(product_id, force=options["force"])
+
+        self.stdout.write(
+            f"{processed} images traitées, {scheduled} produits planifiés"
+        )
@@ -0,0 +1,28 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.marketplace.osm import import_extract
+
+
+class Command(BaseCommand):
+    help = (
+        "Importer les lieux et limites de villes d'un extrait OpenStreetMap "
+        "(.osm, .osm.gz, .osm.bz2): ses tuiles sont servies sans Overpass"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Fichier OSM XML")
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        if not os.path.exists(path):
+            raise CommandError(f"Fichier introuvable: {path}")
+
+        start = time.perf_counter()
+        places, boundaries, tiles = import_extract(path)
+        self.stdout.write(
+            f"{places} lieux, {boundaries} limites de villes, {tiles} tuiles "
+            f"en {time.perf_counter() - start:.1f} s"
+        )
@@ -0,0 +1,55 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from apps.accounts.models import User
+from apps.marketplace.geocoding import get_geocoder, normalize_text
+from apps.marketplace.models import GeocodeCache
+from apps.marketplace.services import MauritaniaLocationService
+
+
+class Command(BaseCommand):
+    help = (
+        "Remplir le cache de géocodage avec toutes les villes et wilayas "
+        "connues (1 requête/s vers Nominatim, entrées en cache ignorées)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--refresh",
+            action="store_true",
+            help="Interroger Nominatim même pour les entrées en cache",
+        )
+        parser.add_argument(
+            "--purge",
+            action="store_true",
+            help="Supprimer d'abord les entrées expirées",
+        )
+
+    def handle(self, *args, **options):
+        if options["purge"]:
+            deleted, _ = GeocodeCache.objects.filter(
+                expires_at__lte=timezone.now()
+            ).delete()
+            self.stdout.write(f"{deleted} entrées expirées supprimées")
+
+        names = {}
+        for name in (
+            [value for value, _ in User.WILAYAS + User.CITIES]
+            + list(MauritaniaLocationService.MAURITANIA_CITIES)
+            + list(User.objects.exclude(city="").values_list("city", flat=True))
+        ):
+            names.setdefault(normalize_text(name), name)
+
+        geocoder = get_geocoder()
+        found = 0
+        start = time.perf_counter()
+        for name in names.values():
+            if geocoder.search(name, refresh=options["refresh"]):
+                found += 1
+
+        self.stdout.write(
+            f"{len(names)} lieux, {found} géocodés "
+            f"en {time.perf_counter() - start:.1f} s"
+        )
@@ -0,0 +1,87 @@
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Avg, Count, Q
+
+from apps.marketplace.cache import invalidate_tags
+from apps.marketplace.models import Product, ProductReview
+
+
+class Command(BaseCommand):
+    help = (
+        "Recalculer les agrégats de notes (moyenne, nombre, histogramme) des produits"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        rating_fields = [Product.rating_field(rating) for rating in range(1, 6)]
+
+        stats = ProductReview.objects.values("product_id").annotate(
+            review_count=Count("id"),
+            average_rating=Avg("rating"),
+            **{
+                Product.rating_field(rating): Count("id", filter=Q(rating=rating))
+                for rating in range(1, 6)
+            },
+        )
+
+        updated = 0
+        with transaction.atomic():
+            # Produits dont les agrégats peuvent changer: notés avant ou après
+            changed = set(
+                Product.objects.filter(review_count__gt=0).values_list("pk", flat=True)
+            )
+
+            # Remettre à zéro, puis réécrire les produits ayant des avis
+            Product.objects.update(
+                average_rating=0,
+                review_count=0,
+                **{field: 0 for field in rating_fields},
+            )
+
+            batch = []
+            for row in stats.order_by("product_id").iterator(chunk_size=batch_size):
+                product = Product(
+                    id=row["product_id"],
+                    review_count=row["review_count"],
+                    average_rating=Decimal(str(round(row["average_rating"], 2))),
+                    **{field: row[field] for field in rating_fields},
+                )
+                batch.append(product)
+                changed.add(product.id)
+
+                if len(batch) >= batch_size:
+                    updated += self._flush(batch, rating_fields)
+
+            # Listes et détails en cache, après validation
+            transaction.on_commit(
+                lambda: invalidate_tags(
+                    "products", *(f"product:{product_id}" for product_id in changed)
+                )
+            )
+
+            updated += self._flush(batch, rating_fields)
+
+            # Listes et détails en cache, après validation
+            transaction.on_commit(
+                lambda: invalidate_tags(
+                    "products", *(f"product:{product_id}" for product_id in changed)
+                )
+            )
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Agrégats de notes recalculés pour {updated} produits")
+        )
+
+    def _flush(self, batch, rating_fields):
+        count = len(batch)
+        if batch:
+            Product.objects.bulk_update(
+                batch, ["average_rating", "review_count", *rating_fields]
+            )
+            batch.clear()
+        return count
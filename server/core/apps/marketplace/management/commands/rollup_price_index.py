@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from apps.marketplace.prices import rollup_price_index
+
+
+class Command(BaseCommand):
+    help = (
+        "Calculer l'indice de prix journalier (par défaut depuis le dernier "
+        "jour calculé jusqu'à aujourd'hui)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--start", help="Premier jour (AAAA-MM-JJ)")
+        parser.add_argument("--end", help="Dernier jour (AAAA-MM-JJ)")
+
+    def handle(self, *args, **options):
+        dates = {}
+        for name in ("start", "end"):
+            if options[name]:
+                dates[name] = parse_date(options[name])
+                if dates[name] is None:
+                    raise CommandError(f"Date invalide: {options[name]}")
+
+        days = rollup_price_index(**dates)
+        self.stdout.write(f"{days} jours calculés")
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from apps.marketplace.alerts import process_wishlist_alerts
+
+
+class Command(BaseCommand):
+    help = (
+        "Envoyer les alertes de liste de souhaits (baisse de prix, retour en "
+        "stock) pour les produits modifiés depuis le dernier passage"
+    )
+
+    def handle(self, *args, **options):
+        users, products = process_wishlist_alerts()
+        self.stdout.write(
+            f"{products} produits modifiés, {users} utilisateurs notifiés"
+        )
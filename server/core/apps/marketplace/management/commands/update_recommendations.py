@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.marketplace.recommendations import update_recommendations
+
+
+class Command(BaseCommand):
+    help = (
+        "Intégrer les commandes livrées depuis le dernier calcul aux "
+        "recommandations (achetés ensemble, similaires)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--rebuild",
+            action="store_true",
+            help="Recalculer à partir de toutes les commandes livrées",
+        )
+
+    def handle(self, *args, **options):
+        batch = update_recommendations(rebuild=options["rebuild"])
+        if batch is None:
+            raise CommandError("Un calcul des recommandations est déjà en cours")
+        self.stdout.write(
+            f"{batch.order_count} commandes intégrées, "
+            f"{batch.product_count} produits recalculés"
+        )
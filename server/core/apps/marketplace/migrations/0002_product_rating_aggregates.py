@@ -0,0 +1,73 @@
+# Generated by Django 6.0.1 on 2026-10-19 09:40
+
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import Avg, Count, Q
+
+
+def backfill_rating_aggregates(apps, schema_editor):
+    Product = apps.get_model("marketplace", "Product")
+    ProductReview = apps.get_model("marketplace", "ProductReview")
+
+    stats = ProductReview.objects.values("product_id").annotate(
+        review_count=Count("id"),
+        average_rating=Avg("rating"),
+        **{
+            f"rating_{rating}_count": Count("id", filter=Q(rating=rating))
+            for rating in range(1, 6)
+        },
+    )
+
+    for row in stats.iterator():
+        Product.objects.filter(pk=row.pop("product_id")).update(
+            average_rating=Decimal(str(round(row.pop("average_rating"), 2))), **row
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("marketplace", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="product",
+            name="average_rating",
+            field=models.DecimalField(
+                decimal_places=2, default=0, max_digits=3, verbose_name="Note moyenne"
+            ),
+        ),
+        migrations.AddField(
+            model_name="product",
+            name="rating_1_count",
+            field=models.PositiveIntegerField(default=0, verbose_name="Avis 1★"),
+        ),
+        migrations.AddField(
+            model_name="product",
+            name="rating_2_count",
+            field=models.PositiveIntegerField(default=0, verbose_name="Avis 2★"),
+        ),
+        migrations.AddField(
+            model_name="product",
+            name="rating_3_count",
+            field=models.PositiveIntegerField(default=0, verbose_name="Avis 3★"),
+        ),
+        migrations.AddField(
+            model_name="product",
+            name="rating_4_count",
+            field=models.PositiveIntegerField(default=0, verbose_name="Avis 4★"),
+        ),
+        migrations.AddField(
+            model_name="product",
+            name="rating_5_count",
+            field=models.PositiveIntegerField(default=0, verbose_name="Avis 5★"),
+        ),
+        migrations.AddField(
+            model_name="product",
+            name="review_count",
+            field=models.PositiveIntegerField(default=0, verbose_name="Nombre d'avis"),
+        ),
+        migrations.RunPython(backfill_rating_aggregates, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 6.0.1 on 2026-10-19 11:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("marketplace", "0002_product_rating_aggregates"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="product",
+            index=models.Index(
+                fields=["-created_at", "-id"], name="marketplace_created_ccb58d_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,67 @@
+# Generated by Django 6.0.1 on 2026-10-19 12:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("marketplace", "0003_product_keyset_index"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ProductRanking",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "kind",
+                    models.CharField(
+                        choices=[("featured", "En vedette"), ("trending", "Tendance")],
+                        max_length=20,
+                        verbose_name="Type",
+                    ),
+                ),
+                (
+                    "scope",
+                    models.CharField(
+                        choices=[
+                            ("global", "Global"),
+                            ("wilaya", "Wilaya"),
+                            ("category", "Catégorie"),
+                        ],
+                        max_length=20,
+                        verbose_name="Périmètre",
+                    ),
+                ),
+                (
+                    "scope_value",
+                    models.CharField(
+                        blank=True,
+                        default="",
+                        max_length=100,
+                        verbose_name="Valeur du périmètre",
+                    ),
+                ),
+                (
+                    "product_ids",
+                    models.JSONField(default=list, verbose_name="Produits classés"),
+                ),
+                ("scores", models.JSONField(default=list, verbose_name="Scores")),
+                ("computed_at", models.DateTimeField(verbose_name="Date de calcul")),
+            ],
+            options={
+                "verbose_name": "Classement de produits",
+                "verbose_name_plural": "Classements de produits",
+                "unique_together": {("kind", "scope", "scope_value")},
+            },
+        ),
+    ]
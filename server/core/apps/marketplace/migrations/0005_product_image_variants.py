@@ -0,0 +1,20 @@
+# Generated by Django 6.0.1 on 2026-10-19 12:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("marketplace", "0004_product_ranking"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="product",
+            name="image_variants",
+            field=models.JSONField(
+                blank=True, default=dict, verbose_name="Variantes des images"
+            ),
+        ),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 6.0.1 on 2026-10-19 16:30
+
+from django.db import migrations, models
+
+
+def backfill_category_paths(apps, schema_editor):
+    Category = apps.get_model("marketplace", "Category")
+
+    parents = dict(Category.objects.values_list("id", "parent_id"))
+    paths = {}
+
+    def build_path(category_id, seen=()):
+        if category_id not in paths:
+            parent_id = parents.get(category_id)
+            # Cycle éventuel dans les données existantes: racine
+            if parent_id is None or parent_id in seen:
+                paths[category_id] = f"{category_id}/"
+            else:
+                parent_path = build_path(parent_id, seen + (category_id,))
+                paths[category_id] = f"{parent_path}{category_id}/"
+        return paths[category_id]
+
+    categories = list(Category.objects.only("id"))
+    for category in categories:
+        category.path = build_path(category.id)
+        category.depth = category.path.count("/") - 1
+    Category.objects.bulk_update(categories, ["path", "depth"], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("marketplace", "0005_product_image_variants"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="category",
+            name="depth",
+            field=models.PositiveSmallIntegerField(
+                default=0, editable=False, verbose_name="Profondeur"
+            ),
+        ),
+        migrations.AddField(
+            model_name="category",
+            name="path",
+            field=models.CharField(
+                default="", editable=False, max_length=255, verbose_name="Chemin"
+            ),
+        ),
+        migrations.RunPython(backfill_category_paths, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="category",
+            index=models.Index(
+                fields=["path"],
+                name="category_path_idx",
+                opclasses=["varchar_pattern_ops"],
+            ),
+        ),
+    ]
@@ -0,0 +1,168 @@
+# Generated by Django 6.0.1 on 2026-10-19 17:05
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+def record_current_prices(apps, schema_editor):
+    # Point de départ de l'historique: prix actuel de chaque produit
+    Product = apps.get_model("marketplace", "Product")
+    ProductPriceHistory = apps.get_model("marketplace", "ProductPriceHistory")
+
+    now = django.utils.timezone.now()
+    products = Product.objects.values_list(
+        "id", "price_per_unit", "unit", "category_id", "farmer__wilaya"
+    )
+    ProductPriceHistory.objects.bulk_create(
+        (
+            ProductPriceHistory(
+                product_id=product_id,
+                price_per_unit=price,
+                unit=unit,
+                category_id=category_id,
+                wilaya=wilaya or "",
+                recorded_at=now,
+            )
+            for product_id, price, unit, category_id, wilaya in products.iterator()
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("marketplace", "0006_category_tree"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ProductPriceHistory",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "price_per_unit",
+                    models.DecimalField(
+                        decimal_places=2, max_digits=10, verbose_name="Prix par unité"
+                    ),
+                ),
+                ("unit", models.CharField(max_length=50, verbose_name="Unité")),
+                (
+                    "wilaya",
+                    models.CharField(
+                        blank=True, default="", max_length=50, verbose_name="Wilaya"
+                    ),
+                ),
+                (
+                    "recorded_at",
+                    models.DateTimeField(
+                        db_index=True,
+                        default=django.utils.timezone.now,
+                        verbose_name="Date",
+                    ),
+                ),
+                (
+                    "category",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="+",
+                        to="marketplace.category",
+                        verbose_name="Catégorie",
+                    ),
+                ),
+                (
+                    "product",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="price_history",
+                        to="marketplace.product",
+                        verbose_name="Produit",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Historique de prix",
+                "verbose_name_plural": "Historiques de prix",
+                "ordering": ["-recorded_at"],
+                "indexes": [
+                    models.Index(
+                        fields=["product", "-recorded_at"],
+                        name="price_history_product_idx",
+                    )
+                ],
+            },
+        ),
+        migrations.CreateModel(
+            name="PriceIndexDaily",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("day", models.DateField(verbose_name="Jour")),
+                (
+                    "wilaya",
+                    models.CharField(
+                        blank=True, default="", max_length=50, verbose_name="Wilaya"
+                    ),
+                ),
+                ("unit", models.CharField(max_length=50, verbose_name="Unité")),
+                (
+                    "min_price",
+                    models.DecimalField(
+                        decimal_places=2, max_digits=10, verbose_name="Prix minimum"
+                    ),
+                ),
+                (
+                    "median_price",
+                    models.DecimalField(
+                        decimal_places=2, max_digits=10, verbose_name="Prix médian"
+                    ),
+                ),
+                (
+                    "max_price",
+                    models.DecimalField(
+                        decimal_places=2, max_digits=10, verbose_name="Prix maximum"
+                    ),
+                ),
+                (
+                    "product_count",
+                    models.PositiveIntegerField(verbose_name="Nombre de produits"),
+                ),
+                (
+                    "category",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="marketplace.category",
+                        verbose_name="Catégorie",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Indice de prix journalier",
+                "verbose_name_plural": "Indices de prix journaliers",
+                "ordering": ["day"],
+                "unique_together": {("category", "wilaya", "unit", "day")},
+            },
+        ),
+        migrations.RunPython(record_current_prices, migrations.RunPython.noop),
+    ]
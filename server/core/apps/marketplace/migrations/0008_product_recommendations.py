@@ -0,0 +1,142 @@
+# Generated by Django 6.0.1 on 2026-10-19 17:40
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("marketplace", "0007_price_history"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RecommendationBatch",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "processed_until",
+                    models.DateTimeField(verbose_name="Commandes livrées jusqu'au"),
+                ),
+                (
+                    "order_count",
+                    models.PositiveIntegerField(default=0, verbose_name="Commandes"),
+                ),
+                (
+                    "product_count",
+                    models.PositiveIntegerField(default=0, verbose_name="Produits"),
+                ),
+                (
+                    "full_rebuild",
+                    models.BooleanField(default=False, verbose_name="Recalcul complet"),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(auto_now_add=True, verbose_name="Date"),
+                ),
+            ],
+            options={
+                "verbose_name": "Calcul des recommandations",
+                "verbose_name_plural": "Calculs des recommandations",
+                "get_latest_by": "processed_until",
+            },
+        ),
+        migrations.CreateModel(
+            name="ProductRecommendation",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "kind",
+                    models.CharField(
+                        choices=[
+                            ("bought_together", "Souvent achetés ensemble"),
+                            ("similar", "Similaires"),
+                        ],
+                        max_length=20,
+                        verbose_name="Type",
+                    ),
+                ),
+                (
+                    "product_ids",
+                    models.JSONField(default=list, verbose_name="Produits recommandés"),
+                ),
+                ("scores", models.JSONField(default=list, verbose_name="Scores")),
+                ("computed_at", models.DateTimeField(verbose_name="Date de calcul")),
+                (
+                    "product",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="recommendations",
+                        to="marketplace.product",
+                        verbose_name="Produit",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Recommandation de produits",
+                "verbose_name_plural": "Recommandations de produits",
+                "unique_together": {("product", "kind")},
+            },
+        ),
+        migrations.CreateModel(
+            name="ProductCoPurchase",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "count",
+                    models.PositiveIntegerField(default=0, verbose_name="Commandes"),
+                ),
+                (
+                    "product_a",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="marketplace.product",
+                        verbose_name="Produit A",
+                    ),
+                ),
+                (
+                    "product_b",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="marketplace.product",
+                        verbose_name="Produit B",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Achat conjoint",
+                "verbose_name_plural": "Achats conjoints",
+                "indexes": [
+                    models.Index(fields=["product_b"], name="copurchase_product_b_idx")
+                ],
+                "unique_together": {("product_a", "product_b")},
+            },
+        ),
+    ]
@@ -0,0 +1,92 @@
+# Generated by Django 6.0.1 on 2026-10-19 18:10
+
+from django.db import migrations, models
+from django.db.models import Exists, OuterRef, Subquery
+
+
+def snapshot_wishlists(apps, schema_editor):
+    # Point de départ des alertes: état actuel des produits
+    Product = apps.get_model("marketplace", "Product")
+    Wishlist = apps.get_model("marketplace", "Wishlist")
+
+    product = Product.objects.filter(pk=OuterRef("product_id"))
+    Wishlist.objects.update(
+        notified_price=Subquery(product.values("price_per_unit")[:1]),
+        notified_in_stock=Exists(
+            product.filter(status="active", available_quantity__gt=0)
+        ),
+    )
+
+
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("marketplace", "0008_product_recommendations"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="wishlist",
+            name="notified_in_stock",
+            field=models.BooleanField(default=True, verbose_name="En stock"),
+        ),
+        migrations.AddField(
+            model_name="wishlist",
+            name="notified_price",
+            field=models.DecimalField(
+                blank=True,
+                decimal_places=2,
+                max_digits=10,
+                null=True,
+                verbose_name="Prix notifié",
+            ),
+        ),
+        migrations.CreateModel(
+            name="ProductChange",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "kind",
+                    models.CharField(
+                        choices=[("price", "Prix"), ("stock", "Stock")],
+                        max_length=10,
+                        verbose_name="Type",
+                    ),
+                ),
+                (
+                    "changed_at",
+                    models.DateTimeField(
+                        db_index=True,
+                        default=django.utils.timezone.now,
+                        verbose_name="Date",
+                    ),
+                ),
+                (
+                    "product",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="marketplace.product",
+                        verbose_name="Produit",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Changement de produit",
+                "verbose_name_plural": "Changements de produits",
+            },
+        ),
+        migrations.RunPython(snapshot_wishlists, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 6.0.1 on 2026-10-19 18:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("marketplace", "0009_wishlist_alerts"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="GeocodeCache",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "kind",
+                    models.CharField(
+                        choices=[
+                            ("search", "Recherche"),
+                            ("reverse", "Géocodage inverse"),
+                        ],
+                        max_length=10,
+                        verbose_name="Type",
+                    ),
+                ),
+                ("key", models.CharField(max_length=255, verbose_name="Clé")),
+                (
+                    "result",
+                    models.JSONField(blank=True, null=True, verbose_name="Résultat"),
+                ),
+                (
+                    "expires_at",
+                    models.DateTimeField(db_index=True, verbose_name="Expiration"),
+                ),
+                (
+                    "updated_at",
+                    models.DateTimeField(auto_now=True, verbose_name="Mise à jour"),
+                ),
+            ],
+            options={
+                "verbose_name": "Géocodage en cache",
+                "verbose_name_plural": "Géocodages en cache",
+                "unique_together": {("kind", "key")},
+            },
+        ),
+    ]
@@ -0,0 +1,122 @@
+# Generated by Django 6.0.1 on 2026-10-19 19:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("marketplace", "0010_geocode_cache"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="OsmBoundary",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "key",
+                    models.CharField(
+                        max_length=255, unique=True, verbose_name="Nom normalisé"
+                    ),
+                ),
+                ("name", models.CharField(max_length=255, verbose_name="Nom")),
+                ("data", models.JSONField(verbose_name="Données")),
+                (
+                    "source",
+                    models.CharField(
+                        choices=[("overpass", "Overpass"), ("extract", "Extrait OSM")],
+                        max_length=10,
+                        verbose_name="Source",
+                    ),
+                ),
+                ("fetched_at", models.DateTimeField(verbose_name="Chargée le")),
+                (
+                    "expires_at",
+                    models.DateTimeField(
+                        blank=True, null=True, verbose_name="Expiration"
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Limite de ville OSM",
+                "verbose_name_plural": "Limites de villes OSM",
+            },
+        ),
+        migrations.CreateModel(
+            name="OsmTile",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("tile_lat", models.IntegerField(verbose_name="Ligne")),
+                ("tile_lon", models.IntegerField(verbose_name="Colonne")),
+                (
+                    "source",
+                    models.CharField(
+                        choices=[("overpass", "Overpass"), ("extract", "Extrait OSM")],
+                        max_length=10,
+                        verbose_name="Source",
+                    ),
+                ),
+                ("fetched_at", models.DateTimeField(verbose_name="Chargée le")),
+                (
+                    "expires_at",
+                    models.DateTimeField(
+                        blank=True, null=True, verbose_name="Expiration"
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Tuile OSM",
+                "verbose_name_plural": "Tuiles OSM",
+                "unique_together": {("tile_lat", "tile_lon")},
+            },
+        ),
+        migrations.CreateModel(
+            name="OsmPlace",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("osm_type", models.CharField(max_length=10, verbose_name="Type OSM")),
+                ("osm_id", models.BigIntegerField(verbose_name="Identifiant OSM")),
+                ("name", models.CharField(max_length=255, verbose_name="Nom")),
+                ("kind", models.CharField(max_length=50, verbose_name="Type")),
+                ("latitude", models.FloatField(verbose_name="Latitude")),
+                ("longitude", models.FloatField(verbose_name="Longitude")),
+                ("tile_lat", models.IntegerField(verbose_name="Ligne")),
+                ("tile_lon", models.IntegerField(verbose_name="Colonne")),
+            ],
+            options={
+                "verbose_name": "Lieu OSM",
+                "verbose_name_plural": "Lieux OSM",
+                "indexes": [
+                    models.Index(
+                        fields=["tile_lat", "tile_lon"], name="osmplace_tile_idx"
+                    )
+                ],
+                "unique_together": {("osm_type", "osm_id")},
+            },
+        ),
+    ]
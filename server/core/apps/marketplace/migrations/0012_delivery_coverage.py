@@ -0,0 +1,75 @@
+# Generated by Django 6.0.1 on 2026-10-19 19:40
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def build_coverage(apps, schema_editor):
+    # Fonction pure (géométrie), indépendante de l'état des modèles
+    from apps.marketplace.coverage import COVERAGE_STATUSES, coverage_cells
+
+    Product = apps.get_model("marketplace", "Product")
+    DeliveryCoverageCell = apps.get_model("marketplace", "DeliveryCoverageCell")
+
+    products = Product.objects.filter(
+        status__in=COVERAGE_STATUSES,
+        delivery_radius__gt=0,
+        farmer__latitude__isnull=False,
+        farmer__longitude__isnull=False,
+    ).values_list("id", "delivery_radius", "farmer__latitude", "farmer__longitude")
+    for product_id, radius, lat, lon in products.iterator():
+        DeliveryCoverageCell.objects.bulk_create(
+            [
+                DeliveryCoverageCell(geohash=geohash, product_id=product_id, full=full)
+                for geohash, full in coverage_cells(
+                    float(lat), float(lon), float(radius)
+                )
+            ],
+            batch_size=1000,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("marketplace", "0011_osm_tiles"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DeliveryCoverageCell",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("geohash", models.CharField(max_length=12, verbose_name="Geohash")),
+                (
+                    "full",
+                    models.BooleanField(
+                        default=False, verbose_name="Entièrement couverte"
+                    ),
+                ),
+                (
+                    "product",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="coverage_cells",
+                        to="marketplace.product",
+                        verbose_name="Produit",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Cellule de couverture de livraison",
+                "verbose_name_plural": "Cellules de couverture de livraison",
+                "unique_together": {("geohash", "product")},
+            },
+        ),
+        migrations.RunPython(build_coverage, migrations.RunPython.noop),
+    ]
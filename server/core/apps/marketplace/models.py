@@ -1,8 +1,14 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Case, ExpressionWrapper, F, Q, Value, When
+from django.db.models.functions import Concat, Substr
+from django.db.models.lookups import GreaterThan, LessThanOrEqual
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from django.core.validators import MinValueValidator, MaxValueValidator
 from decimal import Decimal
 
+from .cache import invalidate_tags
+
 
 class Category(models.Model):
     name = models.CharField(max_length=100, verbose_name="Nom")
@@ -19,14 +25,69 @@ class Category(models.Model):
         verbose_name="Catégorie parente",
     )
 
+    # Chemin matérialisé "1/4/9/" (ids des ancêtres puis de la catégorie)
+    path = models.CharField(
+        max_length=255, default="", editable=False, verbose_name="Chemin"
+    )
+    depth = models.PositiveSmallIntegerField(
+        default=0, editable=False, verbose_name="Profondeur"
+    )
+
     class Meta:
         verbose_name = "Catégorie"
         verbose_name_plural = "Catégories"
         ordering = ["name"]
+        indexes = [
+            # LIKE 'chemin%' indexé (descendants)
+            models.Index(
+                fields=["path"],
+                name="category_path_idx",
+                opclasses=["varchar_pattern_ops"],
+            ),
+        ]
 
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        # Une seule transaction: les tags "categories" et "category:<pk>"
+        # (post_save, à la validation) ne changent qu'une fois le chemin écrit
+        with transaction.atomic():
+            # Chemins lus en base: les instances en mémoire peuvent être périmées
+            paths = Category.objects.values_list("path", flat=True)
+            old_path = (paths.filter(pk=self.pk).first() or "") if self.pk else ""
+            parent_path = (
+                (paths.filter(pk=self.parent_id).first() or "")
+                if self.parent_id
+                else ""
+            )
+            if old_path and parent_path.startswith(old_path):
+                raise ValueError("Une catégorie ne peut pas être sa propre descendante")
+
+            super().save(*args, **kwargs)
+
+            new_path = f"{parent_path}{self.pk}/"
+            new_depth = new_path.count("/") - 1
+            self.path, self.depth = new_path, new_depth
+
+            Category.objects.filter(pk=self.pk).update(path=new_path, depth=new_depth)
+            if old_path:
+                # Déplacer tout le sous-arbre en une requête
+                old_depth = old_path.count("/") - 1
+                Category.objects.filter(path__startswith=old_path).exclude(
+                    pk=self.pk
+                ).update(
+                    path=Concat(Value(new_path), Substr("path", len(old_path) + 1)),
+                    depth=F("depth") + (new_depth - old_depth),
+                )
+
+    def descendants(self, include_self=True):
+        """Sous-arbre de la catégorie, en une requête indexée"""
+        queryset = Category.objects.filter(path__startswith=self.path)
+        if not include_self:
+            queryset = queryset.exclude(pk=self.pk)
+        return queryset
+
 
 class Product(models.Model):
     class ProductStatus(models.TextChoices):
@@ -115,6 +176,9 @@ class Product(models.Model):
     images = models.JSONField(
         default=list, blank=True, verbose_name="Images supplémentaires"
     )
+    image_variants = models.JSONField(
+        default=dict, blank=True, verbose_name="Variantes des images"
+    )
 
     # Statistiques
     views_count = models.PositiveIntegerField(default=0, verbose_name="Nombre de vues")
@@ -122,6 +186,17 @@ class Product(models.Model):
         default=0, verbose_name="Nombre de commandes"
     )
 
+    # Notes (dénormalisées, maintenues à chaque création/modification d'avis)
+    average_rating = models.DecimalField(
+        max_digits=3, decimal_places=2, default=0, verbose_name="Note moyenne"
+    )
+    review_count = models.PositiveIntegerField(default=0, verbose_name="Nombre d'avis")
+    rating_1_count = models.PositiveIntegerField(default=0, verbose_name="Avis 1★")
+    rating_2_count = models.PositiveIntegerField(default=0, verbose_name="Avis 2★")
+    rating_3_count = models.PositiveIntegerField(default=0, verbose_name="Avis 3★")
+    rating_4_count = models.PositiveIntegerField(default=0, verbose_name="Avis 4★")
+    rating_5_count = models.PositiveIntegerField(default=0, verbose_name="Avis 5★")
+
     # Horodatage
     created_at = models.DateTimeField(
         auto_now_add=True, verbose_name="Date de création"
@@ -134,6 +209,10 @@ class Product(models.Model):
         verbose_name = "Produit"
         verbose_name_plural = "Produits"
         ordering = ["-created_at"]
+        indexes = [
+            # Pagination keyset (created_at, id)
+            models.Index(fields=["-created_at", "-id"]),
+        ]
 
     def __str__(self):
         return f"{self.name} - {self.farmer.username}"
@@ -143,16 +222,158 @@ class Product(models.Model):
         return self.status == self.ProductStatus.ACTIVE and self.available_quantity > 0
 
     def reserve_quantity(self, quantity: Decimal) -> bool:
-        if self.available_quantity < quantity:
+        if not self.apply_stock_change(self.pk, delta=-quantity):
             return False
 
-        self.available_quantity -= quantity
-        self.save(update_fields=["available_quantity"])
+        self.refresh_from_db(fields=["available_quantity", "status"])
         return True
 
     def release_quantity(self, quantity: Decimal):
-        self.available_quantity += quantity
-        self.save(update_fields=["available_quantity"])
+        self.apply_stock_change(self.pk, delta=quantity)
+        self.refresh_from_db(fields=["available_quantity", "status"])
+
+    @classmethod
+    def apply_stock_change(cls, product_id, delta=None, absolute=None, queryset=None):
+        """
+        Modifier le stock en un seul UPDATE conditionnel, sans lecture
+        préalable: available_quantity + delta (refusé si le stock deviendrait
+        négatif) ou valeur absolue. Le statut suit dans la même requête
+        (épuisé à 0, réactivé si épuisé et de nouveau en stock).
+        Retourne True si le produit a été modifié.
+        """
+        products = (queryset if queryset is not None else cls.objects).filter(
+            pk=product_id
+        )
+
+        if absolute is not None:
+            quantity = Value(
+                Decimal(absolute),
+                output_field=models.DecimalField(max_digits=10, decimal_places=2),
+            )
+        else:
+            delta = Decimal(delta)
+            quantity = F("available_quantity") + delta
+            if delta < 0:
+                products = products.filter(available_quantity__gte=-delta)
+
+        updated = products.update(
+            available_quantity=quantity, status=cls.stock_status_expression(quantity)
+        )
+
+        if updated:
+            # Après validation: une lecture concurrente ne doit pas remettre en
+            # cache l'ancien stock sous la nouvelle version des tags
+            transaction.on_commit(
+                lambda: invalidate_tags("products", f"product:{product_id}")
+            )
+            ProductChange.objects.create(
+                product_id=product_id, kind=ProductChange.Kind.STOCK
+            )
+        return bool(updated)
+
+    @classmethod
+    def stock_status_expression(cls, quantity):
+        """Statut suivant le nouveau stock: épuisé à 0, réactivé si épuisé"""
+        return Case(
+            When(LessThanOrEqual(quantity, 0), then=Value(cls.ProductStatus.SOLD_OUT)),
+            When(
+                Q(status=cls.ProductStatus.SOLD_OUT) & GreaterThan(quantity, 0),
+                then=Value(cls.ProductStatus.ACTIVE),
+            ),
+            default=F("status"),
+        )
+
+    @classmethod
+    def reserve_stock(cls, quantities):
+        """
+        Réserver le stock de plusieurs produits ({id: quantité}) en un seul
+        UPDATE. Les lignes sont d'abord verrouillées dans l'ordre des ids,
+        sans interblocage entre commandes concurrentes. Retourne les ids dont
+        le stock est insuffisant; dans ce cas aucun stock n'est modifié.
+        """
+        with transaction.atomic():
+            available = dict(
+                cls.objects.select_for_update()
+                .filter(pk__in=quantities)
+                .order_by("pk")
+                .values_list("pk", "available_quantity")
+            )
+            short = [
+                product_id
+                for product_id, quantity in quantities.items()
+                if available.get(product_id, 0) < quantity
+            ]
+            if short:
+                return short
+
+            quantity = F("available_quantity") - Case(
+                *(
+                    When(pk=product_id, then=Value(Decimal(quantity)))
+                    for product_id, quantity in quantities.items()
+                ),
+                output_field=models.DecimalField(max_digits=10, decimal_places=2),
+            )
+            cls.objects.filter(pk__in=quantities).update(
+                available_quantity=quantity,
+                status=cls.stock_status_expression(quantity),
+            )
+            ProductChange.objects.bulk_create(
+                ProductChange(product_id=product_id, kind=ProductChange.Kind.STOCK)
+                for product_id in quantities
+            )
+
+        tags = ["products", *(f"product:{product_id}" for product_id in quantities)]
+        transaction.on_commit(lambda: invalidate_tags(*tags))
+        return []
+
+    @staticmethod
+    def rating_field(rating: int) -> str:
+        return f"rating_{rating}_count"
+
+    @property
+    def rating_histogram(self):
+        return {
+            rating: getattr(self, self.rating_field(rating)) for rating in range(1, 6)
+        }
+
+    @classmethod
+    def average_rating_expression(cls):
+        """Note moyenne calculée en SQL à partir de l'histogramme"""
+        weighted_sum = sum(
+            (F(cls.rating_field(rating)) * rating for rating in range(2, 6)),
+            F(cls.rating_field(1)),
+        )
+        return Case(
+            When(review_count=0, then=Value(Decimal("0"))),
+            default=ExpressionWrapper(
+                weighted_sum * Value(1.0) / F("review_count"),
+                output_field=models.DecimalField(max_digits=3, decimal_places=2),
+            ),
+        )
+
+    @classmethod
+    def apply_rating_change(cls, product_id, added=None, removed=None):
+        """
+        Répercuter l'ajout et/ou le retrait d'une note sur les agrégats
+        du produit, sans relire les avis.
+        """
+        if added == removed:
+            return
+
+        updates = {}
+        if added:
+            updates[cls.rating_field(added)] = F(cls.rating_field(added)) + 1
+        if removed:
+            updates[cls.rating_field(removed)] = F(cls.rating_field(removed)) - 1
+
+        count_delta = (1 if added else 0) - (1 if removed else 0)
+        if count_delta:
+            updates["review_count"] = F("review_count") + count_delta
+
+        with transaction.atomic():
+            products = cls.objects.filter(pk=product_id)
+            products.update(**updates)
+            products.update(average_rating=cls.average_rating_expression())
 
 
 class ProductReview(models.Model):
@@ -211,6 +432,16 @@ class Wishlist(models.Model):
 
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="Date d'ajout")
 
+    # Dernier état connu de l'utilisateur (ajout ou dernière alerte)
+    notified_price = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        null=True,
+        blank=True,
+        verbose_name="Prix notifié",
+    )
+    notified_in_stock = models.BooleanField(default=True, verbose_name="En stock")
+
     class Meta:
         verbose_name = "Liste de souhaits"
         verbose_name_plural = "Listes de souhaits"
@@ -218,3 +449,339 @@ class Wishlist(models.Model):
 
     def __str__(self):
         return f"{self.user.username} - {self.product.name}"
+
+    def save(self, *args, **kwargs):
+        if self._state.adding and self.notified_price is None:
+            self.notified_price = self.product.price_per_unit
+            self.notified_in_stock = self.product.is_available
+        super().save(*args, **kwargs)
+
+
+class ProductChange(models.Model):
+    """Journal des changements de prix et de stock, consommé par les alertes"""
+
+    class Kind(models.TextChoices):
+        PRICE = "price", "Prix"
+        STOCK = "stock", "Stock"
+
+    product = models.ForeignKey(
+        Product, on_delete=models.CASCADE, related_name="+", verbose_name="Produit"
+    )
+    kind = models.CharField(max_length=10, choices=Kind.choices, verbose_name="Type")
+    changed_at = models.DateTimeField(
+        default=timezone.now, db_index=True, verbose_name="Date"
+    )
+
+    class Meta:
+        verbose_name = "Changement de produit"
+        verbose_name_plural = "Changements de produits"
+
+    def __str__(self):
+        return f"{self.product_id} - {self.kind} ({self.changed_at:%Y-%m-%d %H:%M})"
+
+
+class ProductRanking(models.Model):
+    """Classement précalculé des produits (top N) pour un périmètre donné"""
+
+    class Kind(models.TextChoices):
+        FEATURED = "featured", "En vedette"
+        TRENDING = "trending", "Tendance"
+
+    class Scope(models.TextChoices):
+        GLOBAL = "global", "Global"
+        WILAYA = "wilaya", "Wilaya"
+        CATEGORY = "category", "Catégorie"
+
+    kind = models.CharField(max_length=20, choices=Kind.choices, verbose_name="Type")
+    scope = models.CharField(
+        max_length=20, choices=Scope.choices, verbose_name="Périmètre"
+    )
+    scope_value = models.CharField(
+        max_length=100, blank=True, default="", verbose_name="Valeur du périmètre"
+    )
+
+    product_ids = models.JSONField(default=list, verbose_name="Produits classés")
+    scores = models.JSONField(default=list, verbose_name="Scores")
+
+    computed_at = models.DateTimeField(verbose_name="Date de calcul")
+
+    class Meta:
+        verbose_name = "Classement de produits"
+        verbose_name_plural = "Classements de produits"
+        unique_together = ["kind", "scope", "scope_value"]
+
+    def __str__(self):
+        return f"{self.kind} - {self.scope} {self.scope_value}".strip()
+
+
+class ProductPriceHistory(models.Model):
+    """
+    Historique des prix (ajout seulement): une ligne à la création du produit
+    puis à chaque changement de prix, avec le contexte utilisé par l'indice.
+    """
+
+    product = models.ForeignKey(
+        Product,
+        on_delete=models.CASCADE,
+        related_name="price_history",
+        verbose_name="Produit",
+    )
+    price_per_unit = models.DecimalField(
+        max_digits=10, decimal_places=2, verbose_name="Prix par unité"
+    )
+    unit = models.CharField(max_length=50, verbose_name="Unité")
+    category = models.ForeignKey(
+        Category,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="+",
+        verbose_name="Catégorie",
+    )
+    wilaya = models.CharField(
+        max_length=50, blank=True, default="", verbose_name="Wilaya"
+    )
+    recorded_at = models.DateTimeField(
+        default=timezone.now, db_index=True, verbose_name="Date"
+    )
+
+    class Meta:
+        verbose_name = "Historique de prix"
+        verbose_name_plural = "Historiques de prix"
+        ordering = ["-recorded_at"]
+        indexes = [
+            models.Index(
+                fields=["product", "-recorded_at"], name="price_history_product_idx"
+            ),
+        ]
+
+    def __str__(self):
+        return (
+            f"{self.product_id} - {self.price_per_unit} ({self.recorded_at:%Y-%m-%d})"
+        )
+
+
+class PriceIndexDaily(models.Model):
+    """Indice de prix journalier par catégorie, wilaya et unité"""
+
+    day = models.DateField(verbose_name="Jour")
+    category = models.ForeignKey(
+        Category,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="+",
+        verbose_name="Catégorie",
+    )
+    wilaya = models.CharField(
+        max_length=50, blank=True, default="", verbose_name="Wilaya"
+    )
+    unit = models.CharField(max_length=50, verbose_name="Unité")
+
+    min_price = models.DecimalField(
+        max_digits=10, decimal_places=2, verbose_name="Prix minimum"
+    )
+    median_price = models.DecimalField(
+        max_digits=10, decimal_places=2, verbose_name="Prix médian"
+    )
+    max_price = models.DecimalField(
+        max_digits=10, decimal_places=2, verbose_name="Prix maximum"
+    )
+    product_count = models.PositiveIntegerField(verbose_name="Nombre de produits")
+
+    class Meta:
+        verbose_name = "Indice de prix journalier"
+        verbose_name_plural = "Indices de prix journaliers"
+        unique_together = ["category", "wilaya", "unit", "day"]
+        ordering = ["day"]
+
+    def __str__(self):
+        return f"{self.day} - {self.category_id} {self.wilaya} {self.unit}"
+
+
+class ProductCoPurchase(models.Model):
+    """
+    Nombre de commandes livrées contenant les deux produits
+    (product_a <= product_b; la diagonale a == b compte les commandes
+    contenant le produit).
+    """
+
+    product_a = models.ForeignKey(
+        Product, on_delete=models.CASCADE, related_name="+", verbose_name="Produit A"
+    )
+    product_b = models.ForeignKey(
+        Product, on_delete=models.CASCADE, related_name="+", verbose_name="Produit B"
+    )
+    count = models.PositiveIntegerField(default=0, verbose_name="Commandes")
+
+    class Meta:
+        verbose_name = "Achat conjoint"
+        verbose_name_plural = "Achats conjoints"
+        unique_together = ["product_a", "product_b"]
+        indexes = [models.Index(fields=["product_b"], name="copurchase_product_b_idx")]
+
+    def __str__(self):
+        return f"{self.product_a_id} + {self.product_b_id}: {self.count}"
+
+
+class ProductRecommendation(models.Model):
+    """Voisins précalculés d'un produit (top k), lus en une requête"""
+
+    class Kind(models.TextChoices):
+        BOUGHT_TOGETHER = "bought_together", "Souvent achetés ensemble"
+        SIMILAR = "similar", "Similaires"
+
+    product = models.ForeignKey(
+        Product,
+        on_delete=models.CASCADE,
+        related_name="recommendations",
+        verbose_name="Produit",
+    )
+    kind = models.CharField(max_length=20, choices=Kind.choices, verbose_name="Type")
+    product_ids = models.JSONField(default=list, verbose_name="Produits recommandés")
+    scores = models.JSONField(default=list, verbose_name="Scores")
+    computed_at = models.DateTimeField(verbose_name="Date de calcul")
+
+    class Meta:
+        verbose_name = "Recommandation de produits"
+        verbose_name_plural = "Recommandations de produits"
+        unique_together = ["product", "kind"]
+
+    def __str__(self):
+        return f"{self.product_id} - {self.kind}"
+
+
+class RecommendationBatch(models.Model):
+    """Exécution du calcul des recommandations (commandes livrées traitées)"""
+
+    processed_until = models.DateTimeField(verbose_name="Commandes livrées jusqu'au")
+    order_count = models.PositiveIntegerField(default=0, verbose_name="Commandes")
+    product_count = models.PositiveIntegerField(default=0, verbose_name="Produits")
+    full_rebuild = models.BooleanField(default=False, verbose_name="Recalcul complet")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Date")
+
+    class Meta:
+        verbose_name = "Calcul des recommandations"
+        verbose_name_plural = "Calculs des recommandations"
+        get_latest_by = "processed_until"
+
+    def __str__(self):
+        return f"{self.processed_until:%Y-%m-%d %H:%M} ({self.order_count} commandes)"
+
+
+class GeocodeCache(models.Model):
+    """Réponses Nominatim en cache (recherche et géocodage inverse)"""
+
+    class Kind(models.TextChoices):
+        SEARCH = "search", "Recherche"
+        REVERSE = "reverse", "Géocodage inverse"
+
+    kind = models.CharField(max_length=10, choices=Kind.choices, verbose_name="Type")
+    # Requête normalisée ou coordonnées arrondies "lat,lon"
+    key = models.CharField(max_length=255, verbose_name="Clé")
+    # None: aucun résultat (mis en cache moins longtemps)
+    result = models.JSONField(null=True, blank=True, verbose_name="Résultat")
+    expires_at = models.DateTimeField(db_index=True, verbose_name="Expiration")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Mise à jour")
+
+    class Meta:
+        verbose_name = "Géocodage en cache"
+        verbose_name_plural = "Géocodages en cache"
+        unique_together = ["kind", "key"]
+
+    def __str__(self):
+        return f"{self.kind}: {self.key}"
+
+
+class OsmTile(models.Model):
+    """Tuile lat/lon dont les lieux OpenStreetMap sont en cache local"""
+
+    class Source(models.TextChoices):
+        OVERPASS = "overpass", "Overpass"
+        EXTRACT = "extract", "Extrait OSM"
+
+    # Indices de la tuile: floor(latitude / taille), floor(longitude / taille)
+    tile_lat = models.IntegerField(verbose_name="Ligne")
+    tile_lon = models.IntegerField(verbose_name="Colonne")
+    source = models.CharField(
+        max_length=10, choices=Source.choices, verbose_name="Source"
+    )
+    fetched_at = models.DateTimeField(verbose_name="Chargée le")
+    # None: pas d'expiration (tuiles importées d'un extrait)
+    expires_at = models.DateTimeField(null=True, blank=True, verbose_name="Expiration")
+
+    class Meta:
+        verbose_name = "Tuile OSM"
+        verbose_name_plural = "Tuiles OSM"
+        unique_together = ["tile_lat", "tile_lon"]
+
+    def __str__(self):
+        return f"{self.tile_lat}/{self.tile_lon}"
+
+
+class OsmPlace(models.Model):
+    """Lieu OpenStreetMap (marché, supermarché, banque) d'une tuile"""
+
+    osm_type = models.CharField(max_length=10, verbose_name="Type OSM")
+    osm_id = models.BigIntegerField(verbose_name="Identifiant OSM")
+    name = models.CharField(max_length=255, verbose_name="Nom")
+    kind = models.CharField(max_length=50, verbose_name="Type")
+    # Centre pour les ways
+    latitude = models.FloatField(verbose_name="Latitude")
+    longitude = models.FloatField(verbose_name="Longitude")
+    tile_lat = models.IntegerField(verbose_name="Ligne")
+    tile_lon = models.IntegerField(verbose_name="Colonne")
+
+    class Meta:
+        verbose_name = "Lieu OSM"
+        verbose_name_plural = "Lieux OSM"
+        unique_together = ["osm_type", "osm_id"]
+        indexes = [
+            models.Index(fields=["tile_lat", "tile_lon"], name="osmplace_tile_idx")
+        ]
+
+    def __str__(self):
+        return self.name
+
+
+class OsmBoundary(models.Model):
+    """Limites administratives d'une ville (éléments au format Overpass)"""
+
+    key = models.CharField(max_length=255, unique=True, verbose_name="Nom normalisé")
+    name = models.CharField(max_length=255, verbose_name="Nom")
+    data = models.JSONField(verbose_name="Données")
+    source = models.CharField(
+        max_length=10, choices=OsmTile.Source.choices, verbose_name="Source"
+    )
+    fetched_at = models.DateTimeField(verbose_name="Chargée le")
+    expires_at = models.DateTimeField(null=True, blank=True, verbose_name="Expiration")
+
+    class Meta:
+        verbose_name = "Limite de ville OSM"
+        verbose_name_plural = "Limites de villes OSM"
+
+    def __str__(self):
+        return self.name
+
+
+class DeliveryCoverageCell(models.Model):
+    """Cellule geohash touchée par le rayon de livraison d'un produit"""
+
+    # Précision variable selon le rayon (préfixe de la cellule de l'acheteur)
+    geohash = models.CharField(max_length=12, verbose_name="Geohash")
+    product = models.ForeignKey(
+        Product,
+        on_delete=models.CASCADE,
+        related_name="coverage_cells",
+        verbose_name="Produit",
+    )
+    # Cellule entièrement dans le rayon: aucun calcul de distance
+    full = models.BooleanField(default=False, verbose_name="Entièrement couverte")
+
+    class Meta:
+        verbose_name = "Cellule de couverture de livraison"
+        verbose_name_plural = "Cellules de couverture de livraison"
+        unique_together = ["geohash", "product"]
+
+    def __str__(self):
+        return f"{self.geohash}: {self.product_id}"
@@ -0,0 +1,476 @@
+"""
+Cache local des données OpenStreetMap (lieux à proximité, limites de villes).
+
+Le territoire est découpé en tuiles fixes de TILE_SIZE degrés. Une recherche
+de lieux ne consulte que les tuiles couvrant son cercle: celles absentes ou
+expirées sont chargées en une seule requête Overpass (rectangle englobant),
+puis les lieux des tuiles sont lus dans OsmPlace et filtrés par distance
+(NumPy). Les limites de villes sont conservées par nom dans OsmBoundary.
+
+Un extrait OSM (fichier .osm, .osm.gz ou .osm.bz2) peut être importé hors
+ligne: ses tuiles n'expirent pas et aucune requête Overpass n'est alors
+nécessaire.
+"""
+
+import bz2
+import gzip
+import hashlib
+import logging
+import math
+import time
+import xml.etree.ElementTree as ET
+from datetime import timedelta
+
+import numpy as np
+import requests
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .geo import bounding_box, haversine_vectorized
+from .geocoding import (
+    LOOKUP_LOCK_TIMEOUT,
+    LOOKUP_POLL_INTERVAL,
+    build_session,
+    normalize_text,
+)
+from .models import OsmBoundary, OsmPlace, OsmTile
+
+logger = logging.getLogger(__name__)
+
+OVERPASS_URL = "https://overpass-api.de/api/interpreter"
+OVERPASS_TIMEOUT = 25  # secondes (requête couvrant plusieurs tuiles)
+
+TILE_SIZE = 0.1  # degrés (~11 km)
+TILE_TTL = timedelta(days=7)
+BOUNDARY_TTL = timedelta(days=30)
+NEARBY_PLACES_LIMIT = 20
+
+# Lieux conservés: clé OSM -> valeurs
+PLACE_TAGS = {"shop": ("supermarket",), "amenity": ("marketplace", "bank")}
+DEFAULT_PLACE_NAME = "Sans nom"
+
+_session = None
+
+
+def get_session():
+    global _session
+    if _session is None:
+        _session = build_session()
+    return _session
+
+
+def acquire_fetch(name):
+    """
+    Verrou (cache.add) d'un chargement Overpass, partagé par tous les
+    processus. Sans verrou, attendre la fin du chargement en cours:
+    retourner None, son résultat est alors lu en base.
+    """
+    lock_key = f"osm:{hashlib.md5(name.encode()).hexdigest()}:lock"
+    if cache.add(lock_key, 1, timeout=LOOKUP_LOCK_TIMEOUT):
+        return lock_key
+
+    deadline = time.monotonic() + LOOKUP_LOCK_TIMEOUT
+    while cache.get(lock_key) is not None and time.monotonic() < deadline:
+        time.sleep(LOOKUP_POLL_INTERVAL)
+    return None
+
+
+def tile_index(value):
+    # Arrondi préalable: 0.3 / 0.1 = 2.9999999999999996
+    return math.floor(round(value / TILE_SIZE, 9))
+
+
+def tile_ranges(min_lat, max_lat, min_lon, max_lon):
+    """Plages (lignes, colonnes) des tuiles couvrant une boîte englobante"""
+    return (
+        range(tile_index(min_lat), tile_index(max_lat) + 1),
+        range(tile_index(min_lon), tile_index(max_lon) + 1),
+    )
+
+
+def tile_filter(rows, columns):
+    return Q(
+        tile_lat__gte=rows.start,
+        tile_lat__lt=rows.stop,
+        tile_lon__gte=columns.start,
+        tile_lon__lt=columns.stop,
+    )
+
+
+def place_kind(tags):
+    for key, values in PLACE_TAGS.items():
+        if tags.get(key) in values:
+            return tags[key]
+    return None
+
+
+def build_place(osm_type, osm_id, tags, lat, lon):
+    return OsmPlace(
+        osm_type=osm_type,
+        osm_id=osm_id,
+        name=tags.get("name", DEFAULT_PLACE_NAME)[:255],
+        kind=place_kind(tags),
+        latitude=lat,
+        longitude=lon,
+        tile_lat=tile_index(lat),
+        tile_lon=tile_index(lon),
+    )
+
+
+def tiles_filter(tiles):
+    """Filtre des lignes appartenant à ces tuiles (une condition par ligne)"""
+    columns = {}
+    for row, column in tiles:
+        columns.setdefault(row, []).append(column)
+    condition = Q(pk__in=[])
+    for row, row_columns in columns.items():
+        condition |= Q(tile_lat=row, tile_lon__in=row_columns)
+    return condition
+
+
+def save_places(places, tiles, source, expires_at):
+    """Remplacer les lieux de ces tuiles et les marquer comme chargées"""
+    tiles = set(tiles)
+    now = timezone.now()
+    with transaction.atomic():
+        OsmPlace.objects.filter(tiles_filter(tiles)).delete()
+        # Un way proche du bord peut avoir son centre dans une autre tuile
+        OsmPlace.objects.bulk_create(
+            [place for place in places if (place.tile_lat, place.tile_lon) in tiles],
+            batch_size=1000,
+            update_conflicts=True,
+            unique_fields=["osm_type", "osm_id"],
+            update_fields=[
+                "name",
+                "kind",
+                "latitude",
+                "longitude",
+                "tile_lat",
+                "tile_lon",
+            ],
+        )
+        OsmTile.objects.bulk_create(
+            (
+                OsmTile(
+                    tile_lat=row,
+                    tile_lon=column,
+                    source=source,
+                    fetched_at=now,
+                    expires_at=expires_at,
+                )
+                for row, column in tiles
+            ),
+            batch_size=1000,
+            update_conflicts=True,
+            unique_fields=["tile_lat", "tile_lon"],
+            update_fields=["source", "fetched_at", "expires_at"],
+        )
+
+
+def overpass(query):
+    response = get_session().post(
+        OVERPASS_URL, data={"data": query}, timeout=OVERPASS_TIMEOUT
+    )
+    response.raise_for_status()
+    return response.json()
+
+
+def fetch_tiles(tiles):
+    """
+    Charger depuis Overpass les lieux de ces tuiles (une requête sur leur
+    rectangle englobant); les autres tuiles du rectangle restent inchangées.
+    """
+    rows = range(min(row for row, _ in tiles), max(row for row, _ in tiles) + 1)
+    columns = range(
+        min(column for _, column in tiles), max(column for _, column in tiles) + 1
+    )
+    bbox = (
+        f"{rows.start * TILE_SIZE:.4f},{columns.start * TILE_SIZE:.4f},"
+        f"{rows.stop * TILE_SIZE:.4f},{columns.stop * TILE_SIZE:.4f}"
+    )
+    selectors = "\n".join(
+        f'  {element}["{key}"="{value}"]({bbox});'
+        for key, values in PLACE_TAGS.items()
+        for value in values
+        for element in ("node", "way")
+    )
+    data = overpass(
+        f"[out:json][timeout:{OVERPASS_TIMEOUT}];\n(\n{selectors}\n);\nout center;"
+    )
+
+    places = []
+    for element in data.get("elements", []):
+        tags = element.get("tags", {})
+        point = element if "lat" in element else element.get("center")
+        if point and place_kind(tags):
+            places.append(
+                build_place(
+                    element["type"], element["id"], tags, point["lat"], point["lon"]
+                )
+            )
+
+    save_places(places, tiles, OsmTile.Source.OVERPASS, timezone.now() + TILE_TTL)
+
+
+def ensure_tiles(rows, columns):
+    """Charger les tuiles absentes ou expirées (une requête pour toutes)"""
+    fresh = set(
+        OsmTile.objects.filter(tile_filter(rows, columns))
+        .filter(Q(expires_at__isnull=True) | Q(expires_at__gt=timezone.now()))
+        .values_list("tile_lat", "tile_lon")
+    )
+    missing = [
+        (row, column)
+        for row in rows
+        for column in columns
+        if (row, column) not in fresh
+    ]
+    if not missing:
+        return
+
+    # Une seule requête par ensemble de tuiles, tous processus confondus
+    lock_key = acquire_fetch(f"tiles:{missing}")
+    if lock_key is None:
+        return
+
+    try:
+        fetch_tiles(missing)
+    except (requests.RequestException, ValueError) as error:
+        # Réponse avec les tuiles déjà en cache, même expirées
+        logger.warning("Erreur Overpass (tuiles %s): %s", missing, error)
+    finally:
+        cache.delete(lock_key)
+
+
+def nearby_places(lat, lon, radius_km=10, place_type=None, limit=NEARBY_PLACES_LIMIT):
+    """Lieux à moins de radius_km du point, triés par distance"""
+    rows, columns = tile_ranges(*bounding_box(lat, lon, radius_km))
+    ensure_tiles(rows, columns)
+
+    places = OsmPlace.objects.filter(tile_filter(rows, columns))
+    if place_type:
+        places = places.filter(kind=place_type)
+    places = list(places.values_list("name", "kind", "latitude", "longitude"))
+    if not places:
+        return []
+
+    names, kinds, lats, lons = zip(*places)
+    distances = haversine_vectorized(lat, lon, np.array(lats), np.array(lons))
+    within = np.flatnonzero(distances <= radius_km)
+    nearest = within[np.argsort(distances[within], kind="stable")][:limit]
+
+    return [
+        {
+            "name": names[index],
+            "type": kinds[index],
+            "latitude": lats[index],
+            "longitude": lons[index],
+            "distance": float(distances[index]),
+        }
+        for index in nearest
+    ]
+
+
+def fetch_boundaries(key, city_name):
+    name = city_name.replace("\\", "\\\\").replace('"', '\\"')
+    data = overpass(
+        f"[out:json][timeout:{OVERPASS_TIMEOUT}];\n"
+        f'relation["name"="{name}"]["admin_level"="8"]'
+        f'["boundary"="administrative"];\n'
+        "out body;\n>;\nout skel qt;"
+    )
+
+    now = timezone.now()
+    OsmBoundary.objects.update_or_create(
+        key=key,
+        defaults={
+            "name": city_name,
+            "data": data,
+            "source": OsmTile.Source.OVERPASS,
+            "fetched_at": now,
+            "expires_at": now + BOUNDARY_TTL,
+        },
+    )
+    return data
+
+
+def city_boundaries(city_name):
+    """Limites administratives d'une ville (éléments Overpass), None si erreur"""
+    key = normalize_text(city_name)[:255]
+    boundary = OsmBoundary.objects.filter(key=key).first()
+    if boundary and (
+        boundary.expires_at is None or boundary.expires_at > timezone.now()
+    ):
+        return boundary.data
+
+    lock_key = acquire_fetch(f"boundary:{key}")
+    if lock_key is None:
+        # Chargées par un autre processus (ou anciennes limites si erreur)
+        boundary = OsmBoundary.objects.filter(key=key).first()
+        return boundary.data if boundary else None
+
+    try:
+        return fetch_boundaries(key, city_name)
+    except (requests.RequestException, ValueError) as error:
+        logger.warning("Erreur Overpass (limites %s): %s", city_name, error)
+        return boundary.data if boundary else None
+    finally:
+        cache.delete(lock_key)
+
+
+# IMPORT D'UN EXTRAIT OSM
+def open_extract(path):
+    if path.endswith(".bz2"):
+        return bz2.open(path, "rb")
+    if path.endswith(".gz"):
+        return gzip.open(path, "rb")
+    return open(path, "rb")
+
+
+def iter_elements(path, tags):
+    """Parcourir en flux les éléments `tags` d'un fichier OSM XML"""
+    with open_extract(path) as stream:
+        root = None
+        for event, element in ET.iterparse(stream, events=("start", "end")):
+            if root is None:
+                root = element
+            if event != "end":
+                continue
+            if element.tag in tags:
+                yield element
+            if element.tag in ("node", "way", "relation"):
+                # Libérer les éléments déjà traités
+                root.clear()
+
+
+def element_tags(element):
+    return {tag.get("k"): tag.get("v") for tag in element.iter("tag")}
+
+
+def is_city_boundary(tags):
+    return (
+        tags.get("boundary") == "administrative"
+        and tags.get("admin_level") == "8"
+        and bool(tags.get("name"))
+    )
+
+
+def import_extract(path):
+    """
+    Importer lieux et limites de villes d'un extrait OSM XML (trois
+    passages en flux: relations et ways recherchés, ways des limites,
+    nœuds). Retourne (lieux, limites, tuiles).
+    """
+    place_ways = {}  # id -> (tags, nœuds)
+    relations = []
+    boundary_ways = set()
+    bounds = None
+
+    for element in iter_elements(path, ("bounds", "way", "relation")):
+        if element.tag == "bounds":
+            bounds = [float(element.get(name)) for name in ("minlat", "maxlat")]
+            bounds += [float(element.get(name)) for name in ("minlon", "maxlon")]
+            continue
+        tags = element_tags(element)
+        if element.tag == "way" and place_kind(tags):
+            refs = [int(node.get("ref")) for node in element.iter("nd")]
+            place_ways[int(element.get("id"))] = (tags, refs)
+        elif element.tag == "relation" and is_city_boundary(tags):
+            members = [
+                {
+                    "type": member.get("type"),
+                    "ref": int(member.get("ref")),
+                    "role": member.get("role", ""),
+                }
+                for member in element.iter("member")
+            ]
+            relations.append((int(element.get("id")), tags, members))
+            boundary_ways.update(
+                member["ref"] for member in members if member["type"] == "way"
+            )
+
+    way_nodes = {}
+    if boundary_ways:
+        for element in iter_elements(path, ("way",)):
+            way_id = int(element.get("id"))
+            if way_id in boundary_ways:
+                way_nodes[way_id] = [
+                    int(node.get("ref")) for node in element.iter("nd")
+                ]
+
+    needed = {ref for _, refs in place_ways.values() for ref in refs}
+    needed.update(ref for refs in way_nodes.values() for ref in refs)
+    coordinates = {}
+    places = []
+    lat_range = [math.inf, -math.inf]
+    lon_range = [math.inf, -math.inf]
+    for element in iter_elements(path, ("node",)):
+        node_id = int(element.get("id"))
+        lat, lon = float(element.get("lat")), float(element.get("lon"))
+        lat_range = [min(lat_range[0], lat), max(lat_range[1], lat)]
+        lon_range = [min(lon_range[0], lon), max(lon_range[1], lon)]
+        if node_id in needed:
+            coordinates[node_id] = (lat, lon)
+        if len(element):
+            tags = element_tags(element)
+            if place_kind(tags):
+                places.append(build_place("node", node_id, tags, lat, lon))
+
+    # Centre d'un way: centre de sa boîte englobante, comme "out center"
+    for way_id, (tags, refs) in place_ways.items():
+        points = [coordinates[ref] for ref in refs if ref in coordinates]
+        if points:
+            lats, lons = zip(*points)
+            places.append(
+                build_place(
+                    "way",
+                    way_id,
+                    tags,
+                    (min(lats) + max(lats)) / 2,
+                    (min(lons) + max(lons)) / 2,
+                )
+            )
+
+    if bounds is None:
+        if lat_range[0] > lat_range[1]:
+            return 0, 0, 0
+        bounds = lat_range + lon_range
+    rows, columns = tile_ranges(*bounds)
+    tiles = [(row, column) for row in rows for column in columns]
+    save_places(places, tiles, OsmTile.Source.EXTRACT, None)
+
+    now = timezone.now()
+    for relation_id, tags, members in relations:
+        ways = [
+            {"type": "way", "id": member["ref"], "nodes": way_nodes[member["ref"]]}
+            for member in members
+            if member["type"] == "way" and member["ref"] in way_nodes
+        ]
+        nodes = {ref for way in ways for ref in way["nodes"] if ref in coordinates}
+        elements = [
+            {"type": "relation", "id": relation_id, "members": members, "tags": tags}
+        ]
+        elements += ways
+        elements += [
+            {
+                "type": "node",
+                "id": ref,
+                "lat": coordinates[ref][0],
+                "lon": coordinates[ref][1],
+            }
+            for ref in sorted(nodes)
+        ]
+        OsmBoundary.objects.update_or_create(
+            key=normalize_text(tags["name"])[:255],
+            defaults={
+                "name": tags["name"],
+                "data": {"elements": elements},
+                "source": OsmTile.Source.EXTRACT,
+                "fetched_at": now,
+                "expires_at": None,
+            },
+        )
+
+    return len(places), len(relations), len(tiles)
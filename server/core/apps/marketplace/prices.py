@@ -0,0 +1,198 @@
+"""
+Historique des prix et indice de prix régional.
+
+Chaque création de produit et chaque changement de prix (ou d'unité, de
+catégorie) ajoute une ligne à ProductPriceHistory. Le calcul périodique
+reconstitue, jour par jour, le prix en vigueur de chaque produit en fin de
+journée et en tire min / médiane / max par catégorie, wilaya et unité
+(PriceIndexDaily). Seuls les produits en vente (actifs, en stock) au moment
+du calcul comptent: brouillons, annonces retirées et produits épuisés
+fausseraient la médiane. Les séries de l'API sont lues dans ces agrégats, jamais
+dans l'historique brut.
+"""
+
+import statistics
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Max, Min
+from django.utils import timezone
+
+from apps.accounts.models import User
+from .cache import invalidate_tags
+from .models import PriceIndexDaily, Product, ProductPriceHistory
+
+PRICE_INDEX_INTERVAL = 60 * 60  # secondes entre deux calculs (celery beat)
+PRICE_INDEX_DEFAULT_DAYS = 90
+PRICE_INDEX_MAX_DAYS = 366
+CENT = Decimal("0.01")
+
+
+def price_key(product):
+    """Valeurs dont le changement ajoute une ligne à l'historique"""
+    return (product.price_per_unit, product.unit, product.category_id)
+
+
+def record_prices(products, wilaya=None):
+    """Ajouter le prix courant de chaque produit à l'historique"""
+    products = [product for product in products if product.pk]
+    if not products:
+        return []
+
+    if wilaya is None:
+        wilayas = dict(
+            User.objects.filter(
+                pk__in={product.farmer_id for product in products}
+            ).values_list("id", "wilaya")
+        )
+    now = timezone.now()
+    return ProductPriceHistory.objects.bulk_create(
+        ProductPriceHistory(
+            product_id=product.pk,
+            price_per_unit=product.price_per_unit,
+            unit=product.unit,
+            category_id=product.category_id,
+            wilaya=(wilaya if wilaya is not None else wilayas.get(product.farmer_id))
+            or "",
+            recorded_at=now,
+        )
+        for product in products
+    )
+
+
+def day_start(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def index_rows(day, prices):
+    """
+    Agrégats d'un jour. Chaque prix compte dans sa catégorie et sa wilaya,
+    et dans les agrégats toutes catégories (category vide) et toutes
+    wilayas (wilaya vide).
+    """
+    groups = defaultdict(list)
+    for category_id, wilaya, unit, price in prices:
+        for group_category in {category_id, None}:
+            for group_wilaya in {wilaya, ""}:
+                groups[(group_category, group_wilaya, unit)].append(price)
+
+    return [
+        PriceIndexDaily(
+            day=day,
+            category_id=category_id,
+            wilaya=wilaya,
+            unit=unit,
+            min_price=min(values),
+            median_price=Decimal(statistics.median(values)).quantize(CENT),
+            max_price=max(values),
+            product_count=len(values),
+        )
+        for (category_id, wilaya, unit), values in groups.items()
+    ]
+
+
+def rollup_price_index(start=None, end=None):
+    """
+    Recalculer l'indice des jours start..end (par défaut: depuis le dernier
+    jour calculé, qui pouvait être incomplet, jusqu'à aujourd'hui).
+    Retourne le nombre de jours calculés.
+    """
+    end = end or timezone.localdate()
+    if start is None:
+        start = PriceIndexDaily.objects.aggregate(day=Max("day"))["day"]
+    if start is None:
+        first = ProductPriceHistory.objects.aggregate(at=Min("recorded_at"))["at"]
+        if first is None:
+            return 0
+        start = timezone.localdate(first)
+    if start > end:
+        return 0
+
+    # Prix en vigueur au début de la période: dernière ligne de chaque
+    # produit (les ids croissent avec recorded_at, table en ajout seulement)
+    columns = ("product_id", "category_id", "wilaya", "unit", "price_per_unit")
+    latest_ids = (
+        ProductPriceHistory.objects.filter(recorded_at__lt=day_start(start))
+        .values("product_id")
+        .annotate(last_id=Max("id"))
+        .values("last_id")
+    )
+    current = {
+        product_id: entry
+        for product_id, *entry in ProductPriceHistory.objects.filter(
+            id__in=latest_ids
+        ).values_list(*columns)
+    }
+
+    listed = set(
+        Product.objects.filter(
+            status=Product.ProductStatus.ACTIVE, available_quantity__gt=0
+        ).values_list("pk", flat=True)
+    )
+
+    # Puis les changements de la période, parcourus une seule fois
+    changes = (
+        ProductPriceHistory.objects.filter(
+            recorded_at__gte=day_start(start),
+            recorded_at__lt=day_start(end + timedelta(days=1)),
+        )
+        .order_by("recorded_at", "id")
+        .values_list(*columns, "recorded_at")
+        .iterator(chunk_size=2000)
+    )
+    pending = next(changes, None)
+
+    rows = []
+    day = start
+    while day <= end:
+        day_end = day_start(day + timedelta(days=1))
+        while pending is not None and pending[-1] < day_end:
+            product_id, *entry, _ = pending
+            current[product_id] = entry
+            pending = next(changes, None)
+        rows.extend(
+            index_rows(
+                day,
+                (
+                    entry
+                    for product_id, entry in current.items()
+                    if product_id in listed
+                ),
+            )
+        )
+        day += timedelta(days=1)
+
+    with transaction.atomic():
+        PriceIndexDaily.objects.filter(day__gte=start, day__lte=end).delete()
+        PriceIndexDaily.objects.bulk_create(rows, batch_size=1000)
+
+    invalidate_tags("price_index")
+    return (end - start).days + 1
+
+
+def price_series(start, end, category=None, wilaya="", unit=None):
+    """Séries journalières de l'indice, une par (catégorie, wilaya, unité)"""
+    buckets = PriceIndexDaily.objects.filter(
+        category_id=category, wilaya=wilaya, day__gte=start, day__lte=end
+    )
+    if unit:
+        buckets = buckets.filter(unit=unit)
+
+    series = {}
+    for bucket in buckets.order_by("unit", "day"):
+        points = series.setdefault(bucket.unit, [])
+        points.append(
+            {
+                "day": bucket.day,
+                "min": bucket.min_price,
+                "median": bucket.median_price,
+                "max": bucket.max_price,
+                "products": bucket.product_count,
+            }
+        )
+    return [
+        {"category": category, "wilaya": wilaya, "unit": unit, "points": points}
+        for unit, points in series.items()
+    ]
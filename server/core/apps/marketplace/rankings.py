@@ -0,0 +1,146 @@
+"""
+Classements précalculés des produits (en vedette, tendance).
+
+Le score d'un produit combine ses commandes récentes, pondérées par une
+décroissance exponentielle selon leur ancienneté, et ses vues:
+
+    score = somme(commandes du jour * 0.5 ** (âge en jours / demi-vie))
+            + poids_vues * log(1 + vues)
+
+Les N meilleurs produits sont stockés par périmètre (global, wilaya,
+catégorie) dans ProductRanking; les endpoints lisent une page de ce
+classement au lieu de trier tout le catalogue.
+"""
+
+import heapq
+import math
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Count, Max, Min
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from apps.orders.models import OrderItem
+from .cache import invalidate_tags
+from .models import Product, ProductRanking
+
+RANKING_SIZE = 50
+RANKING_WINDOW_DAYS = 60
+RANKING_INTERVAL = 15 * 60  # secondes entre deux calculs (celery beat)
+
+# Demi-vie (jours) et poids des vues par type de classement
+RANKING_PARAMETERS = {
+    ProductRanking.Kind.FEATURED: {"half_life": 14, "view_weight": 1.0},
+    ProductRanking.Kind.TRENDING: {"half_life": 2, "view_weight": 0.25},
+}
+
+
+def daily_order_counts(since):
+    """Nombre de commandes par produit et par jour depuis `since`"""
+    return (
+        OrderItem.objects.filter(created_at__gte=since)
+        .exclude(order__status="cancelled")
+        .annotate(day=TruncDate("created_at"))
+        .values("product_id", "day")
+        .annotate(orders=Count("order_id", distinct=True))
+        .values_list("product_id", "day", "orders")
+    )
+
+
+def compute_rankings(size=RANKING_SIZE, now=None):
+    """Recalculer et remplacer tous les classements; retourne leur nombre"""
+    now = now or timezone.now()
+    today = timezone.localdate(now)
+
+    products = list(
+        Product.objects.filter(status="active", available_quantity__gt=0).values_list(
+            "id", "views_count", "category_id", "farmer__wilaya"
+        )
+    )
+    daily = list(daily_order_counts(now - timedelta(days=RANKING_WINDOW_DAYS)))
+
+    rankings = []
+    for kind, parameters in RANKING_PARAMETERS.items():
+        scores = defaultdict(float)
+        for product_id, day, orders in daily:
+            age = max((today - day).days, 0)
+            scores[product_id] += orders * 0.5 ** (age / parameters["half_life"])
+
+        view_weight = parameters["view_weight"]
+        groups = defaultdict(list)
+        for product_id, views, category_id, wilaya in products:
+            score = scores.get(product_id, 0.0) + view_weight * math.log1p(views)
+            entry = (score, product_id)
+            groups[(ProductRanking.Scope.GLOBAL, "")].append(entry)
+            if wilaya:
+                groups[(ProductRanking.Scope.WILAYA, wilaya)].append(entry)
+            if category_id:
+                groups[(ProductRanking.Scope.CATEGORY, str(category_id))].append(entry)
+
+        for (scope, scope_value), entries in groups.items():
+            top = heapq.nlargest(size, entries)
+            rankings.append(
+                ProductRanking(
+                    kind=kind,
+                    scope=scope,
+                    scope_value=scope_value,
+                    product_ids=[product_id for _, product_id in top],
+                    scores=[round(score, 4) for score, _ in top],
+                    computed_at=now,
+                )
+            )
+
+    with transaction.atomic():
+        ProductRanking.objects.all().delete()
+        ProductRanking.objects.bulk_create(rankings)
+
+    invalidate_tags("rankings")
+    return len(rankings)
+
+
+def ranking_scope(params):
+    """
+    Périmètre demandé: ?wilaya=... ou ?category=..., sinon global.
+    Lève ValueError si la catégorie n'est pas un identifiant.
+    """
+    if params.get("wilaya"):
+        return ProductRanking.Scope.WILAYA, params["wilaya"]
+    if params.get("category"):
+        return ProductRanking.Scope.CATEGORY, str(int(params["category"]))
+    return ProductRanking.Scope.GLOBAL, ""
+
+
+def ranked_products(kind, scope, scope_value, limit, queryset):
+    """
+    Produits d'un classement, dans l'ordre, encore disponibles.
+    Retourne None si le classement n'a pas encore été calculé.
+    """
+    ranking = (
+        ProductRanking.objects.filter(kind=kind, scope=scope, scope_value=scope_value)
+        .only("product_ids")
+        .first()
+    )
+    if ranking is None:
+        return None
+
+    # Quelques produits de plus pour compenser ceux devenus indisponibles
+    ids = ranking.product_ids[: limit * 2]
+    products = queryset.filter(status="active", available_quantity__gt=0).in_bulk(ids)
+    return [products[pk] for pk in ids if pk in products][:limit]
+
+
+def ranking_freshness(now=None):
+    now = now or timezone.now()
+    summary = ProductRanking.objects.aggregate(
+        oldest=Min("computed_at"), latest=Max("computed_at"), count=Count("id")
+    )
+    age = (now - summary["oldest"]).total_seconds() if summary["oldest"] else None
+    return {
+        "computed_at": summary["latest"],
+        "age_seconds": round(age) if age is not None else None,
+        "interval_seconds": RANKING_INTERVAL,
+        "stale": age is None or age > 2 * RANKING_INTERVAL,
+        "rankings": summary["count"],
+    }
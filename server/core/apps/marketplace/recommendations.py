@@ -0,0 +1,251 @@
+"""
+Recommandations "souvent achetés ensemble" et "similaires".
+
+Les commandes livrées forment une matrice creuse X (commandes x produits,
+1 si la commande contient le produit). C = X.T @ X donne pour chaque paire
+de produits le nombre de commandes communes, et sur sa diagonale le nombre
+de commandes de chaque produit. C est conservée dans ProductCoPurchase et
+mise à jour avec les seules commandes livrées depuis le dernier calcul:
+
+    souvent achetés ensemble(i, j) = C[i, j] / C[i, i]            (confiance)
+    similaires(i, j)               = C[i, j] / sqrt(C[i, i] C[j, j])  (cosinus)
+
+Les k meilleurs voisins des produits concernés sont recalculés et stockés
+dans ProductRecommendation: l'endpoint lit une ligne par type.
+"""
+
+from datetime import timedelta
+
+import numpy as np
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from scipy import sparse
+
+from apps.orders.models import OrderItem
+from .cache import invalidate_tags
+from .models import ProductCoPurchase, ProductRecommendation, RecommendationBatch
+
+RECOMMENDATION_SIZE = 20
+RECOMMENDATION_INTERVAL = 60 * 60  # secondes entre deux calculs (celery beat)
+# Commandes livrées à l'instant: traitées au passage suivant, pour ne pas
+# manquer une transaction encore ouverte
+RECOMMENDATION_LAG = timedelta(minutes=5)
+RECOMMENDATION_LOCK = "recommendations:lock"
+RECOMMENDATION_LOCK_TIMEOUT = 30 * 60
+
+
+def order_product_matrix(pairs):
+    """Matrice X (commandes x produits) et ids des produits de ses colonnes"""
+    pairs = np.asarray(pairs, dtype=np.int64).reshape(-1, 2)
+    order_ids, rows = np.unique(pairs[:, 0], return_inverse=True)
+    product_ids, columns = np.unique(pairs[:, 1], return_inverse=True)
+
+    matrix = sparse.csr_matrix(
+        (np.ones(len(pairs), dtype=np.int32), (rows, columns)),
+        shape=(len(order_ids), len(product_ids)),
+    )
+    # Un produit présent deux fois dans une commande ne compte qu'une fois
+    matrix.data[:] = 1
+    return matrix, product_ids
+
+
+def add_co_purchases(pairs):
+    """Ajouter des lignes (order_id, product_id) aux compteurs; retourne les produits"""
+    matrix, product_ids = order_product_matrix(pairs)
+    counts = sparse.triu(matrix.T @ matrix).tocoo()
+
+    delta = {
+        (int(product_ids[a]), int(product_ids[b])): int(count)
+        for a, b, count in zip(counts.row, counts.col, counts.data)
+    }
+    touched = {int(product_id) for product_id in product_ids}
+    existing = ProductCoPurchase.objects.filter(
+        product_a__in=touched, product_b__in=touched
+    )
+
+    to_update = []
+    for row in existing:
+        count = delta.pop((row.product_a_id, row.product_b_id), None)
+        if count is not None:
+            row.count += count
+            to_update.append(row)
+
+    ProductCoPurchase.objects.bulk_update(to_update, ["count"], batch_size=1000)
+    ProductCoPurchase.objects.bulk_create(
+        (
+            ProductCoPurchase(product_a_id=a, product_b_id=b, count=count)
+            for (a, b), count in delta.items()
+        ),
+        batch_size=1000,
+    )
+    return touched
+
+
+def co_purchase_array(rows):
+    """Compteurs (product_a, product_b, count) en tableau NumPy"""
+    return np.array(
+        list(rows.values_list("product_a_id", "product_b_id", "count")),
+        dtype=np.int64,
+    ).reshape(-1, 3)
+
+
+def co_purchase_rows(product_ids=None):
+    """
+    Compteurs nécessaires au calcul des voisins de ces produits (tous si
+    None); retourne aussi l'ensemble des produits à recalculer.
+    """
+    rows = ProductCoPurchase.objects.all()
+    if product_ids is None:
+        return co_purchase_array(rows), None
+
+    def involving(ids):
+        return Q(product_a__in=ids) | Q(product_b__in=ids)
+
+    # Le cosinus d'un voisin dépend du nombre de commandes du produit:
+    # les listes des voisins changent aussi
+    first = co_purchase_array(rows.filter(involving(product_ids)))
+    product_ids = set(product_ids) | set(first[:, :2].ravel().tolist())
+    pairs = co_purchase_array(rows.filter(involving(product_ids)))
+
+    # Nombre de commandes des voisins de second rang (dénominateur du cosinus)
+    others = set(pairs[:, :2].ravel().tolist()) - product_ids
+    diagonal = co_purchase_array(
+        rows.filter(product_a=F("product_b"), product_a__in=others)
+    )
+    return np.concatenate([pairs, diagonal]), product_ids
+
+
+def top_neighbours(scores, columns, counts, size):
+    """Indices des `size` meilleurs voisins (score, puis commandes communes)"""
+    order = np.lexsort((-counts, -scores))
+    return columns[order[:size]], scores[order[:size]]
+
+
+def compute_recommendations(product_ids=None, size=RECOMMENDATION_SIZE, now=None):
+    """
+    Recalculer les voisins de ces produits (tous si None); retourne le
+    nombre de produits recalculés.
+    """
+    now = now or timezone.now()
+    rows, product_ids = co_purchase_rows(product_ids)
+
+    ids, index = np.unique(rows[:, :2], return_inverse=True)
+    index = index.reshape(-1, 2)
+    a, b, counts = index[:, 0], index[:, 1], rows[:, 2]
+    off_diagonal = a != b
+
+    # Matrice symétrique des commandes communes, diagonale à part
+    diagonal = np.zeros(len(ids), dtype=np.float64)
+    diagonal[a[~off_diagonal]] = counts[~off_diagonal]
+    matrix = sparse.coo_matrix(
+        (
+            np.concatenate([counts[off_diagonal], counts[off_diagonal]]),
+            (
+                np.concatenate([a[off_diagonal], b[off_diagonal]]),
+                np.concatenate([b[off_diagonal], a[off_diagonal]]),
+            ),
+        ),
+        shape=(len(ids), len(ids)),
+    ).tocsr()
+
+    targets = ids if product_ids is None else sorted(product_ids)
+    positions = np.searchsorted(ids, targets)
+
+    recommendations = []
+    for product_id, position in zip(targets, positions):
+        if position >= len(ids) or ids[position] != product_id:
+            continue
+        start, end = matrix.indptr[position], matrix.indptr[position + 1]
+        columns = matrix.indices[start:end]
+        common = matrix.data[start:end].astype(np.float64)
+        orders = diagonal[position]
+        if not len(columns) or not orders:
+            continue
+
+        for kind, scores in (
+            (ProductRecommendation.Kind.BOUGHT_TOGETHER, common / orders),
+            (
+                ProductRecommendation.Kind.SIMILAR,
+                common / np.sqrt(orders * diagonal[columns]),
+            ),
+        ):
+            neighbours, best = top_neighbours(scores, columns, common, size)
+            recommendations.append(
+                ProductRecommendation(
+                    product_id=int(product_id),
+                    kind=kind,
+                    product_ids=ids[neighbours].tolist(),
+                    scores=[round(float(score), 4) for score in best],
+                    computed_at=now,
+                )
+            )
+
+    stale = ProductRecommendation.objects.all()
+    if product_ids is not None:
+        stale = stale.filter(product_id__in=product_ids)
+    stale.delete()
+    ProductRecommendation.objects.bulk_create(recommendations, batch_size=1000)
+    return len(targets)
+
+
+def update_recommendations(rebuild=False, now=None):
+    """
+    Intégrer les commandes livrées depuis le dernier calcul (toutes si
+    rebuild) et recalculer les recommandations des produits concernés.
+    Retourne le RecommendationBatch créé, None si un calcul est en cours.
+    """
+    if not cache.add(RECOMMENDATION_LOCK, 1, timeout=RECOMMENDATION_LOCK_TIMEOUT):
+        return None
+
+    try:
+        now = now or timezone.now()
+        until = now - RECOMMENDATION_LAG
+        last = RecommendationBatch.objects.order_by("-processed_until").first()
+        rebuild = rebuild or last is None
+
+        items = OrderItem.objects.filter(
+            order__status="delivered", order__delivered_at__lte=until
+        )
+        if not rebuild:
+            items = items.filter(order__delivered_at__gt=last.processed_until)
+        pairs = list(items.values_list("order_id", "product_id"))
+
+        with transaction.atomic():
+            if rebuild:
+                ProductCoPurchase.objects.all().delete()
+            touched = add_co_purchases(pairs) if pairs else set()
+            count = 0
+            if rebuild or touched:
+                count = compute_recommendations(None if rebuild else touched, now=now)
+            batch = RecommendationBatch.objects.create(
+                processed_until=until,
+                order_count=len({order_id for order_id, _ in pairs}),
+                product_count=count,
+                full_rebuild=rebuild,
+            )
+    finally:
+        cache.delete(RECOMMENDATION_LOCK)
+
+    if count:
+        invalidate_tags("recommendations")
+    return batch
+
+
+def recommended_products(product_id, limit, queryset):
+    """Listes {type: [produits]} d'un produit, produits encore disponibles"""
+    lists = dict(
+        ProductRecommendation.objects.filter(product_id=product_id).values_list(
+            "kind", "product_ids"
+        )
+    )
+    ids = {pk for product_ids in lists.values() for pk in product_ids[: limit * 2]}
+    products = queryset.filter(status="active", available_quantity__gt=0).in_bulk(ids)
+
+    return {
+        kind: [
+            products[pk] for pk in lists.get(kind, [])[: limit * 2] if pk in products
+        ][:limit]
+        for kind in ProductRecommendation.Kind.values
+    }
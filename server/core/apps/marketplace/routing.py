@@ -0,0 +1,752 @@
+"""
+Itinéraires sur le réseau routier, calculés localement (extrait OSM).
+
+Le graphe est construit hors ligne (build_routing_graph) à partir des ways
+"highway" d'un extrait OSM: les chaînes de nœuds sans intersection forment
+une seule arête dont la géométrie est conservée, et le tout est enregistré
+dans un fichier .npz (ROUTING_GRAPH_PATH). Au chargement, chaque profil
+(voiture, vélo, marche) obtient son graphe CSR pondéré par le temps de
+parcours, selon la vitesse de chaque type de route.
+
+Un itinéraire part du point de route le plus proche de l'origine (arbre
+k-d), puis suit A* (heuristique: distance à vol d'oiseau à la vitesse
+maximale du profil) jusqu'au point le plus proche de la destination. Les
+matrices de distances utilisent le Dijkstra de scipy, une fois par origine.
+Sans graphe, ou loin de toute route, l'estimation à vol d'oiseau reste
+utilisée.
+"""
+
+import heapq
+import math
+import os
+import threading
+from bisect import bisect_left
+from collections import namedtuple
+
+import numpy as np
+from django.conf import settings
+from scipy import sparse
+from scipy.sparse import csgraph
+from scipy.spatial import cKDTree
+
+from .cache import cached
+from .geo import EARTH_RADIUS_KM, haversine_vectorized
+from .osm import element_tags, iter_elements
+
+# Vitesses (km/h) par type de route; type absent: interdit au profil
+PROFILE_SPEEDS = {
+    "driving": {
+        "motorway": 90,
+        "motorway_link": 60,
+        "trunk": 80,
+        "trunk_link": 50,
+        "primary": 70,
+        "primary_link": 50,
+        "secondary": 60,
+        "secondary_link": 40,
+        "tertiary": 50,
+        "tertiary_link": 30,
+        "unclassified": 40,
+        "residential": 30,
+        "living_street": 10,
+        "service": 20,
+        "track": 25,
+    },
+    "cycling": {
+        "primary": 15,
+        "primary_link": 15,
+        "secondary": 15,
+        "secondary_link": 15,
+        "tertiary": 15,
+        "tertiary_link": 15,
+        "unclassified": 15,
+        "residential": 15,
+        "living_street": 10,
+        "service": 12,
+        "track": 10,
+        "cycleway": 15,
+        "path": 8,
+    },
+    "walking": {
+        "primary": 5,
+        "primary_link": 5,
+        "secondary": 5,
+        "secondary_link": 5,
+        "tertiary": 5,
+        "tertiary_link": 5,
+        "unclassified": 5,
+        "residential": 5,
+        "living_street": 5,
+        "service": 5,
+        "track": 5,
+        "cycleway": 5,
+        "path": 5,
+        "footway": 5,
+        "pedestrian": 5,
+        "steps": 3,
+    },
+}
+ROAD_CLASSES = tuple(
+    sorted({road for speeds in PROFILE_SPEEDS.values() for road in speeds})
+)
+ONEWAY_PROFILES = {"driving", "cycling"}
+# Estimation à vol d'oiseau, et trajets entre un point et la route
+ESTIMATE_SPEEDS = {"driving": 60, "walking": 5, "cycling": 15}
+
+MAX_SEGMENT_KM = 0.2  # points intermédiaires ajoutés au-delà (rattachement)
+MAX_SNAP_KM = 2.0  # au-delà: estimation à vol d'oiseau
+MIN_WEIGHT = 1e-9  # heures; scipy ignore les arcs de poids nul
+ROUTE_PRECISION = 4  # décimales des coordonnées en cache (~11 m)
+ROUTE_CACHE_TIMEOUT = 24 * 60 * 60
+MATRIX_MAX_POINTS = 50
+
+GRAPH_ARRAYS = (
+    "vertex_lats",
+    "vertex_lons",
+    "edge_source",
+    "edge_target",
+    "edge_class",
+    "edge_oneway",
+    "edge_length",
+    "shape_offsets",
+    "shape_lats",
+    "shape_lons",
+    "shape_distance",
+)
+
+# Point de route le plus proche: indice du point de forme, arête, distance
+# depuis le début de l'arête et distance au point demandé (km)
+Snap = namedtuple("Snap", "point edge offset distance")
+
+
+def segment_lengths(lats, lons):
+    """Longueurs (km) des segments successifs d'une polyligne"""
+    lat1, lat2 = np.radians(lats[:-1]), np.radians(lats[1:])
+    dlon = np.radians(np.diff(lons))
+    a = (
+        np.sin((lat2 - lat1) / 2) ** 2
+        + np.cos(lat1) * np.cos(lat2) * np.sin(dlon / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def densify(lats, lons):
+    """Découper les segments plus longs que MAX_SEGMENT_KM"""
+    pieces = np.maximum(np.ceil(segment_lengths(lats, lons) / MAX_SEGMENT_KM), 1)
+    pieces = pieces.astype(np.int64)
+    if (pieces == 1).all():
+        return lats, lons
+
+    segments = np.repeat(np.arange(len(pieces)), pieces)
+    fractions = (
+        np.arange(pieces.sum()) - np.repeat(np.cumsum(pieces) - pieces, pieces)
+    ) / np.repeat(pieces, pieces)
+    lats = np.append(
+        lats[segments] + (lats[segments + 1] - lats[segments]) * fractions, lats[-1]
+    )
+    lons = np.append(
+        lons[segments] + (lons[segments + 1] - lons[segments]) * fractions, lons[-1]
+    )
+    return lats, lons
+
+
+def unit_vectors(lats, lons):
+    """Coordonnées cartésiennes sur la sphère unité (distances pour l'arbre k-d)"""
+    lats, lons = np.radians(lats), np.radians(lons)
+    return np.column_stack(
+        (np.cos(lats) * np.cos(lons), np.cos(lats) * np.sin(lons), np.sin(lats))
+    )
+
+
+def road_way(tags):
+    """(classe, sens) d'un way routier (sens: 0, 1 ou -1 à contresens), None sinon"""
+    highway = tags.get("highway")
+    if highway not in ROAD_CLASSES or tags.get("area") == "yes":
+        return None
+
+    oneway = tags.get("oneway", "")
+    if oneway == "-1":
+        direction = -1
+    elif oneway in ("yes", "true", "1") or (
+        oneway != "no"
+        and (highway == "motorway" or tags.get("junction") == "roundabout")
+    ):
+        direction = 1
+    else:
+        direction = 0
+    return ROAD_CLASSES.index(highway), direction
+
+
+def build_graph(path):
+    """
+    Construire les tableaux du graphe routier d'un extrait OSM XML (deux
+    passages en flux: ways routiers, puis nœuds utilisés).
+    """
+    ways = []
+    usage = {}  # nœud -> nombre d'apparitions (extrémités comptées deux fois)
+    for element in iter_elements(path, ("way",)):
+        road = road_way(element_tags(element))
+        refs = [int(node.get("ref")) for node in element.iter("nd")]
+        if road is None or len(refs) < 2:
+            continue
+        road_class, direction = road
+        if direction == -1:
+            refs.reverse()
+        ways.append((refs, road_class, direction != 0))
+        for ref in refs:
+            usage[ref] = usage.get(ref, 0) + 1
+        usage[refs[0]] += 1
+        usage[refs[-1]] += 1
+
+    coordinates = {}
+    for element in iter_elements(path, ("node",)):
+        node_id = int(element.get("id"))
+        if node_id in usage:
+            coordinates[node_id] = (
+                float(element.get("lat")),
+                float(element.get("lon")),
+            )
+
+    vertices = {}
+    edges = []  # (source, cible, classe, sens unique)
+    shapes = []  # (latitudes, longitudes, distances cumulées)
+
+    def vertex(node_id):
+        return vertices.setdefault(node_id, len(vertices))
+
+    for refs, road_class, oneway in ways:
+        # Nœuds absents de l'extrait (ways coupés à la frontière) ignorés
+        refs = [ref for ref in refs if ref in coordinates]
+        start = 0
+        for index in range(1, len(refs)):
+            # Une arête par chaîne de nœuds entre deux intersections
+            if usage[refs[index]] < 2 and index < len(refs) - 1:
+                continue
+            chain = refs[start : index + 1]
+            lats, lons = densify(
+                np.array([coordinates[ref][0] for ref in chain]),
+                np.array([coordinates[ref][1] for ref in chain]),
+            )
+            distances = np.concatenate(([0.0], np.cumsum(segment_lengths(lats, lons))))
+            edges.append((vertex(chain[0]), vertex(chain[-1]), road_class, oneway))
+            shapes.append((lats, lons, distances))
+            start = index
+
+    vertex_coordinates = np.array(
+        [coordinates[node_id] for node_id in vertices], dtype=np.float64
+    ).reshape(-1, 2)
+    edge_array = np.array(edges, dtype=np.int64).reshape(-1, 4)
+    shape_sizes = [len(lats) for lats, _, _ in shapes]
+
+    def concatenate(position, dtype):
+        if not shapes:
+            return np.empty(0, dtype=dtype)
+        return np.concatenate([shape[position] for shape in shapes]).astype(dtype)
+
+    return {
+        "vertex_lats": vertex_coordinates[:, 0],
+        "vertex_lons": vertex_coordinates[:, 1],
+        "edge_source": edge_array[:, 0].astype(np.int32),
+        "edge_target": edge_array[:, 1].astype(np.int32),
+        "edge_class": edge_array[:, 2].astype(np.uint8),
+        "edge_oneway": edge_array[:, 3].astype(bool),
+        "edge_length": np.array(
+            [distances[-1] for _, _, distances in shapes], dtype=np.float32
+        ),
+        "shape_offsets": np.concatenate(([0], np.cumsum(shape_sizes))).astype(np.int64),
+        "shape_lats": concatenate(0, np.float32),
+        "shape_lons": concatenate(1, np.float32),
+        "shape_distance": concatenate(2, np.float32),
+    }
+
+
+def save_graph(arrays, path):
+    """Enregistrer le graphe (remplacement atomique du fichier)"""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    temporary = f"{path}.tmp.npz"
+    np.savez_compressed(temporary, **arrays)
+    os.replace(temporary, path)
+
+
+class RoutingGraph:
+    """Graphe routier chargé, avec un graphe par profil construit à la demande"""
+
+    def __init__(self, arrays, version=None):
+        for name in GRAPH_ARRAYS:
+            setattr(self, name, arrays[name])
+        self.version = version
+        self.shape_edge = np.repeat(
+            np.arange(len(self.edge_source)), np.diff(self.shape_offsets)
+        )
+        self.profiles = {}
+        self.lock = threading.Lock()
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            arrays = {name: data[name] for name in GRAPH_ARRAYS}
+        return cls(arrays, version=os.stat(path).st_mtime_ns)
+
+    def profile(self, name):
+        with self.lock:
+            graph = self.profiles.get(name)
+            if graph is None:
+                graph = self.profiles[name] = ProfileGraph(self, name)
+        return graph
+
+
+class ProfileGraph:
+    """Graphe CSR d'un profil: arcs autorisés, pondérés par le temps (heures)"""
+
+    def __init__(self, graph, profile):
+        self.graph = graph
+        self.profile = profile
+        speeds = np.array(
+            [PROFILE_SPEEDS[profile].get(road, 0) for road in ROAD_CLASSES],
+            dtype=np.float64,
+        )
+        self.max_speed = speeds.max()
+        self.edge_speed = speeds[graph.edge_class]
+        self.forward = self.edge_speed > 0
+        self.backward = self.forward.copy()
+        if profile in ONEWAY_PROFILES:
+            self.backward &= ~graph.edge_oneway
+
+        forward_edges = np.flatnonzero(self.forward)
+        backward_edges = np.flatnonzero(self.backward)
+        sources = np.concatenate(
+            (graph.edge_source[forward_edges], graph.edge_target[backward_edges])
+        )
+        heads = np.concatenate(
+            (graph.edge_target[forward_edges], graph.edge_source[backward_edges])
+        )
+        arc_edges = np.concatenate((forward_edges, backward_edges))
+        arc_forward = np.arange(len(arc_edges)) < len(forward_edges)
+        weights = np.maximum(
+            graph.edge_length[arc_edges] / self.edge_speed[arc_edges], MIN_WEIGHT
+        )
+
+        # Un seul arc (le plus rapide) par paire de sommets, triés par source
+        # puis destination
+        order = np.lexsort((weights, heads, sources))
+        sources, heads = sources[order], heads[order]
+        keep = np.ones(len(order), dtype=bool)
+        keep[1:] = (sources[1:] != sources[:-1]) | (heads[1:] != heads[:-1])
+        order = order[keep]
+
+        vertex_count = len(graph.vertex_lats)
+        self.indptr = np.concatenate(
+            ([0], np.cumsum(np.bincount(sources[keep], minlength=vertex_count)))
+        )
+        self.heads = heads[keep].astype(np.int64)
+        self.weights = weights[order]
+        self.arc_edges = arc_edges[order]
+        self.arc_forward = arc_forward[order]
+
+        # Rattachement: points de forme des seules arêtes autorisées
+        self.snap_points = np.flatnonzero(self.forward[graph.shape_edge])
+        self.tree = cKDTree(
+            unit_vectors(
+                graph.shape_lats[self.snap_points], graph.shape_lons[self.snap_points]
+            )
+        )
+
+    def snap(self, lat, lon):
+        """Point de route le plus proche (Snap), None au-delà de MAX_SNAP_KM"""
+        if not len(self.snap_points):
+            return None
+        chord, index = self.tree.query(unit_vectors([lat], [lon])[0])
+        distance = 2 * EARTH_RADIUS_KM * math.asin(min(chord / 2, 1.0))
+        if distance > MAX_SNAP_KM:
+            return None
+
+        point = int(self.snap_points[index])
+        return Snap(
+            point,
+            int(self.graph.shape_edge[point]),
+            float(self.graph.shape_distance[point]),
+            distance,
+        )
+
+    def departures(self, snap):
+        """(sommet, heures, vers l'avant) pour quitter l'arête du point"""
+        graph, edge = self.graph, snap.edge
+        length, speed = float(graph.edge_length[edge]), self.edge_speed[edge]
+        result = []
+        if self.forward[edge]:
+            result.append(
+                (int(graph.edge_target[edge]), (length - snap.offset) / speed, True)
+            )
+        if self.backward[edge]:
+            result.append((int(graph.edge_source[edge]), snap.offset / speed, False))
+        return result
+
+    def arrivals(self, snap):
+        """(sommet, heures, vers l'avant) pour rejoindre le point sur son arête"""
+        graph, edge = self.graph, snap.edge
+        length, speed = float(graph.edge_length[edge]), self.edge_speed[edge]
+        result = []
+        if self.forward[edge]:
+            result.append((int(graph.edge_source[edge]), snap.offset / speed, True))
+        if self.backward[edge]:
+            result.append(
+                (int(graph.edge_target[edge]), (length - snap.offset) / speed, False)
+            )
+        return result
+
+    def direct(self, origin, destination):
+        """Heures le long de l'arête commune aux deux points, None sinon"""
+        if origin.edge != destination.edge:
+            return None
+        delta = destination.offset - origin.offset
+        if (delta >= 0 and self.forward[origin.edge]) or (
+            delta <= 0 and self.backward[origin.edge]
+        ):
+            return abs(delta) / self.edge_speed[origin.edge]
+        return None
+
+    def shortest_path(self, origin, destination):
+        """
+        A* entre deux points rattachés. Retourne (heures, départ vers l'avant,
+        arcs, arrivée vers l'avant), arcs None pour un trajet sur la même
+        arête; None si la destination est inaccessible.
+        """
+        graph = self.graph
+        target = destination.point
+        remaining = (
+            haversine_vectorized(
+                float(graph.shape_lats[target]),
+                float(graph.shape_lons[target]),
+                graph.vertex_lats,
+                graph.vertex_lons,
+            )
+            / self.max_speed
+        ).tolist()
+
+        best = self.direct(origin, destination)
+        result = None if best is None else (best, None, None, None)
+        best = math.inf if best is None else best
+
+        arrivals = {}
+        for vertex, cost, forward in self.arrivals(destination):
+            if cost < arrivals.get(vertex, (math.inf,))[0]:
+                arrivals[vertex] = (cost, forward)
+
+        costs, parents, heap = {}, {}, []
+        for vertex, cost, forward in self.departures(origin):
+            if cost < costs.get(vertex, math.inf):
+                costs[vertex] = cost
+                parents[vertex] = (None, forward)
+                heapq.heappush(heap, (cost + remaining[vertex], cost, vertex))
+
+        end = None
+        while heap:
+            estimate, cost, vertex = heapq.heappop(heap)
+            if estimate >= best:
+                break
+            if cost > costs[vertex]:
+                continue
+            if vertex in arrivals and cost + arrivals[vertex][0] < best:
+                best, end = cost + arrivals[vertex][0], vertex
+
+            start, stop = self.indptr[vertex], self.indptr[vertex + 1]
+            for arc, head, weight in zip(
+                range(start, stop),
+                self.heads[start:stop].tolist(),
+                self.weights[start:stop].tolist(),
+            ):
+                cost_to_head = cost + weight
+                if cost_to_head < costs.get(head, math.inf):
+                    costs[head] = cost_to_head
+                    parents[head] = (vertex, arc)
+                    heapq.heappush(
+                        heap, (cost_to_head + remaining[head], cost_to_head, head)
+                    )
+
+        if end is None:
+            return result
+
+        arcs = []
+        vertex = end
+        while parents[vertex][0] is not None:
+            vertex, arc = parents[vertex]
+            arcs.append(arc)
+        arcs.reverse()
+        return best, parents[vertex][1], arcs, arrivals[end][1]
+
+    def shape_indices(self, edge, forward, start=None, stop=None):
+        """Indices des points de forme d'une arête (ou d'une portion), dans le sens parcouru"""
+        first, last = self.graph.shape_offsets[edge], self.graph.shape_offsets[edge + 1]
+        indices = np.arange(
+            first if start is None else start, last if stop is None else stop + 1
+        )
+        return indices if forward else indices[::-1]
+
+    def route(self, start_lat, start_lon, end_lat, end_lon):
+        """Itinéraire routier (format de get_route), None si impossible"""
+        origin = self.snap(start_lat, start_lon)
+        destination = self.snap(end_lat, end_lon)
+        if origin is None or destination is None:
+            return None
+        path = self.shortest_path(origin, destination)
+        if path is None:
+            return None
+
+        hours, departure, arcs, arrival = path
+        if arcs is None:
+            forward = destination.offset >= origin.offset
+            low, high = sorted((origin.point, destination.point))
+            pieces = [self.shape_indices(origin.edge, forward, low, high)]
+        else:
+            pieces = [
+                self.shape_indices(
+                    origin.edge,
+                    departure,
+                    *((origin.point, None) if departure else (None, origin.point)),
+                )
+            ]
+            pieces += [
+                self.shape_indices(
+                    int(self.arc_edges[arc]), bool(self.arc_forward[arc])
+                )
+                for arc in arcs
+            ]
+            pieces.append(
+                self.shape_indices(
+                    destination.edge,
+                    arrival,
+                    *(
+                        (None, destination.point)
+                        if arrival
+                        else (destination.point, None)
+                    ),
+                )
+            )
+
+        indices = np.concatenate(pieces)
+        lats = self.graph.shape_lats[indices].astype(np.float64)
+        lons = self.graph.shape_lons[indices].astype(np.float64)
+        access_km = origin.distance + destination.distance
+        distance = float(segment_lengths(lats, lons).sum()) + access_km
+        hours += access_km / ESTIMATE_SPEEDS[self.profile]
+
+        points = [(start_lat, start_lon), *zip(lats.tolist(), lons.tolist())]
+        points.append((end_lat, end_lon))
+        return {
+            "distance_km": round(distance, 2),
+            "duration_minutes": int(round(hours * 60)),
+            "profile": self.profile,
+            "engine": "road",
+            "route": [
+                {"lat": round(lat, 6), "lon": round(lon, 6)}
+                for index, (lat, lon) in enumerate(points)
+                # Sommets partagés par deux arêtes: un seul point
+                if index == 0 or (lat, lon) != points[index - 1]
+            ],
+        }
+
+    def matrix(self, origins, destinations):
+        """
+        Heures et kilomètres entre chaque origine et chaque destination
+        rattachées (None: point non rattaché ou inaccessible).
+
+        Les points sont ajoutés au graphe comme sommets virtuels reliés aux
+        extrémités de leur arête; Dijkstra (scipy) part de chaque origine.
+        """
+        graph = self.graph
+        vertex_count = len(graph.vertex_lats)
+        origin_base = vertex_count
+        destination_base = vertex_count + len(origins)
+
+        extra = {}  # (source, destination) -> (heures, km)
+
+        def add(source, head, hours, km):
+            if hours < extra.get((source, head), (math.inf,))[0]:
+                extra[(source, head)] = (max(hours, MIN_WEIGHT), km)
+
+        for i, snap in enumerate(origins):
+            if snap is None:
+                continue
+            speed = self.edge_speed[snap.edge]
+            for vertex, hours, _ in self.departures(snap):
+                add(origin_base + i, vertex, hours, hours * speed)
+            for j, other in enumerate(destinations):
+                hours = None if other is None else self.direct(snap, other)
+                if hours is not None:
+                    add(origin_base + i, destination_base + j, hours, hours * speed)
+        for j, snap in enumerate(destinations):
+            if snap is None:
+                continue
+            speed = self.edge_speed[snap.edge]
+            for vertex, hours, _ in self.arrivals(snap):
+                add(vertex, destination_base + j, hours, hours * speed)
+
+        size = destination_base + len(destinations)
+        base_sources = np.repeat(np.arange(vertex_count), np.diff(self.indptr))
+        extra_arcs = np.array(
+            [(source, head) for source, head in extra], dtype=np.int64
+        ).reshape(-1, 2)
+        matrix = sparse.csr_matrix(
+            (
+                np.concatenate((self.weights, [hours for hours, _ in extra.values()])),
+                (
+                    np.concatenate((base_sources, extra_arcs[:, 0])),
+                    np.concatenate((self.heads, extra_arcs[:, 1])),
+                ),
+            ),
+            shape=(size, size),
+        )
+
+        active = [i for i, snap in enumerate(origins) if snap is not None]
+        hours = np.full((len(origins), len(destinations)), np.inf)
+        kilometres = [[None] * len(destinations) for _ in origins]
+        if not active:
+            return hours, kilometres
+
+        times, predecessors = csgraph.dijkstra(
+            matrix,
+            directed=True,
+            indices=[origin_base + i for i in active],
+            return_predecessors=True,
+        )
+        heads = self.heads.tolist()
+        for row, i in enumerate(active):
+            # Distance depuis l'origine des sommets déjà parcourus
+            known = {origin_base + i: 0.0}
+            for j in range(len(destinations)):
+                vertex = destination_base + j
+                if not np.isfinite(times[row, vertex]):
+                    continue
+                hours[i, j] = times[row, vertex]
+
+                chain = []
+                while vertex not in known:
+                    chain.append(vertex)
+                    vertex = int(predecessors[row, vertex])
+                for vertex in reversed(chain):
+                    previous = int(predecessors[row, vertex])
+                    if (previous, vertex) in extra:
+                        km = extra[(previous, vertex)][1]
+                    else:
+                        arc = bisect_left(
+                            heads,
+                            vertex,
+                            self.indptr[previous],
+                            self.indptr[previous + 1],
+                        )
+                        km = float(graph.edge_length[self.arc_edges[arc]])
+                    known[vertex] = known[previous] + km
+                kilometres[i][j] = known[destination_base + j]
+
+        return hours, kilometres
+
+
+_graph = None
+_graph_lock = threading.Lock()
+
+
+def get_routing_graph():
+    """Graphe routier chargé (rechargé si le fichier change), None sans fichier"""
+    global _graph
+    path = settings.ROUTING_GRAPH_PATH
+    try:
+        version = os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+    if _graph is None or _graph.version != version:
+        with _graph_lock:
+            if _graph is None or _graph.version != version:
+                _graph = RoutingGraph.load(path)
+    return _graph
+
+
+def check_profile(profile):
+    if profile not in PROFILE_SPEEDS:
+        raise ValueError(f"Profil inconnu: {profile}")
+
+
+def estimate_route(start_lat, start_lon, end_lat, end_lon, profile="driving"):
+    """Estimation à vol d'oiseau, à vitesse constante"""
+    distance = float(
+        haversine_vectorized(start_lat, start_lon, np.array(end_lat), np.array(end_lon))
+    )
+    duration_hours = distance / ESTIMATE_SPEEDS[profile]
+
+    return {
+        "distance_km": round(distance, 2),
+        "duration_minutes": int(duration_hours * 60),
+        "profile": profile,
+        "engine": "estimate",
+        "route": [
+            {"lat": start_lat, "lon": start_lon},
+            {"lat": end_lat, "lon": end_lon},
+        ],
+    }
+
+
+def route(start_lat, start_lon, end_lat, end_lon, profile="driving"):
+    """Itinéraire routier (en cache), estimation à vol d'oiseau à défaut"""
+    check_profile(profile)
+    points = tuple(
+        round(float(value), ROUTE_PRECISION)
+        for value in (start_lat, start_lon, end_lat, end_lon)
+    )
+    graph = get_routing_graph()
+    if graph is None:
+        return estimate_route(*points, profile)
+
+    return cached(
+        "route",
+        (graph.version, profile, points),
+        ["routing"],
+        lambda: graph.profile(profile).route(*points)
+        or estimate_route(*points, profile),
+        timeout=ROUTE_CACHE_TIMEOUT,
+    )
+
+
+def distance_matrix(origins, destinations, profile="driving"):
+    """
+    Durées (minutes) et distances (km) de chaque origine [(lat, lon)] vers
+    chaque destination. Points loin de toute route: estimation à vol
+    d'oiseau; destination inaccessible: None.
+    """
+    check_profile(profile)
+    graph = get_routing_graph()
+    profile_graph = graph.profile(profile) if graph is not None else None
+    if profile_graph is not None:
+        origin_snaps = [profile_graph.snap(lat, lon) for lat, lon in origins]
+        destination_snaps = [profile_graph.snap(lat, lon) for lat, lon in destinations]
+        hours, kilometres = profile_graph.matrix(origin_snaps, destination_snaps)
+
+    durations, distances = [], []
+    for i, (start_lat, start_lon) in enumerate(origins):
+        duration_row, distance_row = [], []
+        for j, (end_lat, end_lon) in enumerate(destinations):
+            if profile_graph is None or None in (
+                origin_snaps[i],
+                destination_snaps[j],
+            ):
+                estimate = estimate_route(
+                    start_lat, start_lon, end_lat, end_lon, profile
+                )
+                duration_row.append(estimate["duration_minutes"])
+                distance_row.append(estimate["distance_km"])
+            elif kilometres[i][j] is None:
+                duration_row.append(None)
+                distance_row.append(None)
+            else:
+                access_km = origin_snaps[i].distance + destination_snaps[j].distance
+                minutes = (hours[i, j] + access_km / ESTIMATE_SPEEDS[profile]) * 60
+                duration_row.append(int(round(minutes)))
+                distance_row.append(round(float(kilometres[i][j] + access_km), 2))
+        durations.append(duration_row)
+        distances.append(distance_row)
+
+    return {
+        "profile": profile,
+        "engine": "estimate" if profile_graph is None else "road",
+        "durations_minutes": durations,
+        "distances_km": distances,
+    }
@@ -1,24 +1,42 @@
 from rest_framework import serializers
+from .images import srcset
 from .models import Category, Product, ProductReview, Wishlist
 from apps.accounts.serializers import UserSerializer  
 
 
+class DynamicFieldsMixin:
+    """Restreindre les champs sérialisés: Serializer(..., fields=["id", "name"])"""
+
+    def __init__(self, *args, **kwargs):
+        fields = kwargs.pop("fields", None)
+        super().__init__(*args, **kwargs)
+
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+
 class CategorySerializer(serializers.ModelSerializer):
     class Meta:
         model = Category
         fields = ["id", "name", "description", "image", "parent"]
 
 
-class ProductSerializer(serializers.ModelSerializer):
+class ProductSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     farmer = UserSerializer(read_only=True)
     category = CategorySerializer(read_only=True)
     main_image = serializers.SerializerMethodField()
+    main_image_srcset = serializers.SerializerMethodField()
+    images_srcset = serializers.SerializerMethodField()
     category_id = serializers.PrimaryKeyRelatedField(
         queryset=Category.objects.all(), source="category", write_only=True
     )
     is_available = serializers.BooleanField(read_only=True)
     average_rating = serializers.FloatField(read_only=True)
-    total_reviews = serializers.IntegerField(read_only=True)
+    total_reviews = serializers.IntegerField(source="review_count", read_only=True)
+    rating_histogram = serializers.DictField(
+        child=serializers.IntegerField(), read_only=True
+    )
 
     class Meta:
         model = Product
@@ -40,12 +58,15 @@ class ProductSerializer(serializers.ModelSerializer):
             "delivery_radius",
             "status",
             "main_image",
+            "main_image_srcset",
             "images",
+            "images_srcset",
             "views_count",
             "orders_count",
             "is_available",
             "average_rating",
             "total_reviews",
+            "rating_histogram",
             "created_at",
             "updated_at",
         ]
@@ -88,6 +109,30 @@ class ProductSerializer(serializers.ModelSerializer):
             return obj.main_image.url
         return None
 
+    def get_main_image_srcset(self, obj):
+        if not obj.main_image:
+            return None
+        return self._image_srcset(obj, obj.main_image.name)
+
+    def get_images_srcset(self, obj):
+        return [self._image_srcset(obj, image) for image in obj.images or []]
+
+    def _image_srcset(self, obj, source):
+        """srcset WebP/JPEG d'une image, None si les variantes n'existent pas encore"""
+        if not isinstance(source, str):
+            return None
+
+        variants = (obj.image_variants or {}).get(source)
+        if not variants:
+            return None
+
+        request = self.context.get("request")
+        build_url = request.build_absolute_uri if request else str
+        return {
+            image_format: srcset(variants, image_format, build_url)
+            for image_format in ("webp", "jpeg")
+        }
+
 
 class ProductCreateSerializer(serializers.ModelSerializer):
     class Meta:
@@ -176,6 +221,63 @@ class ProductUpdateSerializer(serializers.ModelSerializer):
         return super().update(instance, validated_data)
 
 
+class ProductImportSerializer(serializers.ModelSerializer):
+    """Ligne d'un import en masse (CSV/JSONL); `id` présent = mise à jour"""
+
+    id = serializers.IntegerField(required=False)
+    # Vérifiée par lot dans l'import (une requête pour tout le lot)
+    category = serializers.IntegerField(required=False, allow_null=True)
+
+    class Meta:
+        model = Product
+        fields = [
+            "id",
+            "category",
+            "name",
+            "description",
+            "price_per_unit",
+            "unit",
+            "available_quantity",
+            "harvest_date",
+            "expiry_date",
+            "organic",
+            "quality_grade",
+            "farm_location",
+            "delivery_radius",
+            "status",
+        ]
+
+    def validate(self, data):
+        harvest_date = data.get("harvest_date")
+        expiry_date = data.get("expiry_date")
+
+        if expiry_date and harvest_date and expiry_date < harvest_date:
+            raise serializers.ValidationError(
+                {
+                    "expiry_date": "La date d'expiration doit être après la date de récolte."
+                }
+            )
+
+        return data
+
+
+class StockChangeSerializer(serializers.Serializer):
+    """Changement de stock: quantité absolue ou variation (delta)"""
+
+    product = serializers.IntegerField()
+    quantity = serializers.DecimalField(
+        max_digits=10, decimal_places=2, min_value=0, required=False
+    )
+    delta = serializers.DecimalField(max_digits=10, decimal_places=2, required=False)
+
+    def validate(self, data):
+        if ("quantity" in data) == ("delta" in data):
+            raise serializers.ValidationError(
+                "Indiquer soit 'quantity' (absolue), soit 'delta' (variation)."
+            )
+        return data
+
+
 class ProductReviewSerializer(serializers.ModelSerializer):
     user = UserSerializer(read_only=True)
 
@@ -0,0 +1,255 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from apps.accounts.models import User
+from apps.accounts.serializers import UserSerializer
+from .cache import invalidate_tags
+from .geo import remove_farmer_location, update_farmer_location
+from .images import missing_variants, schedule_image_variants
+from .alerts import record_changes
+from .coverage import COVERAGE_STATUSES, update_coverage
+from .models import Category, Product, ProductChange, ProductReview
+from .prices import price_key, record_prices
+
+
+@receiver(pre_save, sender=User)
+def remember_previous_location(sender, instance, update_fields=None, **kwargs):
+    instance._previous_location = instance._previous_user_type = None
+    if instance.pk and (
+        update_fields is None
+        or {"latitude", "longitude", "user_type"} & set(update_fields)
+    ):
+        previous = (
+            User.objects.filter(pk=instance.pk)
+            .values_list("latitude", "longitude", "user_type")
+            .first()
+        )
+        if previous is not None:
+            instance._previous_location = previous[:2]
+            instance._previous_user_type = previous[2]
+
+
+def location_changed(instance):
+    """Position modifiée depuis le pre_save (None si non mémorisée)"""
+    previous = getattr(instance, "_previous_location", None)
+    if previous is None:
+        return None
+    location = (instance.latitude, instance.longitude)
+    return [None if value is None else float(value) for value in previous] != [
+        None if value is None else float(value) for value in location
+    ]
+
+
+@receiver(post_save, sender=User)
+def sync_farmer_location(sender, instance, created, **kwargs):
+    """Mettre à jour l'index spatial quand la position d'un agriculteur change"""
+    if created:
+        if instance.user_type == "farmer":
+            update_farmer_location(instance)
+        return
+
+    if location_changed(instance) or (
+        getattr(instance, "_previous_user_type", None) not in (None, instance.user_type)
+    ):
+        update_farmer_location(instance)
+
+
+@receiver(post_save, sender=User)
+def update_farmer_coverage(sender, instance, created, **kwargs):
+    """Recalculer la couverture de livraison des produits d'un agriculteur déplacé"""
+    if created or not location_changed(instance):
+        return
+
+    update_coverage(Product.objects.filter(farmer_id=instance.pk))
+    # Listes en cache filtrées par ?deliverable_to=
+    invalidate_on_commit("products")
+
+
+@receiver(post_save, sender=User)
+def invalidate_farmer_products(sender, instance, created, update_fields=None, **kwargs):
+    """Les produits en cache (listes, détail, ETag) embarquent leur agriculteur"""
+    if created or (
+        update_fields is not None
+        and not set(UserSerializer.Meta.fields) & set(update_fields)
+    ):
+        return
+
+    product_ids = list(
+        Product.objects.filter(farmer_id=instance.pk).values_list("pk", flat=True)
+    )
+    if product_ids:
+        transaction.on_commit(
+            lambda: invalidate_tags(
+                "products", *(f"product:{pk}" for pk in product_ids)
+            )
+        )
+
+
+@receiver(post_delete, sender=User)
+def remove_farmer_from_index(sender, instance, **kwargs):
+    remove_farmer_location(instance.id)
+
+
+# NOTES DES PRODUITS
+@receiver(pre_save, sender=ProductReview)
+def remember_previous_rating(sender, instance, **kwargs):
+    """Mémoriser la note avant modification pour ajuster les agrégats"""
+    instance._previous_rating = None
+    if instance.pk:
+        instance._previous_rating = (
+            ProductReview.objects.filter(pk=instance.pk)
+            .values("product_id", "rating")
+            .first()
+        )
+
+
+@receiver(post_save, sender=ProductReview)
+def update_rating_on_save(sender, instance, created, **kwargs):
+    previous = getattr(instance, "_previous_rating", None)
+
+    if created or previous is None:
+        Product.apply_rating_change(instance.product_id, added=instance.rating)
+    elif previous["product_id"] != instance.product_id:
+        Product.apply_rating_change(previous["product_id"], removed=previous["rating"])
+        Product.apply_rating_change(instance.product_id, added=instance.rating)
+    else:
+        Product.apply_rating_change(
+            instance.product_id, added=instance.rating, removed=previous["rating"]
+        )
+
+
+@receiver(post_delete, sender=ProductReview)
+def update_rating_on_delete(sender, instance, **kwargs):
+    Product.apply_rating_change(instance.product_id, removed=instance.rating)
+
+
+# ARBORESCENCE DES CATÉGORIES
+@receiver(pre_delete, sender=Category)
+def detach_category_children(sender, instance, **kwargs):
+    # SET_NULL ne passe pas par save(): recalculer les chemins des sous-arbres
+    for child in instance.children.all():
+        child.parent = None
+        child.save()
+
+
+# INVALIDATION DU CACHE DU CATALOGUE
+# Tags calculés immédiatement (pk remis à None après une suppression) et
+# invalidés à la validation: une lecture concurrente ne doit pas remettre en
+# cache les données d'avant la transaction sous la nouvelle version
+def invalidate_on_commit(*tags):
+    transaction.on_commit(lambda: invalidate_tags(*tags))
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def invalidate_product_cache(sender, instance, **kwargs):
+    invalidate_on_commit("products", f"product:{instance.pk}")
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_category_cache(sender, instance, **kwargs):
+    invalidate_on_commit("categories", f"category:{instance.pk}")
+
+
+@receiver(post_save, sender=ProductReview)
+@receiver(post_delete, sender=ProductReview)
+def invalidate_review_cache(sender, instance, **kwargs):
+    # Les agrégats de notes apparaissent dans les listes et le détail
+    tags = ["products", f"product:{instance.product_id}"]
+    previous = getattr(instance, "_previous_rating", None)
+    if previous and previous["product_id"] != instance.product_id:
+        tags.append(f"product:{previous['product_id']}")
+    invalidate_on_commit(*tags)
+
+
+# VARIANTES DES IMAGES
+@receiver(post_save, sender=Product)
+def schedule_product_image_variants(sender, instance, update_fields=None, **kwargs):
+    """Générer en arrière-plan les variantes des nouvelles images"""
+    if update_fields is not None and not (
+        {"main_image", "images"} & set(update_fields)
+    ):
+        return
+
+    if missing_variants(instance):
+        schedule_image_variants(instance)
+
+
+# HISTORIQUE DES PRIX ET JOURNAL DES CHANGEMENTS
+PRICE_FIELDS = {"price_per_unit", "unit", "category"}
+STOCK_FIELDS = {"available_quantity", "status"}
+COVERAGE_FIELDS = {"delivery_radius", "status", "farmer"}
+
+
+def tracks(update_fields, fields):
+    return update_fields is None or bool(fields & set(update_fields))
+
+
+@receiver(pre_save, sender=Product)
+def remember_previous_state(sender, instance, update_fields=None, **kwargs):
+    instance._previous_state = None
+    if instance.pk and tracks(
+        update_fields, PRICE_FIELDS | STOCK_FIELDS | COVERAGE_FIELDS
+    ):
+        instance._previous_state = (
+            Product.objects.filter(pk=instance.pk)
+            .values(
+                "price_per_unit",
+                "unit",
+                "category_id",
+                "available_quantity",
+                "status",
+                "delivery_radius",
+                "farmer_id",
+            )
+            .first()
+        )
+
+
+@receiver(post_save, sender=Product)
+def record_price_change(sender, instance, created, update_fields=None, **kwargs):
+    if not tracks(update_fields, PRICE_FIELDS):
+        return
+
+    previous = getattr(instance, "_previous_state", None)
+    if (
+        created
+        or previous is None
+        or (previous["price_per_unit"], previous["unit"], previous["category_id"])
+        != price_key(instance)
+    ):
+        record_prices([instance])
+        if not created:
+            record_changes([instance.pk], ProductChange.Kind.PRICE)
+
+
+@receiver(post_save, sender=Product)
+def record_stock_change(sender, instance, created, update_fields=None, **kwargs):
+    previous = getattr(instance, "_previous_state", None)
+    if created or previous is None or not tracks(update_fields, STOCK_FIELDS):
+        return
+
+    if (previous["available_quantity"], previous["status"]) != (
+        instance.available_quantity,
+        instance.status,
+    ):
+        record_changes([instance.pk], ProductChange.Kind.STOCK)
+
+
+# COUVERTURE DE LIVRAISON
+def coverage_key(status, delivery_radius, farmer_id):
+    return (status in COVERAGE_STATUSES, delivery_radius, farmer_id)
+
+
+@receiver(post_save, sender=Product)
+def update_product_coverage(sender, instance, created, update_fields=None, **kwargs):
+    previous = getattr(instance, "_previous_state", None)
+    if not created and (previous is None or not tracks(update_fields, COVERAGE_FIELDS)):
+        return
+
+    if created or coverage_key(
+        previous["status"], previous["delivery_radius"], previous["farmer_id"]
+    ) != coverage_key(instance.status, instance.delivery_radius, instance.farmer_id):
+        update_coverage(Product.objects.filter(pk=instance.pk))
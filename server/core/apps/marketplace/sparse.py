@@ -0,0 +1,150 @@
+"""
+Réponses partielles pour les listes de produits.
+
+?fields=id,name,price_per_unit
+    Seuls ces champs de ProductSerializer sont sérialisés, et la requête SQL
+    ne lit que les colonnes (et jointures) dont ils dépendent.
+?view=compact
+    Lignes légères pour les épingles de carte et l'autocomplétion (id, nom,
+    prix, image, coordonnées), lues avec values() sans instancier de modèles
+    ni de sérialiseurs.
+"""
+
+from django.core.files.storage import default_storage
+from django.db.models import F
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.response import Response
+
+from .serializers import DynamicFieldsMixin, ProductSerializer
+
+COMPACT_VIEW = "compact"
+
+# Colonnes lues par les champs de ProductSerializer (par défaut: le nom du champ)
+PRODUCT_FIELD_COLUMNS = {
+    "category_id": (),
+    "main_image_srcset": ("main_image", "image_variants"),
+    "images_srcset": ("images", "image_variants"),
+    "is_available": ("status", "available_quantity"),
+    "total_reviews": ("review_count",),
+    "rating_histogram": tuple(f"rating_{rating}_count" for rating in range(1, 6)),
+}
+PRODUCT_RELATIONS = ("farmer", "category")
+
+COMPACT_COLUMNS = ("id", "name", "price_per_unit", "unit", "main_image")
+COMPACT_COORDINATES = {
+    "latitude": F("farmer__latitude"),
+    "longitude": F("farmer__longitude"),
+}
+
+
+def parse_fields(value, available=ProductSerializer.Meta.fields):
+    """Liste des champs demandés (?fields=a,b), None si absente"""
+    if not value:
+        return None
+
+    fields = [name.strip() for name in value.split(",") if name.strip()]
+    unknown = sorted(set(fields) - set(available))
+    if unknown:
+        raise ValidationError({"fields": f"Champs inconnus: {', '.join(unknown)}"})
+    return fields
+
+
+def narrow_queryset(queryset, fields, extra=()):
+    """Ne lire que les colonnes et jointures nécessaires aux champs"""
+    columns = {"id", *extra}
+    for name in fields:
+        columns.update(PRODUCT_FIELD_COLUMNS.get(name, (name,)))
+
+    related = [relation for relation in PRODUCT_RELATIONS if relation in fields]
+    queryset = queryset.select_related(None)
+    if related:
+        queryset = queryset.select_related(*related)
+    return queryset.only(*columns)
+
+
+def compact_queryset(queryset, extra=()):
+    # Colonnes d'ordre (pagination keyset) lues en plus, retirées à la sortie
+    columns = dict.fromkeys((*COMPACT_COLUMNS, *extra))
+    return queryset.select_related(None).values(*columns, **COMPACT_COORDINATES)
+
+
+def compact_data(rows, request=None):
+    build_url = request.build_absolute_uri if request else str
+    return [
+        {
+            "id": row["id"],
+            "name": row["name"],
+            "price_per_unit": str(row["price_per_unit"]),
+            "unit": row["unit"],
+            "main_image": (
+                build_url(default_storage.url(row["main_image"]))
+                if row["main_image"]
+                else None
+            ),
+            "latitude": float(row["latitude"]) if row["latitude"] is not None else None,
+            "longitude": (
+                float(row["longitude"]) if row["longitude"] is not None else None
+            ),
+        }
+        for row in rows
+    ]
+
+
+class SparseFieldsMixin:
+    """
+    ?fields= et ?view=compact pour les vues qui listent des produits
+    (lecture seulement).
+    """
+
+    def is_compact_view(self):
+        return (
+            self.request.method in SAFE_METHODS
+            and self.request.query_params.get("view") == COMPACT_VIEW
+        )
+
+    def get_sparse_fields(self):
+        if self.request.method not in SAFE_METHODS or self.is_compact_view():
+            return None
+        if not hasattr(self, "_sparse_fields"):
+            self._sparse_fields = parse_fields(self.request.query_params.get("fields"))
+        return self._sparse_fields
+
+    def keyset_fields(self):
+        return tuple(name.lstrip("-") for name in getattr(self, "keyset_ordering", ()))
+
+    def sparse_queryset(self, queryset):
+        fields = self.get_sparse_fields()
+        if fields is None:
+            return queryset
+        return narrow_queryset(queryset, fields, self.keyset_fields())
+
+    def serialize_products(self, products, many=True):
+        return ProductSerializer(
+            products,
+            many=many,
+            context=self.get_serializer_context(),
+            fields=self.get_sparse_fields(),
+        ).data
+
+    def product_list_response(self, queryset):
+        """Liste paginée de produits, complète, partielle ou compacte"""
+        if self.is_compact_view():
+            page = self.paginate_queryset(
+                compact_queryset(queryset, self.keyset_fields())
+            )
+            if page is not None:
+                return self.get_paginated_response(compact_data(page, self.request))
+            return Response(compact_data(compact_queryset(queryset), self.request))
+
+        queryset = self.sparse_queryset(queryset)
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(self.serialize_products(page))
+        return Response(self.serialize_products(queryset))
+
+    def get_serializer(self, *args, **kwargs):
+        # ?fields= ne concerne que les sérialiseurs de produits
+        if issubclass(self.get_serializer_class(), DynamicFieldsMixin):
+            kwargs.setdefault("fields", self.get_sparse_fields())
+        return super().get_serializer(*args, **kwargs)
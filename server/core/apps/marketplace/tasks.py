@@ -0,0 +1,64 @@
+from celery import shared_task
+
+from .alerts import process_wishlist_alerts
+from .counters import flush_all_counters
+from .images import process_product_images, products_missing_variants
+from .prices import rollup_price_index
+from .rankings import compute_rankings
+from .recommendations import update_recommendations
+
+
+@shared_task
+def flush_buffered_counters():
+    """Écrire en base les compteurs accumulés (vues, commandes)"""
+    flushed = flush_all_counters()
+    return f"Counters flushed: {sum(flushed.values())} rows updated"
+
+
+@shared_task
+def compute_product_rankings():
+    """Recalculer les classements en vedette / tendance"""
+    count = compute_rankings()
+    return f"Product rankings computed: {count}"
+
+
+@shared_task
+def generate_product_image_variants(product_id, force=False):
+    """Générer les variantes WebP/JPEG des images d'un produit"""
+    processed = process_product_images(product_id, force=force)
+    return f"Image variants generated for product {product_id}: {processed}"
+
+
+@shared_task
+def generate_missing_image_variants():
+    """Rattraper les variantes non planifiées (broker indisponible, échec)"""
+    processed = sum(
+        process_product_images(product_id) for product_id in products_missing_variants()
+    )
+    return f"Missing image variants generated: {processed}"
+
+
+@shared_task
+def rollup_product_prices():
+    """Mettre à jour l'indice de prix journalier"""
+    days = rollup_price_index()
+    return f"Price index rolled up: {days} days"
+
+
+@shared_task
+def update_product_recommendations():
+    """Intégrer les nouvelles commandes livrées aux recommandations"""
+    batch = update_recommendations()
+    if batch is None:
+        return "Product recommendations: already running"
+    return (
+        f"Product recommendations updated: {batch.order_count} orders, "
+        f"{batch.product_count} products"
+    )
+
+
+@shared_task
+def send_wishlist_alerts():
+    """Alertes de baisse de prix et de retour en stock (listes de souhaits)"""
+    users, products = process_wishlist_alerts()
+    return f"Wishlist alerts: {users} users notified, {products} products changed"
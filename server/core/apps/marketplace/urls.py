@@ -1,12 +1,17 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from .views import (
+    AutocompleteView,
     CategoryViewSet,
     ProductViewSet,
     ProductReviewViewSet,
     WishlistViewSet,
     ProductSearchView,
     CategoryProductsView,
+    CatalogCacheStatsView,
+    PriceIndexView,
+    RouteMatrixView,
+    RouteView,
 )
 
 router = DefaultRouter()
@@ -18,9 +23,14 @@ router.register(r"wishlist", WishlistViewSet, basename="wishlist")
 urlpatterns = [
     path("", include(router.urls)),
     path("search/", ProductSearchView.as_view(), name="product-search"),
+    path("autocomplete/", AutocompleteView.as_view(), name="autocomplete"),
     path(
         "categories/<int:category_id>/products/",
         CategoryProductsView.as_view(),
         name="category-products",
     ),
+    path("price-index/", PriceIndexView.as_view(), name="price-index"),
+    path("route/", RouteView.as_view(), name="route"),
+    path("route-matrix/", RouteMatrixView.as_view(), name="route-matrix"),
+    path("cache-stats/", CatalogCacheStatsView.as_view(), name="catalog-cache-stats"),
 ]
@@ -1,13 +1,49 @@
 from rest_framework import viewsets, generics, filters, status
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.parsers import MultiPartParser
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated, IsAuthenticatedOrReadOnly
+from rest_framework.permissions import (
+    IsAdminUser,
+    IsAuthenticated,
+    IsAuthenticatedOrReadOnly,
+)
+from rest_framework.views import APIView
 from django_filters.rest_framework import DjangoFilterBackend
+from django.core.files.storage import default_storage
+from django.db import transaction
 from django.db.models import Q, Count, Avg, Sum
+from django.http import StreamingHttpResponse
 from django.utils import timezone
+from django.utils.dateparse import parse_date
 from datetime import timedelta
-
-from .models import Category, Product, ProductReview, Wishlist
+from decimal import Decimal, InvalidOperation
+import csv
+
+from .autocomplete import AUTOCOMPLETE_LIMIT, SUGGESTION_KINDS, autocomplete
+from .bulk import (
+    FILE_FORMATS,
+    export_rows,
+    guess_file_format,
+    import_products,
+    read_rows,
+)
+from .cache import TaggedConditionalMixin, cached, get_stats, reset_stats
+from .counters import product_views
+from .coverage import deliverable_to
+from .facets import product_facets
+from .geo import nearby_products, parse_point
+from .models import Category, Product, ProductRanking, ProductReview, Wishlist
+from .prices import PRICE_INDEX_DEFAULT_DAYS, PRICE_INDEX_MAX_DAYS, price_series
+from .rankings import (
+    RANKING_SIZE,
+    ranked_products,
+    ranking_freshness,
+    ranking_scope,
+)
+from .recommendations import recommended_products
+from .routing import MATRIX_MAX_POINTS, distance_matrix, route
+from .sparse import SparseFieldsMixin
 from .serializers import (
     CategorySerializer,
     ProductSerializer,
@@ -15,13 +51,75 @@ from .serializers import (
     ProductReviewSerializer,
     WishlistSerializer,
     ProductUpdateSerializer,
+    StockChangeSerializer,
 )
 from .permissions import IsFarmerOrReadOnly, IsProductOwner
 from apps.notifications.utils import send_product_notification
+from betteragri.pagination import (
+    OptionalKeysetPagination,
+    decode_cursor,
+    encode_cursor,
+)
+
+MAX_BULK_STOCK_ITEMS = 500
+
+
+def date_range(params, default_days=PRICE_INDEX_DEFAULT_DAYS):
+    """Période ?start=AAAA-MM-JJ&end=AAAA-MM-JJ (ValueError si invalide)"""
+    end = parse_date(params["end"]) if params.get("end") else timezone.localdate()
+    start = (
+        parse_date(params["start"])
+        if params.get("start")
+        else end - timedelta(days=default_days - 1)
+    )
+    if start is None or end is None or start > end:
+        raise ValueError("Période invalide")
+    if (end - start).days >= PRICE_INDEX_MAX_DAYS:
+        raise ValueError(f"Période limitée à {PRICE_INDEX_MAX_DAYS} jours")
+    return start, end
+
+
+def filter_deliverable(queryset, params):
+    """?deliverable_to=lat,lon: produits livrables en ce point"""
+    value = params.get("deliverable_to")
+    if not value:
+        return queryset
+    try:
+        lat, lon = parse_point(value)
+    except ValueError as error:
+        raise ValidationError({"deliverable_to": str(error)})
+    return deliverable_to(queryset, lat, lon)
+
+
+def build_category_tree():
+    """Arbre imbriqué de toutes les catégories, construit en une requête"""
+    nodes = {}
+    roots = []
+    categories = Category.objects.order_by("depth", "name").values(
+        "id", "name", "description", "image", "parent_id", "depth"
+    )
+    for category in categories:
+        node = {
+            "id": category["id"],
+            "name": category["name"],
+            "description": category["description"],
+            "image": (
+                default_storage.url(category["image"]) if category["image"] else None
+            ),
+            "depth": category["depth"],
+            "children": [],
+        }
+        nodes[category["id"]] = node
+        # Les parents sont lus avant leurs enfants (tri par profondeur)
+        parent = nodes.get(category["parent_id"])
+        (parent["children"] if parent else roots).append(node)
+    return roots
 
 
 # CATEGORY VIEWSET
-class CategoryViewSet(viewsets.ReadOnlyModelViewSet):
+class CategoryViewSet(
+    TaggedConditionalMixin, SparseFieldsMixin, viewsets.ReadOnlyModelViewSet
+):
     """
     ViewSet pour les catégories de produits.
     Lecture seule pour tous les utilisateurs.
@@ -33,6 +131,11 @@ class CategoryViewSet(viewsets.ReadOnlyModelViewSet):
     filter_backends = [filters.SearchFilter]
     search_fields = ["name", "description"]
 
+    def get_etag_tags(self):
+        if self.action == "products":
+            return ["products", "categories"]
+        return ["categories"]
+
     def get_queryset(self):
         queryset = super().get_queryset()
 
@@ -50,17 +153,36 @@ class CategoryViewSet(viewsets.ReadOnlyModelViewSet):
 
         return queryset
 
+    def list(self, request, *args, **kwargs):
+        # Liste en cache, invalidée à chaque modification d'une catégorie
+        parent_list = super().list
+        data = cached(
+            "categories",
+            request.build_absolute_uri(),
+            ["categories"],
+            lambda: parent_list(request, *args, **kwargs).data,
+        )
+        return Response(data)
+
+    @action(detail=False, methods=["get"])
+    def tree(self, request):
+        """Arborescence complète des catégories (menus)"""
+        data = cached("category_tree", "tree", ["categories"], build_category_tree)
+        return Response(data)
+
     @action(detail=True, methods=["get"])
     def products(self, request, pk=None):
         """Obtenir tous les produits d'une catégorie"""
         category = self.get_object()
-        products = (
-            Product.objects.filter(
-                category=category, status="active", available_quantity__gt=0
-            )
-            .select_related("farmer")
-            .prefetch_related("reviews")
-        )
+        # Catégorie et sous-catégories: une requête sur le chemin indexé.
+        # Chemin pas encore calculé: startswith("") renverrait tout le catalogue
+        if category.path:
+            scope = Q(category__path__startswith=category.path)
+        else:
+            scope = Q(category_id=category.pk)
+        products = Product.objects.filter(
+            scope, status="active", available_quantity__gt=0
+        ).select_related("farmer", "category")
 
         # Appliquer les filtres
         min_price = request.query_params.get("min_price")
@@ -73,31 +195,19 @@ class CategoryViewSet(viewsets.ReadOnlyModelViewSet):
             products = products.filter(price_per_unit__lte=max_price)
         if organic and organic.lower() == "true":
             products = products.filter(organic=True)
+        products = filter_deliverable(products, request.query_params)
 
-        # Pagination
-        page = self.paginate_queryset(products)
-        if page is not None:
-            serializer = ProductSerializer(
-                page, many=True, context={"request": request}
-            )
-            return self.get_paginated_response(serializer.data)
-
-        serializer = ProductSerializer(
-            products, many=True, context={"request": request}
-        )
-        return Response(serializer.data)
+        return self.product_list_response(products)
 
 
 # PRODUCT VIEWSET
-class ProductViewSet(viewsets.ModelViewSet):
+class ProductViewSet(TaggedConditionalMixin, SparseFieldsMixin, viewsets.ModelViewSet):
     """
     ViewSet pour les produits.
     Les agriculteurs peuvent créer/modifier, tout le monde peut lire.
     """
 
-    queryset = Product.objects.select_related("farmer", "category").prefetch_related(
-        "reviews"
-    )
+    queryset = Product.objects.select_related("farmer", "category")
     permission_classes = [IsAuthenticatedOrReadOnly, IsFarmerOrReadOnly]
     filter_backends = [
         DjangoFilterBackend,
@@ -106,10 +216,35 @@ class ProductViewSet(viewsets.ModelViewSet):
     ]
     filterset_fields = ["category", "farmer", "organic", "quality_grade", "status"]
     search_fields = ["name", "description", "farm_location"]
-    ordering_fields = ["price_per_unit", "created_at", "views_count", "orders_count"]
+    ordering_fields = [
+        "price_per_unit",
+        "created_at",
+        "views_count",
+        "orders_count",
+        "average_rating",
+    ]
     ordering = ["-created_at"]
-    queryset = Product.objects.all()
     serializer_class = ProductSerializer
+    pagination_class = OptionalKeysetPagination
+    keyset_ordering = ("-created_at", "-id")
+
+    def get_etag_tags(self):
+        # Listes des agriculteurs et produits à proximité: non validées
+        pk = self.kwargs.get("pk")
+        return {
+            "list": ["products", "categories"],
+            "retrieve": [f"product:{pk}", "categories"],
+            "recommendations": ["recommendations", "products"],
+            "price_history": [f"product:{pk}"],
+            "featured_products": ["rankings", "products", "categories"],
+            "trending_products": ["rankings", "products", "categories"],
+        }.get(self.action)
+
+    def not_modified(self, request, response):
+        # Une vue servie par le cache du client compte quand même
+        if self.action == "retrieve":
+            product_views.incr(int(self.kwargs["pk"]))
+        return response
 
     @action(
         detail=False,
@@ -118,10 +253,75 @@ class ProductViewSet(viewsets.ModelViewSet):
         url_path="my-products",
     )
     def my_products(self, request):
-        products = self.queryset.filter(farmer=request.user)
+        products = self.sparse_queryset(self.queryset.filter(farmer=request.user))
         serializer = self.get_serializer(products, many=True)
         return Response(serializer.data)
 
+    @action(
+        detail=False,
+        methods=["post"],
+        permission_classes=[IsAuthenticated, IsFarmerOrReadOnly],
+        parser_classes=[MultiPartParser],
+        url_path="bulk-import",
+    )
+    def bulk_import(self, request):
+        """Importer des produits depuis un fichier CSV ou JSONL (champ `file`)"""
+        uploaded_file = request.FILES.get("file")
+        if uploaded_file is None:
+            return Response(
+                {"error": "Fichier requis (champ 'file')"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        file_format = request.data.get("file_format") or guess_file_format(
+            uploaded_file.name
+        )
+        if file_format not in FILE_FORMATS:
+            return Response(
+                {"error": "Format non supporté (csv ou jsonl)"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        try:
+            summary = import_products(
+                request.user, read_rows(uploaded_file, file_format)
+            )
+        except (UnicodeDecodeError, csv.Error) as error:
+            return Response(
+                {"error": f"Fichier illisible: {error}"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        return Response(summary)
+
+    @action(
+        detail=False,
+        methods=["get"],
+        permission_classes=[IsAuthenticated],
+        url_path="export",
+    )
+    def export(self, request):
+        """Exporter ses produits en CSV ou JSONL (?file_format=csv|jsonl)"""
+        file_format = request.query_params.get("file_format", "csv")
+        if file_format not in FILE_FORMATS:
+            return Response(
+                {"error": "Format non supporté (csv ou jsonl)"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        content_types = {
+            "csv": "text/csv; charset=utf-8",
+            "jsonl": "application/x-ndjson; charset=utf-8",
+        }
+        response = StreamingHttpResponse(
+            export_rows(Product.objects.filter(farmer=request.user), file_format),
+            content_type=content_types[file_format],
+        )
+        response["Content-Disposition"] = (
+            f'attachment; filename="produits.{file_format}"'
+        )
+        return response
+
     def get_serializer_class(self):
         if self.action == "create":
             return ProductCreateSerializer
@@ -162,12 +362,13 @@ class ProductViewSet(viewsets.ModelViewSet):
         if city:
             queryset = queryset.filter(farmer__city=city)
 
-        # Annoter avec la note moyenne
-        queryset = queryset.annotate(
-            average_rating=Avg("reviews__rating"), total_reviews=Count("reviews")
-        )
+        queryset = filter_deliverable(queryset, self.request.query_params)
 
-        return queryset
+        # ?fields=: ne lire que les colonnes nécessaires
+        return self.sparse_queryset(queryset)
+
+    def list(self, request, *args, **kwargs):
+        return self.product_list_response(self.filter_queryset(self.get_queryset()))
 
     def perform_create(self, serializer):
         product = serializer.save(farmer=self.request.user)
@@ -187,11 +388,60 @@ class ProductViewSet(viewsets.ModelViewSet):
             )
 
     def retrieve(self, request, *args, **kwargs):
-        instance = self.get_object()
-        instance.views_count += 1
-        instance.save(update_fields=["views_count"])
-        serializer = self.get_serializer(instance)
-        return Response(serializer.data)
+        pk = self.kwargs["pk"]
+        data = cached(
+            "product_detail",
+            request.build_absolute_uri(),
+            [f"product:{pk}", "categories"],
+            lambda: self.get_serializer(self.get_object()).data,
+        )
+
+        # Incrément différé: écrit en base par lots (flush_buffered_counters)
+        data = dict(data)
+        views = product_views.incr(int(pk))
+        if "views_count" in data:
+            data["views_count"] += views
+        return Response(data)
+
+    @action(detail=True, methods=["get"])
+    def recommendations(self, request, pk=None):
+        """Produits souvent achetés ensemble et similaires (précalculés)"""
+        product = self.get_object()
+        try:
+            limit = max(1, min(int(request.query_params.get("limit", 10)), 20))
+        except ValueError:
+            limit = 10
+
+        def compute():
+            queryset = self.sparse_queryset(
+                Product.objects.select_related("farmer", "category")
+            )
+            lists = recommended_products(product.pk, limit, queryset)
+            return {
+                kind: self.serialize_products(items) for kind, items in lists.items()
+            }
+
+        data = cached(
+            "product_recommendations",
+            request.build_absolute_uri(),
+            ["recommendations", "products"],
+            compute,
+        )
+        return Response(data)
+
+    @action(detail=True, methods=["get"], url_path="price-history")
+    def price_history(self, request, pk=None):
+        """Changements de prix du produit (?start=&end=)"""
+        product = self.get_object()
+        try:
+            start, end = date_range(request.query_params)
+        except ValueError as error:
+            return Response({"error": str(error)}, status=status.HTTP_400_BAD_REQUEST)
+
+        history = product.price_history.filter(
+            recorded_at__date__gte=start, recorded_at__date__lte=end
+        ).values("recorded_at", "price_per_unit", "unit")
+        return Response({"start": start, "end": end, "results": list(history)})
 
     @action(detail=True, methods=["post"], permission_classes=[IsAuthenticated])
     def toggle_wishlist(self, request, pk=None):
@@ -217,7 +467,7 @@ class ProductViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_403_FORBIDDEN,
             )
 
-        products = Product.objects.filter(farmer=request.user)
+        products = self.sparse_queryset(Product.objects.filter(farmer=request.user))
         serializer = self.get_serializer(products, many=True)
         return Response(serializer.data)
 
@@ -227,39 +477,115 @@ class ProductViewSet(viewsets.ModelViewSet):
         product = self.get_object()
         quantity = request.data.get("quantity")
 
-        if not quantity:
+        if quantity in (None, ""):
             return Response(
                 {"error": "Quantité requise"}, status=status.HTTP_400_BAD_REQUEST
             )
 
         try:
-            quantity = float(quantity)
-            if quantity < 0:
-                return Response(
-                    {"error": "La quantité ne peut pas être négative"},
-                    status=status.HTTP_400_BAD_REQUEST,
-                )
-
-            product.available_quantity = quantity
-            if quantity == 0:
-                product.status = "sold_out"
-            elif product.status == "sold_out":
-                product.status = "active"
-            product.save()
+            quantity = Decimal(str(quantity))
+        except InvalidOperation:
+            return Response(
+                {"error": "Quantité invalide"}, status=status.HTTP_400_BAD_REQUEST
+            )
 
+        if quantity < 0:
             return Response(
-                {
-                    "message": "Stock mis à jour avec succès",
-                    "available_quantity": product.available_quantity,
-                    "status": product.status,
-                }
+                {"error": "La quantité ne peut pas être négative"},
+                status=status.HTTP_400_BAD_REQUEST,
             )
 
-        except ValueError:
+        Product.apply_stock_change(product.pk, absolute=quantity)
+        product.refresh_from_db(fields=["available_quantity", "status"])
+
+        return Response(
+            {
+                "message": "Stock mis à jour avec succès",
+                "available_quantity": product.available_quantity,
+                "status": product.status,
+            }
+        )
+
+    @action(
+        detail=False,
+        methods=["post"],
+        permission_classes=[IsAuthenticated, IsFarmerOrReadOnly],
+        url_path="bulk-stock",
+    )
+    def bulk_stock(self, request):
+        """
+        Modifier le stock de plusieurs produits en une transaction.
+        {"items": [{"product": 1, "quantity": "20"}, {"product": 2, "delta": "-3"}],
+         "atomic": false}
+        Avec "atomic": true, un seul échec annule tous les changements.
+        """
+        items = request.data.get("items")
+        if not isinstance(items, list) or not items:
             return Response(
-                {"error": "Quantité invalide"}, status=status.HTTP_400_BAD_REQUEST
+                {"error": "Liste 'items' requise"}, status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(items) > MAX_BULK_STOCK_ITEMS:
+            return Response(
+                {"error": f"{MAX_BULK_STOCK_ITEMS} changements maximum par requête"},
+                status=status.HTTP_400_BAD_REQUEST,
             )
 
+        atomic = str(request.data.get("atomic", "false")).lower() == "true"
+        own_products = Product.objects.filter(farmer=request.user)
+
+        results = []
+        failed = False
+        with transaction.atomic():
+            for item in items:
+                serializer = StockChangeSerializer(data=item)
+                if not serializer.is_valid():
+                    results.append({"outcome": "invalid", "errors": serializer.errors})
+                    failed = True
+                    continue
+
+                change = serializer.validated_data
+                updated = Product.apply_stock_change(
+                    change["product"],
+                    delta=change.get("delta"),
+                    absolute=change.get("quantity"),
+                    queryset=own_products,
+                )
+                if updated:
+                    outcome = "updated"
+                elif own_products.filter(pk=change["product"]).exists():
+                    outcome = "insufficient_stock"
+                else:
+                    outcome = "not_found"
+                failed = failed or not updated
+                results.append({"product": change["product"], "outcome": outcome})
+
+            if atomic and failed:
+                transaction.set_rollback(True)
+                for result in results:
+                    if result["outcome"] == "updated":
+                        result["outcome"] = "rolled_back"
+
+        # État final des produits modifiés, en une requête
+        updated_ids = [r["product"] for r in results if r["outcome"] == "updated"]
+        states = {
+            row["id"]: row
+            for row in own_products.filter(pk__in=updated_ids).values(
+                "id", "available_quantity", "status"
+            )
+        }
+        for result in results:
+            state = states.get(result.get("product"))
+            if state and result["outcome"] == "updated":
+                result["available_quantity"] = state["available_quantity"]
+                result["status"] = state["status"]
+
+        return Response(
+            {"results": results},
+            status=(
+                status.HTTP_409_CONFLICT if atomic and failed else status.HTTP_200_OK
+            ),
+        )
+
     @action(detail=True, methods=["post"], permission_classes=[IsProductOwner])
     def toggle_status(self, request, pk=None):
         """Activer/désactiver un produit"""
@@ -297,29 +623,110 @@ class ProductViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        # Pour le moment, retourner les produits avec rayon de livraison
-        products = (
-            Product.objects.filter(
-                status="active", available_quantity__gt=0, delivery_radius__gte=0
+        try:
+            lat, lon, radius = float(lat), float(lon), float(radius)
+            page_size = max(1, min(int(request.query_params.get("page_size", 20)), 100))
+            cursor = self._decode_distance_cursor(request.query_params.get("cursor"))
+        except (TypeError, ValueError, KeyError):
+            return Response(
+                {"error": "Paramètres de recherche invalides"},
+                status=status.HTTP_400_BAD_REQUEST,
             )
-            .annotate(average_rating=Avg("reviews__rating"))
-            .order_by("?")[:20]
-        )  # Échantillon aléatoire pour la démo
 
-        serializer = self.get_serializer(products, many=True)
-        return Response(serializer.data)
+        products = nearby_products(
+            self.sparse_queryset(
+                Product.objects.filter(
+                    status="active", available_quantity__gt=0
+                ).select_related("farmer", "category")
+            ),
+            lat,
+            lon,
+            radius,
+        )
+
+        # Pagination par curseur (distance, id)
+        if cursor:
+            products = products.filter(
+                Q(distance__gt=cursor["distance"])
+                | Q(distance=cursor["distance"], id__gt=cursor["id"])
+            )
+
+        page = list(products[: page_size + 1])
+        has_next = len(page) > page_size
+        page = page[:page_size]
+
+        results = self.get_serializer(page, many=True).data
+        for item, product in zip(results, page):
+            item["distance_km"] = round(product.distance, 2)
+
+        next_cursor = None
+        if has_next:
+            last = page[-1]
+            next_cursor = self._encode_distance_cursor(last.distance, last.id)
+
+        return Response({"next_cursor": next_cursor, "results": results})
+
+    @staticmethod
+    def _encode_distance_cursor(distance, product_id):
+        return encode_cursor({"distance": distance, "id": product_id})
+
+    @staticmethod
+    def _decode_distance_cursor(cursor):
+        if not cursor:
+            return None
+        payload = decode_cursor(cursor)
+        return {"distance": float(payload["distance"]), "id": int(payload["id"])}
 
     @action(detail=False, methods=["get"])
     def featured_products(self, request):
-        """Produits en vedette (les plus vendus/vus)"""
-        products = (
-            Product.objects.filter(status="active", available_quantity__gt=0)
-            .annotate(average_rating=Avg("reviews__rating"))
-            .order_by("-orders_count", "-views_count")[:10]
-        )
+        """Produits en vedette (classement précalculé, global/wilaya/catégorie)"""
+        return self._ranking_response(request, ProductRanking.Kind.FEATURED)
 
-        serializer = self.get_serializer(products, many=True)
-        return Response(serializer.data)
+    @action(detail=False, methods=["get"])
+    def trending_products(self, request):
+        """Produits tendance (commandes des derniers jours)"""
+        return self._ranking_response(request, ProductRanking.Kind.TRENDING)
+
+    @action(detail=False, methods=["get"], url_path="rankings/freshness")
+    def rankings_freshness(self, request):
+        """Date et ancienneté du dernier calcul des classements"""
+        return Response(ranking_freshness())
+
+    def _ranking_response(self, request, kind):
+        try:
+            scope, scope_value = ranking_scope(request.query_params)
+        except ValueError as error:
+            return Response({"error": str(error)}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            limit = int(request.query_params.get("limit", 10))
+        except ValueError:
+            limit = 10
+        limit = max(1, min(limit, RANKING_SIZE))
+
+        def compute():
+            queryset = self.sparse_queryset(
+                Product.objects.select_related("farmer", "category")
+            )
+            products = ranked_products(kind, scope, scope_value, limit, queryset)
+
+            if products is None:
+                # Classement pas encore calculé: tri direct du catalogue
+                products = queryset.filter(status="active", available_quantity__gt=0)
+                if scope == ProductRanking.Scope.WILAYA:
+                    products = products.filter(farmer__wilaya=scope_value)
+                elif scope == ProductRanking.Scope.CATEGORY:
+                    products = products.filter(category_id=scope_value)
+                products = products.order_by("-orders_count", "-views_count")[:limit]
+
+            return self.get_serializer(products, many=True).data
+
+        data = cached(
+            f"{kind}_products",
+            request.build_absolute_uri(),
+            ["rankings", "products", "categories"],
+            compute,
+        )
+        return Response(data)
 
 
 # PRODUCT REVIEW VIEWSET
@@ -411,11 +818,14 @@ class WishlistViewSet(viewsets.ModelViewSet):
 
 
 # VIEWS ADDITIONNELLES
-class ProductSearchView(generics.ListAPIView):
+class ProductSearchView(
+    TaggedConditionalMixin, SparseFieldsMixin, generics.ListAPIView
+):
     """
     Vue de recherche avancée pour les produits.
     """
 
+    etag_tags = ["products", "categories"]
     serializer_class = ProductSerializer
     permission_classes = [IsAuthenticatedOrReadOnly]
     filter_backends = [filters.SearchFilter, DjangoFilterBackend]
@@ -423,11 +833,9 @@ class ProductSearchView(generics.ListAPIView):
     filterset_fields = ["category", "organic", "quality_grade"]
 
     def get_queryset(self):
-        queryset = (
-            Product.objects.filter(status="active", available_quantity__gt=0)
-            .select_related("farmer", "category")
-            .prefetch_related("reviews")
-        )
+        queryset = Product.objects.filter(
+            status="active", available_quantity__gt=0
+        ).select_related("farmer", "category")
 
         # Filtrer par prix
         min_price = self.request.query_params.get("min_price")
@@ -447,15 +855,56 @@ class ProductSearchView(generics.ListAPIView):
         if city:
             queryset = queryset.filter(farmer__city=city)
 
-        # Annoter avec la note moyenne
-        queryset = queryset.annotate(
-            average_rating=Avg("reviews__rating"), total_reviews=Count("reviews")
-        )
+        return filter_deliverable(queryset, self.request.query_params)
 
-        return queryset
+    def list(self, request, *args, **kwargs):
+        response = self.product_list_response(self.filter_queryset(self.get_queryset()))
+
+        # ?facets=true: nombre de produits par facette pour les filtres courants
+        if request.query_params.get("facets", "false").lower() == "true":
+            params = request.query_params.copy()
+            for name in ("page", "page_size"):
+                params.pop(name, None)
+
+            facets = cached(
+                "product_facets",
+                sorted(params.lists()),
+                ["products", "categories"],
+                lambda: product_facets(self.filter_queryset(self.get_queryset())),
+            )
+            if isinstance(response.data, dict):
+                response.data["facets"] = facets
+            else:
+                response.data = {"results": response.data, "facets": facets}
+
+        return response
+
+
+class AutocompleteView(APIView):
+    """
+    Suggestions de saisie: ?q=zou&limit=8&type=city (product, category,
+    city ou farm), par popularité, sans accents ni majuscules.
+    """
+
+    permission_classes = [IsAuthenticatedOrReadOnly]
+
+    def get(self, request):
+        params = request.query_params
+        kind = params.get("type") or None
+        try:
+            limit = int(params.get("limit", AUTOCOMPLETE_LIMIT))
+        except ValueError:
+            limit = AUTOCOMPLETE_LIMIT
+        if kind is not None and kind not in SUGGESTION_KINDS:
+            return Response(
+                {"error": f"Type inconnu: {kind}"}, status=status.HTTP_400_BAD_REQUEST
+            )
+        return Response(autocomplete(params.get("q", ""), max(limit, 1), kind))
 
 
-class CategoryProductsView(generics.ListAPIView):
+class CategoryProductsView(
+    TaggedConditionalMixin, SparseFieldsMixin, generics.ListAPIView
+):
     """
     Vue pour obtenir tous les produits d'une catégorie.
     """
@@ -463,20 +912,133 @@ class CategoryProductsView(generics.ListAPIView):
     serializer_class = ProductSerializer
     permission_classes = [IsAuthenticatedOrReadOnly]
 
+    def get_etag_tags(self):
+        # Le sous-arbre change avec les catégories
+        return ["products", "categories", f"category:{self.kwargs.get('category_id')}"]
+
     def get_queryset(self):
         category_id = self.kwargs.get("category_id")
-
-        queryset = (
-            Product.objects.filter(
-                category_id=category_id, status="active", available_quantity__gt=0
-            )
-            .select_related("farmer", "category")
-            .prefetch_related("reviews")
+        path = (
+            Category.objects.filter(pk=category_id)
+            .values_list("path", flat=True)
+            .first()
         )
+        if not path:
+            return Product.objects.none()
+
+        # Catégorie et sous-catégories
+        queryset = Product.objects.filter(
+            category__path__startswith=path,
+            status="active",
+            available_quantity__gt=0,
+        ).select_related("farmer", "category")
+        return filter_deliverable(queryset, self.request.query_params)
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        data = cached(
+            "category_products",
+            request.build_absolute_uri(),
+            self.get_etag_tags(),
+            lambda: self.product_list_response(queryset).data,
+        )
+        return Response(data)
+
+
+class PriceIndexView(TaggedConditionalMixin, APIView):
+    """
+    Indice de prix journalier (min / médiane / max), lu dans les agrégats.
+    ?category=<id> et ?wilaya=<code> (absents: toutes catégories / wilayas),
+    ?unit=kg, ?start=AAAA-MM-JJ&end=AAAA-MM-JJ.
+    """
+
+    permission_classes = [IsAuthenticatedOrReadOnly]
+    etag_tags = ["price_index"]
+
+    def get_etag_parts(self):
+        # Période par défaut relative à la date du jour
+        return super().get_etag_parts() + [timezone.localdate()]
 
-        # Annoter avec la note moyenne
-        queryset = queryset.annotate(
-            average_rating=Avg("reviews__rating"), total_reviews=Count("reviews")
+    def get(self, request):
+        params = request.query_params
+        try:
+            start, end = date_range(params)
+            category = int(params["category"]) if params.get("category") else None
+        except ValueError as error:
+            return Response({"error": str(error)}, status=status.HTTP_400_BAD_REQUEST)
+
+        wilaya = params.get("wilaya", "")
+        unit = params.get("unit")
+        series = cached(
+            "price_index",
+            (start, end, category, wilaya, unit),
+            ["price_index"],
+            lambda: price_series(start, end, category, wilaya, unit),
         )
+        return Response({"start": start, "end": end, "series": series})
 
-        return queryset
+
+class RouteView(APIView):
+    """
+    Itinéraire routier: ?origin=lat,lon&destination=lat,lon&profile=driving
+    (driving, cycling ou walking).
+    """
+
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        params = request.query_params
+        try:
+            origin = parse_point(params.get("origin"))
+            destination = parse_point(params.get("destination"))
+            data = route(*origin, *destination, params.get("profile", "driving"))
+        except ValueError as error:
+            return Response({"error": str(error)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(data)
+
+
+class RouteMatrixView(APIView):
+    """
+    Matrice des durées et distances routières, pour planifier des tournées:
+    {"origins": [[lat, lon], ...], "destinations": [[lat, lon], ...],
+    "profile": "driving"}.
+    """
+
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        try:
+            points = {
+                name: [
+                    parse_point(",".join(str(value) for value in point))
+                    for point in request.data.get(name) or []
+                ]
+                for name in ("origins", "destinations")
+            }
+            if not points["origins"] or not points["destinations"]:
+                raise ValueError("Origines et destinations requises")
+            if max(len(values) for values in points.values()) > MATRIX_MAX_POINTS:
+                raise ValueError(f"Au plus {MATRIX_MAX_POINTS} points par liste")
+            data = distance_matrix(
+                points["origins"],
+                points["destinations"],
+                request.data.get("profile", "driving"),
+            )
+        except (TypeError, ValueError) as error:
+            return Response({"error": str(error)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(data)
+
+
+class CatalogCacheStatsView(APIView):
+    """
+    Statistiques du cache du catalogue (succès, périmés, échecs).
+    """
+
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(get_stats())
+
+    def delete(self, request):
+        reset_stats()
+        return Response(status=status.HTTP_204_NO_CONTENT)
@@ -0,0 +1,27 @@
+# Generated by Django 6.0.1 on 2026-10-19 11:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("messaging", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="message",
+            index=models.Index(
+                fields=["conversation", "-created_at", "-id"],
+                name="messaging_m_convers_fccf6c_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="notification",
+            index=models.Index(
+                fields=["user", "-created_at", "-id"],
+                name="messaging_n_user_id_ffe449_idx",
+            ),
+        ),
+    ]
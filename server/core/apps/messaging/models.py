@@ -84,6 +84,7 @@ class Message(models.Model):
         indexes = [
             models.Index(fields=["conversation", "created_at"]),
             models.Index(fields=["sender", "created_at"]),
+            models.Index(fields=["conversation", "-created_at", "-id"]),
         ]
 
     def __str__(self):
@@ -134,6 +135,7 @@ class Notification(models.Model):
         ordering = ["-created_at"]
         indexes = [
             models.Index(fields=["user", "is_read", "created_at"]),
+            models.Index(fields=["user", "-created_at", "-id"]),
         ]
 
     def __str__(self):
@@ -14,6 +14,7 @@ from .serializers import (
 )
 from apps.accounts.models import User
 from apps.notifications.utils import send_message_notification
+from betteragri.pagination import OptionalKeysetPagination
 from channels.layers import get_channel_layer
 from asgiref.sync import async_to_sync
 
@@ -110,6 +111,7 @@ class ConversationViewSet(viewsets.ModelViewSet):
 class MessageViewSet(viewsets.ModelViewSet):
     serializer_class = MessageSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = OptionalKeysetPagination
 
     def get_queryset(self):
         return Message.objects.filter(
@@ -187,6 +189,7 @@ class MessageViewSet(viewsets.ModelViewSet):
 class NotificationViewSet(viewsets.ReadOnlyModelViewSet):
     serializer_class = NotificationSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = OptionalKeysetPagination
 
     def get_queryset(self):
         return Notification.objects.filter(user=self.request.user).order_by(
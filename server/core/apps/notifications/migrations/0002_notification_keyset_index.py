@@ -0,0 +1,20 @@
+# Generated by Django 6.0.1 on 2026-10-19 11:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("notifications", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="notification",
+            index=models.Index(
+                fields=["user", "-created_at", "-id"],
+                name="notificatio_user_id_90f3d6_idx",
+            ),
+        ),
+    ]
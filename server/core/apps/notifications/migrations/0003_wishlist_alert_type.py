@@ -0,0 +1,36 @@
+# Generated by Django 6.0.1 on 2026-10-19 18:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("notifications", "0002_notification_keyset_index"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="notification",
+            name="notification_type",
+            field=models.CharField(
+                choices=[
+                    ("welcome", "Bienvenue"),
+                    ("new_order", "Nouvelle commande"),
+                    ("order_accepted", "Commande acceptée"),
+                    ("order_shipped", "Commande expédiée"),
+                    ("order_delivered", "Commande livrée"),
+                    ("order_cancelled", "Commande annulée"),
+                    ("new_message", "Nouveau message"),
+                    ("weather_alert", "Alerte météo"),
+                    ("low_stock", "Stock faible"),
+                    ("new_review", "Nouvel avis"),
+                    ("wishlist_alert", "Alerte liste de souhaits"),
+                    ("payment_received", "Paiement reçu"),
+                    ("payout_sent", "Paiement envoyé"),
+                    ("system", "Système"),
+                ],
+                max_length=50,
+            ),
+        ),
+    ]
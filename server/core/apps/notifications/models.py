@@ -16,6 +16,7 @@ class Notification(models.Model):
         WEATHER_ALERT = "weather_alert", _("Alerte météo")
         LOW_STOCK = "low_stock", _("Stock faible")
         NEW_REVIEW = "new_review", _("Nouvel avis")
+        WISHLIST_ALERT = "wishlist_alert", _("Alerte liste de souhaits")
         PAYMENT_RECEIVED = "payment_received", _("Paiement reçu")
         PAYOUT_SENT = "payout_sent", _("Paiement envoyé")
         SYSTEM = "system", _("Système")
@@ -64,6 +65,7 @@ class Notification(models.Model):
         indexes = [
             models.Index(fields=["user", "is_read", "created_at"]),
             models.Index(fields=["notification_type", "created_at"]),
+            models.Index(fields=["user", "-created_at", "-id"]),
         ]
 
     def __str__(self):
@@ -298,6 +298,41 @@ def send_product_notification(product, notification_type, user):
         )
 
 
+def send_product_import_notification(user, created, updated):
+    """Une seule notification pour tout un import en masse"""
+    notification_service.send_notification(
+        user=user,
+        notification_type="new_product",
+        title="Import de produits terminé",
+        message=f"{created} produit(s) créé(s), {updated} produit(s) mis à jour.",
+        related_model="product",
+        data={"created": created, "updated": updated},
+    )
+
+
+def send_wishlist_alert_notification(user, price_drops, back_in_stock):
+    """Une seule notification pour toutes les alertes d'un utilisateur"""
+    parts = []
+    if price_drops:
+        parts.append(f"{len(price_drops)} produit(s) moins cher(s)")
+    if back_in_stock:
+        parts.append(f"{len(back_in_stock)} produit(s) de nouveau en stock")
+
+    items = price_drops + back_in_stock
+    names = ", ".join(f'"{item["name"]}"' for item in items[:3])
+    if len(items) > 3:
+        names += f" et {len(items) - 3} autre(s)"
+
+    notification_service.send_notification(
+        user=user,
+        notification_type="wishlist_alert",
+        title="Votre liste de souhaits",
+        message=f"{' et '.join(parts)}: {names}.",
+        related_model="wishlist",
+        data={"price_drops": price_drops, "back_in_stock": back_in_stock},
+    )
+
+
 def send_message_notification(sender, receiver, message):
     """Send message notification"""
     notification_service.send_notification(
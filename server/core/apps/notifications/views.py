@@ -14,12 +14,14 @@ from .serializers import (
     PushSubscriptionSerializer,
 )
 from .services import WebPushService, ServiceWorkerService
+from betteragri.pagination import OptionalKeysetPagination
 
 
 # NOTIFICATION VIEWSET
 class NotificationViewSet(viewsets.ReadOnlyModelViewSet):
     serializer_class = NotificationSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = OptionalKeysetPagination
 
     def get_queryset(self):
         return Notification.objects.filter(user=self.request.user).order_by(
@@ -0,0 +1,20 @@
+# Generated by Django 6.0.1 on 2026-10-19 11:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("orders", "0004_alter_order_delivery_company"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="order",
+            index=models.Index(
+                fields=["buyer", "-ordered_at", "-id"],
+                name="orders_orde_buyer_i_260f63_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 6.0.1 on 2026-10-19 20:05
+
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def compute_cart_totals(apps, schema_editor):
+    Cart = apps.get_model("orders", "Cart")
+    CartItem = apps.get_model("orders", "CartItem")
+
+    items = CartItem.objects.filter(cart=OuterRef("pk")).order_by().values("cart")
+    Cart.objects.update(
+        subtotal=Coalesce(
+            Subquery(items.annotate(total=Sum("total_price")).values("total")),
+            Decimal("0.00"),
+            output_field=models.DecimalField(max_digits=12, decimal_places=2),
+        ),
+        item_count=Coalesce(
+            Subquery(items.annotate(count=Count("id")).values("count")), 0
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("orders", "0005_order_keyset_index"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="cart",
+            name="item_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="cart",
+            name="subtotal",
+            field=models.DecimalField(
+                decimal_places=2, default=Decimal("0.00"), max_digits=12
+            ),
+        ),
+        migrations.RunPython(compute_cart_totals, migrations.RunPython.noop),
+    ]
@@ -1,4 +1,6 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Count, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
 from django.utils.translation import gettext_lazy as _
 from django.core.validators import MinValueValidator
 from decimal import Decimal
@@ -73,6 +75,7 @@ class Order(models.Model):
             models.Index(fields=["buyer", "status"]),
             models.Index(fields=["order_number"]),
             models.Index(fields=["status", "payment_status"]),
+            models.Index(fields=["buyer", "-ordered_at", "-id"]),
         ]
 
     def __str__(self):
@@ -171,6 +174,11 @@ class Cart(models.Model):
     user = models.OneToOneField(
         "accounts.User", on_delete=models.CASCADE, related_name="cart"
     )
+    # Totaux dénormalisés, recalculés à chaque modification des articles
+    subtotal = models.DecimalField(
+        max_digits=12, decimal_places=2, default=Decimal("0.00")
+    )
+    item_count = models.PositiveIntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -183,11 +191,34 @@ class Cart(models.Model):
 
     @property
     def total_items(self):
-        return self.items.count()
-
-    @property
-    def subtotal(self):
-        return sum((item.total_price for item in self.items.all()), Decimal("0.00"))
+        return self.item_count
+
+    @classmethod
+    def update_totals(cls, *cart_ids):
+        """Recalculer sous-total et nombre d'articles en un seul UPDATE"""
+        items = CartItem.objects.filter(cart=OuterRef("pk")).order_by().values("cart")
+        with transaction.atomic():
+            # Paniers verrouillés d'abord: le recalcul concurrent attend la
+            # validation du premier, puis l'UPDATE (nouvelle requête, donc
+            # nouvel instantané en READ COMMITTED) voit tous ses articles.
+            # NO KEY: compatible avec le verrou posé par l'insertion d'articles
+            list(
+                cls.objects.select_for_update(no_key=True)
+                .filter(pk__in=cart_ids)
+                .order_by("pk")
+                .values_list("pk", flat=True)
+            )
+            cls.objects.filter(pk__in=cart_ids).update(
+                subtotal=Coalesce(
+                    Subquery(items.annotate(total=Sum("total_price")).values("total")),
+                    Decimal("0.00"),
+                    output_field=models.DecimalField(max_digits=12, decimal_places=2),
+                ),
+                item_count=Coalesce(
+                    Subquery(items.annotate(count=Count("id")).values("count")), 0
+                ),
+                updated_at=timezone.now(),
+            )
 
 
 class CartItem(models.Model):
@@ -179,17 +179,22 @@ class OrderCreateSerializer(serializers.Serializer):
 
         try:
             cart = request.user.cart
-            if not cart or cart.items.count() == 0:
+            items = list(cart.items.select_related("product"))
+            if not items:
                 raise serializers.ValidationError("Votre panier est vide.")
         except Cart.DoesNotExist:
             raise serializers.ValidationError("Votre panier est vide.")
 
-        for item in cart.items.all():
-            if item.quantity > item.product.available_quantity:
-                raise serializers.ValidationError(
-                    f"Quantité insuffisante pour {item.product.name}. "
-                    f"Disponible: {item.product.available_quantity}"
-                )
+        # Vérification indicative: la réservation reste faite sous verrou
+        short = [
+            f"{item.product.name} (disponible: {item.product.available_quantity})"
+            for item in items
+            if item.quantity > item.product.available_quantity
+        ]
+        if short:
+            raise serializers.ValidationError(
+                f"Quantité insuffisante pour {', '.join(short)}"
+            )
 
         return attrs
 
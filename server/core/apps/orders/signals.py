@@ -0,0 +1,40 @@
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from .models import Cart, CartItem, Order
+from .stats import invalidate_order_stats
+
+
+# TOTAUX DES PANIERS
+@receiver(post_save, sender=CartItem)
+def update_cart_totals_on_save(sender, instance, **kwargs):
+    Cart.update_totals(instance.cart_id)
+
+
+@receiver(post_delete, sender=CartItem)
+def update_cart_totals_on_delete(sender, instance, origin=None, **kwargs):
+    # Panier supprimé avec ses articles: rien à recalculer
+    if isinstance(origin, Cart):
+        return
+
+    # Les articles d'une même suppression (queryset) sont tous supprimés
+    # avant les signaux: un seul recalcul par panier
+    updated = getattr(origin, "_updated_carts", None)
+    if updated is None:
+        updated = set()
+        if origin is not None:
+            origin._updated_carts = updated
+    if instance.cart_id not in updated:
+        updated.add(instance.cart_id)
+        Cart.update_totals(instance.cart_id)
+
+
+# STATISTIQUES DES COMMANDES
+# Tags calculés dans la transaction, invalidés à sa validation (on_commit):
+# une lecture concurrente ne remet pas en cache les anciennes statistiques.
+# Suppression: avant la cascade sur les articles, qui désignent les
+# agriculteurs concernés
+@receiver(post_save, sender=Order)
+@receiver(pre_delete, sender=Order)
+def invalidate_order_stats_cache(sender, instance, **kwargs):
+    invalidate_order_stats(instance)
@@ -0,0 +1,104 @@
+"""
+Statistiques des commandes par utilisateur.
+
+Toutes les valeurs d'un tableau de bord sont calculées en une requête
+d'agrégation conditionnelle (Count/Sum avec filter), à partir de
+OrderItem.farmer pour les agriculteurs plutôt que d'une jointure
+commandes -> articles -> produits avec distinct().
+
+Les résultats sont mis en cache par utilisateur (tag "order_stats:<id>"),
+invalidé par les signaux des commandes pour l'acheteur et les agriculteurs
+concernés.
+"""
+
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+
+from apps.marketplace.cache import cached, invalidate_tags
+from apps.marketplace.models import Product
+from .models import Order, OrderItem
+
+STATS_STATUSES = ("pending", "confirmed", "processing", "shipped", "delivered")
+
+
+def stats_tag(user_id):
+    return f"order_stats:{user_id}"
+
+
+def invalidate_order_stats(order):
+    """
+    Rendre périmées les statistiques de l'acheteur et des agriculteurs, à la
+    validation de la transaction en cours
+    """
+    farmer_ids = (
+        OrderItem.objects.filter(order=order)
+        .order_by()
+        .values_list("farmer_id", flat=True)
+        .distinct()
+    )
+    tags = [stats_tag(user_id) for user_id in {order.buyer_id, *farmer_ids}]
+    transaction.on_commit(lambda: invalidate_tags(*tags))
+
+
+def order_stats(user):
+    """Nombre de commandes par statut et montant des commandes livrées"""
+    if user.user_type == "farmer":
+        orders = Order.objects.filter(
+            id__in=OrderItem.objects.filter(farmer=user).values("order_id")
+        )
+    else:
+        orders = Order.objects.filter(buyer=user)
+
+    def compute():
+        stats = orders.aggregate(
+            total_orders=Count("id"),
+            **{
+                f"{status}_orders": Count("id", filter=Q(status=status))
+                for status in STATS_STATUSES + ("cancelled",)
+            },
+            total_spent=Sum("total_amount", filter=Q(status="delivered")),
+        )
+        stats["total_spent"] = stats["total_spent"] or 0
+        return stats
+
+    return cached("order_stats", user.pk, [stats_tag(user.pk)], compute)
+
+
+def farmer_order_stats(farmer):
+    """Commandes de l'agriculteur par statut et revenus de ses articles livrés"""
+
+    def compute():
+        stats = OrderItem.objects.filter(farmer=farmer).aggregate(
+            total_orders=Count("order_id", distinct=True),
+            **{
+                f"{status}_orders": Count(
+                    "order_id", distinct=True, filter=Q(order__status=status)
+                )
+                for status in STATS_STATUSES
+            },
+            total_revenue=Sum("total_price", filter=Q(order__status="delivered")),
+        )
+        stats["total_revenue"] = stats["total_revenue"] or 0
+        return stats
+
+    return cached("farmer_order_stats", farmer.pk, [stats_tag(farmer.pk)], compute)
+
+
+def farmer_product_stats(farmer):
+    """Produits actifs et note moyenne, lue dans les compteurs des produits"""
+    counts = [F(Product.rating_field(rating)) for rating in range(1, 6)]
+    stats = Product.objects.filter(farmer=farmer).aggregate(
+        active_products=Count("id", filter=Q(status="active")),
+        reviews=Sum(sum(counts[1:], counts[0])),
+        rating_total=Sum(
+            sum(
+                (count * rating for rating, count in enumerate(counts[1:], 2)),
+                counts[0],
+            )
+        ),
+    )
+    average_rating = stats["rating_total"] / stats["reviews"] if stats["reviews"] else 0
+    return {
+        "average_rating": round(average_rating, 2),
+        "active_products": stats["active_products"],
+    }
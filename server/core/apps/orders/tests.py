@@ -1,3 +1,289 @@
-from django.test import TestCase
+import datetime
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from apps.accounts.models import User
+from apps.marketplace.cache import get_tag_versions
+from apps.marketplace.models import Product, ProductChange
+from apps.orders.models import Cart, CartItem, Order, OrderItem
+from apps.orders.stats import farmer_order_stats, order_stats
+
+SHIPPING = {
+    "shipping_address": "Ilot K",
+    "shipping_city": "Nouakchott",
+    "shipping_country": "Mauritanie",
+    "shipping_phone": "+22212345678",
+}
+
+# Cache local aux tests: les versions de tags et statistiques du cache
+# configuré (Redis) survivraient d'une exécution à l'autre
+LOCMEM_CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+}
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+@mock.patch("apps.orders.views.send_order_notification")
+class CheckoutTests(TestCase):
+    """Création d'une commande à partir du panier (OrderViewSet.create)"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.farmer = User.objects.create_user(
+            username="farmer",
+            email="farmer@example.com",
+            password="password",
+            user_type="farmer",
+        )
+        cls.products = [
+            Product.objects.create(
+                farmer=cls.farmer,
+                name=f"Produit {index}",
+                description="Description",
+                price_per_unit=Decimal("2.00"),
+                available_quantity=Decimal("5"),
+                harvest_date=datetime.date.today(),
+                farm_location="Rosso",
+                status="active",
+            )
+            for index in range(6)
+        ]
+
+    def create_buyer(self, name, items):
+        buyer = User.objects.create_user(
+            username=name,
+            email=f"{name}@example.com",
+            password="password",
+            user_type="buyer",
+        )
+        cart = Cart.objects.create(user=buyer)
+        for product, quantity in items:
+            CartItem.objects.create(cart=cart, product=product, quantity=quantity)
+
+        client = APIClient()
+        client.force_authenticate(buyer)
+        return buyer, client
+
+    def checkout(self, client):
+        return client.post("/api/orders/orders/", SHIPPING, format="json")
+
+    def stock(self):
+        return list(
+            Product.objects.order_by("pk").values_list("available_quantity", "status")
+        )
+
+    def test_checkout_reserves_stock_and_empties_cart(self, notify):
+        buyer, client = self.create_buyer("buyer", [(self.products[0], 2)])
+
+        response = self.checkout(client)
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        product = Product.objects.get(pk=self.products[0].pk)
+        self.assertEqual(product.available_quantity, Decimal("3"))
+        self.assertEqual(product.status, "active")
+        self.assertFalse(CartItem.objects.filter(cart__user=buyer).exists())
+        self.assertEqual(Order.objects.get().subtotal, Decimal("4.00"))
+
+    def test_checkout_marks_exhausted_products_sold_out(self, notify):
+        _, client = self.create_buyer(
+            "buyer", [(self.products[0], 5), (self.products[1], 1)]
+        )
+
+        response = self.checkout(client)
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(
+            self.stock()[:2], [(Decimal("0"), "sold_out"), (Decimal("4"), "active")]
+        )
+
+    def test_short_stock_names_every_product_and_changes_nothing(self, notify):
+        buyer, client = self.create_buyer(
+            "buyer",
+            [(self.products[0], 6), (self.products[1], 1), (self.products[2], 9)],
+        )
+        before = self.stock()
+
+        response = self.checkout(client)
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        message = str(response.data)
+        self.assertIn("Produit 0", message)
+        self.assertIn("Produit 2", message)
+        self.assertNotIn("Produit 1", message)
+        self.assertEqual(self.stock(), before)
+        self.assertFalse(Order.objects.exists())
+        self.assertFalse(ProductChange.objects.exists())
+        self.assertEqual(CartItem.objects.filter(cart__user=buyer).count(), 3)
+
+    def test_reserve_stock_returns_every_short_product(self, notify):
+        before = self.stock()
+
+        short = Product.reserve_stock(
+            {
+                self.products[0].pk: Decimal("6"),
+                self.products[1].pk: Decimal("1"),
+                self.products[2].pk: Decimal("9"),
+            }
+        )
+
+        self.assertEqual(short, [self.products[0].pk, self.products[2].pk])
+        self.assertEqual(self.stock(), before)
+
+    def test_failure_after_reservation_rolls_back(self, notify):
+        buyer, client = self.create_buyer("buyer", [(self.products[0], 2)])
+        before = self.stock()
+        notify.side_effect = RuntimeError("notification")
+
+        with self.assertRaises(RuntimeError):
+            self.checkout(client)
+
+        self.assertEqual(self.stock(), before)
+        self.assertFalse(Order.objects.exists())
+        self.assertEqual(CartItem.objects.filter(cart__user=buyer).count(), 1)
+
+    def test_cache_invalidated_only_on_commit(self, notify):
+        _, client = self.create_buyer("buyer", [(self.products[0], 2)])
+        tags = ["products", f"product:{self.products[0].pk}"]
+        before = get_tag_versions(tags)
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.checkout(client)
+            self.assertEqual(get_tag_versions(tags), before)
+
+        for callback in callbacks:
+            callback()
+        after = get_tag_versions(tags)
+        self.assertTrue(all(after[tag] != before[tag] for tag in tags))
+
+    def test_query_count_does_not_depend_on_cart_size(self, notify):
+        counts = []
+        for name, products in (("small", self.products[:2]), ("large", self.products)):
+            _, client = self.create_buyer(name, [(product, 1) for product in products])
+            with CaptureQueriesContext(connection) as queries:
+                response = self.checkout(client)
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+            counts.append(len(queries))
+
+        self.assertEqual(counts[0], counts[1])
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class CartTotalsTests(TestCase):
+    """Totaux dénormalisés du panier (Cart.update_totals)"""
+
+    def test_items_update_totals_and_cart_timestamp(self):
+        farmer = User.objects.create_user(
+            username="farmer",
+            email="farmer@example.com",
+            password="password",
+            user_type="farmer",
+        )
+        buyer = User.objects.create_user(
+            username="buyer",
+            email="buyer@example.com",
+            password="password",
+            user_type="buyer",
+        )
+        product = Product.objects.create(
+            farmer=farmer,
+            name="Dattes",
+            description="Description",
+            price_per_unit=Decimal("2.50"),
+            available_quantity=Decimal("10"),
+            harvest_date=datetime.date.today(),
+            farm_location="Atar",
+            status="active",
+        )
+        cart = Cart.objects.create(user=buyer)
+        created_at = Cart.objects.get(pk=cart.pk).updated_at
+
+        item = CartItem.objects.create(cart=cart, product=product, quantity=4)
+        cart.refresh_from_db()
+        self.assertEqual((cart.subtotal, cart.item_count), (Decimal("10.00"), 1))
+        self.assertGreater(cart.updated_at, created_at)
+
+        item.delete()
+        cart.refresh_from_db()
+        self.assertEqual((cart.subtotal, cart.item_count), (Decimal("0.00"), 0))
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class OrderStatsTests(TestCase):
+    """Statistiques en cache invalidées par les signaux des commandes"""
+
+    def setUp(self):
+        # Clés order_stats:<pk> d'un test précédent (pk réutilisées)
+        cache.clear()
+        self.farmer = User.objects.create_user(
+            username="farmer",
+            email="farmer@example.com",
+            password="password",
+            user_type="farmer",
+        )
+        self.buyer = User.objects.create_user(
+            username="buyer",
+            email="buyer@example.com",
+            password="password",
+            user_type="buyer",
+        )
+        product = Product.objects.create(
+            farmer=self.farmer,
+            name="Mil",
+            description="Description",
+            price_per_unit=Decimal("3.00"),
+            available_quantity=Decimal("10"),
+            harvest_date=datetime.date.today(),
+            farm_location="Kaédi",
+            status="active",
+        )
+        self.order = Order.objects.create(
+            buyer=self.buyer,
+            shipping_address="Ilot K",
+            shipping_city="Nouakchott",
+            shipping_country="Mauritanie",
+            shipping_phone="+22212345678",
+            subtotal=Decimal("6.00"),
+            shipping_fee=Decimal("0.00"),
+            tax_amount=Decimal("0.00"),
+            total_amount=Decimal("6.00"),
+        )
+        OrderItem.objects.create(
+            order=self.order,
+            product=product,
+            farmer=self.farmer,
+            quantity=2,
+            unit_price=Decimal("3.00"),
+            total_price=Decimal("6.00"),
+        )
+
+    def test_status_change_refreshes_stats_on_commit(self):
+        self.assertEqual(order_stats(self.buyer)["delivered_orders"], 0)
+        self.assertEqual(farmer_order_stats(self.farmer)["total_revenue"], 0)
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.order.status = "delivered"
+            self.order.save()
+            self.assertEqual(order_stats(self.buyer)["delivered_orders"], 0)
+
+        for callback in callbacks:
+            callback()
+        self.assertEqual(order_stats(self.buyer)["delivered_orders"], 1)
+        self.assertEqual(
+            farmer_order_stats(self.farmer)["total_revenue"], Decimal("6.00")
+        )
+
+    def test_deleted_order_refreshes_farmer_stats(self):
+        self.assertEqual(farmer_order_stats(self.farmer)["total_orders"], 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.order.delete()
+
+        self.assertEqual(farmer_order_stats(self.farmer)["total_orders"], 0)
+        self.assertEqual(order_stats(self.buyer)["total_orders"], 0)
@@ -4,10 +4,16 @@ from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django.utils import timezone
 from django.db import transaction
-from django.db.models import Q, Sum
+from django.db.models import Prefetch, Q, Sum
 from decimal import Decimal
 
 from .models import Order, OrderItem, Cart, CartItem
+from .stats import (
+    farmer_order_stats,
+    farmer_product_stats,
+    invalidate_order_stats,
+    order_stats,
+)
 from .serializers import (
     CartSerializer,
     CartItemSerializer,
@@ -16,10 +22,10 @@ from .serializers import (
     OrderStatusUpdateSerializer,
 )
 from apps.marketplace.models import Product
+from apps.marketplace.counters import product_orders
 from apps.notifications.utils import send_order_notification
-from django.db.models import Avg, Count
+from betteragri.pagination import OptionalKeysetPagination
 from apps.reviews.models import FarmerReview
-from apps.marketplace.models import Product, ProductReview
 
 
 # CART VIEWSET
@@ -32,15 +38,21 @@ class CartViewSet(viewsets.ModelViewSet):
         return Cart.objects.filter(user=self.request.user)
 
     def get_object(self):
-        # Obtenir ou créer le panier de l'utilisateur
-        cart, created = Cart.objects.get_or_create(user=self.request.user)
+        # Obtenir ou créer le panier, articles et produits en une requête
+        cart, created = Cart.objects.prefetch_related(
+            Prefetch(
+                "items",
+                queryset=CartItem.objects.select_related(
+                    "product__farmer", "product__category"
+                ),
+            )
+        ).get_or_create(user=self.request.user)
         return cart
 
     @action(detail=False, methods=["post"])
     def clear(self, request):
         """Vider le panier"""
-        cart = self.get_object()
-        cart.items.all().delete()
+        CartItem.objects.filter(cart__user=request.user).delete()
         return Response({"message": "Panier vidé."})
 
     @action(detail=False, methods=["get"])
@@ -53,26 +65,27 @@ class CartViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=["post"])
     def checkout_preview(self, request):
         """Aperçu avant paiement avec calcul des frais"""
-        cart = self.get_object()
+        # Totaux dénormalisés: les articles ne sont pas lus
+        cart, created = Cart.objects.get_or_create(user=request.user)
 
-        if cart.items.count() == 0:
+        if cart.item_count == 0:
             return Response(
                 {"error": "Votre panier est vide."}, status=status.HTTP_400_BAD_REQUEST
             )
 
         # Calculer les frais
         subtotal = cart.subtotal
-        shipping_fee = 10.00  # Frais fixes pour la démo
-        tax_amount = subtotal * 0.18  # TVA 18%
+        shipping_fee = Decimal("10.00")  # Frais fixes pour la démo
+        tax_amount = subtotal * Decimal("0.18")  # TVA 18%
         total_amount = subtotal + shipping_fee + tax_amount
 
         return Response(
             {
                 "subtotal": float(subtotal),
-                "shipping_fee": shipping_fee,
+                "shipping_fee": float(shipping_fee),
                 "tax_amount": float(tax_amount),
                 "total_amount": float(total_amount),
-                "items_count": cart.items.count(),
+                "items_count": cart.item_count,
             }
         )
 
@@ -83,9 +96,10 @@ class CartItemViewSet(viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
-        # Obtenir le panier de l'utilisateur
-        cart, created = Cart.objects.get_or_create(user=self.request.user)
-        return CartItem.objects.filter(cart=cart)
+        # Articles du panier de l'utilisateur, avec leurs produits
+        return CartItem.objects.filter(cart__user=self.request.user).select_related(
+            "product__farmer", "product__category"
+        )
 
     def perform_create(self, serializer):
         # Associer automatiquement au panier de l'utilisateur
@@ -143,6 +157,8 @@ class CartItemViewSet(viewsets.ModelViewSet):
 class OrderViewSet(viewsets.ModelViewSet):
     serializer_class = OrderSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = OptionalKeysetPagination
+    keyset_ordering = ("-ordered_at", "-id")
 
     def get_queryset(self):
         user = self.request.user
@@ -168,14 +184,29 @@ class OrderViewSet(viewsets.ModelViewSet):
 
         # Obtenir le panier de l'utilisateur
         cart, created = Cart.objects.get_or_create(user=request.user)
+        cart_items = list(cart.items.select_related("product__farmer"))
 
-        if cart.items.count() == 0:
+        if not cart_items:
             return Response(
                 {"error": "Votre panier est vide."}, status=status.HTTP_400_BAD_REQUEST
             )
 
+        # Réserver tout le stock en une requête, lignes verrouillées; en cas
+        # de stock insuffisant rien n'est modifié
+        short = Product.reserve_stock(
+            {item.product_id: item.quantity for item in cart_items}
+        )
+        if short:
+            names = ", ".join(
+                item.product.name for item in cart_items if item.product_id in short
+            )
+            return Response(
+                {"error": f"Quantité insuffisante pour {names}"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
         # Calculer les frais
-        subtotal = cart.subtotal
+        subtotal = sum((item.total_price for item in cart_items), Decimal("0.00"))
         shipping_fee = self._calculate_shipping_fee(serializer.validated_data)
         tax_amount = self._calculate_tax(subtotal)
         total_amount = subtotal + shipping_fee + tax_amount
@@ -195,32 +226,33 @@ class OrderViewSet(viewsets.ModelViewSet):
             status="pending",
         )
 
-        # Créer les articles de commande et mettre à jour les quantités
-        farmers_involved = set()
-
-        for cart_item in cart.items.all():
-            # Réserver la quantité du produit
-            if not cart_item.product.reserve_quantity(cart_item.quantity):
-                order.delete()
-                return Response(
-                    {"error": f"Quantité insuffisante pour {cart_item.product.name}"},
-                    status=status.HTTP_400_BAD_REQUEST,
-                )
-
-            # Créer l'article de commande
-            order_item = OrderItem.objects.create(
+        # Créer les articles de commande en une requête
+        OrderItem.objects.bulk_create(
+            OrderItem(
                 order=order,
-                product=cart_item.product,
-                farmer=cart_item.product.farmer,
-                quantity=cart_item.quantity,
-                unit_price=cart_item.unit_price,
-                total_price=cart_item.total_price,
+                product=item.product,
+                farmer=item.product.farmer,
+                quantity=item.quantity,
+                unit_price=item.unit_price,
+                total_price=item.total_price,
             )
-            farmers_involved.add(cart_item.product.farmer)
+            for item in cart_items
+        )
+        # bulk_create n'envoie pas de signaux: statistiques des agriculteurs
+        invalidate_order_stats(order)
+        farmers_involved = {item.product.farmer for item in cart_items}
+        ordered_products = [item.product_id for item in cart_items]
 
         # Vider le panier
         cart.items.all().delete()
 
+        # Compteur de commandes par produit, écrit en base par lots
+        def count_orders():
+            for product_id in ordered_products:
+                product_orders.incr(product_id)
+
+        transaction.on_commit(count_orders)
+
         # Envoyer des notifications
         send_order_notification(
             order=order, notification_type="new_order", user=request.user
@@ -232,7 +264,15 @@ class OrderViewSet(viewsets.ModelViewSet):
                 order=order, notification_type="farmer_new_order", user=farmer
             )
 
-        # Retourner la commande créée
+        # Retourner la commande créée, articles chargés en une requête
+        order = Order.objects.prefetch_related(
+            Prefetch(
+                "items",
+                queryset=OrderItem.objects.select_related(
+                    "product__farmer", "product__category", "farmer"
+                ),
+            )
+        ).get(pk=order.pk)
         return Response(
             OrderSerializer(order, context={"request": request}).data,
             status=status.HTTP_201_CREATED,
@@ -449,28 +489,7 @@ class OrderViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=["get"])
     def stats(self, request):
         """Statistiques des commandes pour l'utilisateur"""
-        user = request.user
-
-        if user.user_type == "farmer":
-            orders = Order.objects.filter(items__product__farmer=user).distinct()
-        else:
-            orders = Order.objects.filter(buyer=user)
-
-        stats = {
-            "total_orders": orders.count(),
-            "pending_orders": orders.filter(status="pending").count(),
-            "confirmed_orders": orders.filter(status="confirmed").count(),
-            "processing_orders": orders.filter(status="processing").count(),
-            "shipped_orders": orders.filter(status="shipped").count(),
-            "delivered_orders": orders.filter(status="delivered").count(),
-            "cancelled_orders": orders.filter(status="cancelled").count(),
-            "total_spent": orders.filter(status="delivered").aggregate(
-                total=Sum("total_amount")
-            )["total"]
-            or 0,
-        }
-
-        return Response(stats)
+        return Response(order_stats(request.user))
 
 
 # FARMER ORDER VIEWSET
@@ -481,6 +500,8 @@ class FarmerOrderViewSet(viewsets.ReadOnlyModelViewSet):
 
     serializer_class = OrderSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = OptionalKeysetPagination
+    keyset_ordering = ("-ordered_at", "-id")
 
     def get_queryset(self):
         # Retourner uniquement les commandes contenant des produits de l'agriculteur
@@ -507,34 +528,7 @@ class FarmerOrderViewSet(viewsets.ReadOnlyModelViewSet):
     @action(detail=False, methods=["get"])
     def farmer_stats(self, request):
         farmer = request.user
-
-        orders = Order.objects.filter(items__product__farmer=farmer).distinct()
-
-        # Produits actifs
-        active_products = Product.objects.filter(farmer=farmer, status="active").count()
-
-        # Avis sur les produits du fermier
-        reviews = ProductReview.objects.filter(product__farmer=farmer)
-
-        average_rating = reviews.aggregate(avg=Avg("rating"))["avg"] or 0
-
-        stats = {
-            "total_orders": orders.count(),
-            "pending_orders": orders.filter(status="pending").count(),
-            "confirmed_orders": orders.filter(status="confirmed").count(),
-            "processing_orders": orders.filter(status="processing").count(),
-            "shipped_orders": orders.filter(status="shipped").count(),
-            "delivered_orders": orders.filter(status="delivered").count(),
-            "total_revenue": orders.filter(status="delivered").aggregate(
-                total=Sum("items__total_price")
-            )["total"]
-            or 0,
-            # NOUVEAUX CHAMPS
-            "average_rating": round(average_rating, 2),
-            "active_products": active_products,
-        }
-
-        return Response(stats)
+        return Response({**farmer_order_stats(farmer), **farmer_product_stats(farmer)})
 
     def _get_monthly_revenue(self, farmer):
         """Obtenir les revenus mensuels de l'agriculteur"""
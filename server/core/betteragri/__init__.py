@@ -0,0 +1,4 @@
+# Charger l'application Celery avec Django (décorateurs @shared_task)
+from .celery import app as celery_app
+
+__all__ = ("celery_app",)
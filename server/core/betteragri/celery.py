@@ -0,0 +1,17 @@
+"""
+Application Celery du projet.
+
+Les tâches (`tasks.py` des applications) sont consommées par le service
+`worker`; les tâches périodiques de CELERY_BEAT_SCHEDULE sont planifiées par
+le service `beat` (docker-compose.yml).
+"""
+
+import os
+
+from celery import Celery
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "betteragri.settings.development")
+
+app = Celery("betteragri")
+app.config_from_object("django.conf:settings", namespace="CELERY")
+app.autodiscover_tasks()
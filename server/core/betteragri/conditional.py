@@ -0,0 +1,91 @@
+"""
+Requêtes conditionnelles (ETag / Last-Modified) pour les vues de lecture.
+
+Les validateurs sont calculés sans sérialiser la réponse: versions de tags
+du cache, `updated_at`... Ils sont évalués après l'authentification et les
+permissions, avant l'appel du handler: un 304 Not Modified est renvoyé sans
+évaluer le queryset.
+"""
+
+import hashlib
+
+from django.utils.cache import (
+    get_conditional_response,
+    patch_cache_control,
+    patch_vary_headers,
+)
+from django.utils.http import http_date, quote_etag
+
+
+class ConditionalResponse(Exception):
+    """Réponse conditionnelle (304/412) qui interrompt le traitement"""
+
+    def __init__(self, response):
+        super().__init__(response.status_code)
+        self.response = response
+
+
+class ConditionalGetMixin:
+    """
+    ETag et Last-Modified sur les requêtes GET/HEAD d'une vue DRF.
+
+    La vue définit get_etag_parts() (valeurs dont dépend la réponse, None
+    pour ne pas la valider) et/ou get_last_modified() (datetime). L'ETag
+    couvre aussi l'URL complète et le format de réponse négocié.
+    Avec `conditional_private`, la réponse dépend de l'utilisateur.
+    """
+
+    conditional_private = False
+
+    def get_etag_parts(self):
+        return None
+
+    def get_last_modified(self):
+        return None
+
+    def not_modified(self, request, response):
+        """Point d'extension: réponse 304 sur le point d'être renvoyée"""
+        return response
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        self.etag = self.last_modified = None
+        if request.method not in ("GET", "HEAD"):
+            return
+
+        parts = self.get_etag_parts()
+        if parts is not None:
+            key = [request.get_full_path(), request.accepted_media_type, *parts]
+            self.etag = quote_etag(hashlib.md5(repr(key).encode()).hexdigest())
+        last_modified = self.get_last_modified()
+        if last_modified is not None:
+            self.last_modified = int(last_modified.timestamp())
+
+        if self.etag or self.last_modified:
+            response = get_conditional_response(
+                request._request, etag=self.etag, last_modified=self.last_modified
+            )
+            if response is not None:
+                raise ConditionalResponse(self.not_modified(request, response))
+
+    def handle_exception(self, exc):
+        if isinstance(exc, ConditionalResponse):
+            return exc.response
+        return super().handle_exception(exc)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if not (getattr(self, "etag", None) or getattr(self, "last_modified", None)):
+            return response
+
+        if response.status_code in (200, 304):
+            if self.etag:
+                response.headers.setdefault("ETag", self.etag)
+            if self.last_modified:
+                response.headers.setdefault(
+                    "Last-Modified", http_date(self.last_modified)
+                )
+        if self.conditional_private:
+            patch_cache_control(response, private=True)
+            patch_vary_headers(response, ("Authorization",))
+        return response
@@ -0,0 +1,180 @@
+"""
+Pagination par curseur (keyset) pour les listes volumineuses.
+
+La pagination par numéro de page exécute un COUNT(*) et un OFFSET qui
+parcourt toutes les lignes précédentes. La pagination keyset filtre
+directement après la dernière ligne vue sur une clé d'ordre unique,
+par exemple (created_at, id), servie par un index composite.
+"""
+
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from collections import OrderedDict
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+def encode_cursor(payload: dict) -> str:
+    """Curseur opaque: JSON encodé en base64 urlsafe"""
+    return urlsafe_b64encode(json.dumps(payload).encode()).decode()
+
+
+def decode_cursor(cursor: str) -> dict:
+    payload = json.loads(urlsafe_b64decode(cursor.encode()).decode())
+    if not isinstance(payload, dict):
+        raise ValueError("Curseur invalide")
+    return payload
+
+
+class KeysetPagination(BasePagination):
+    """
+    Pagination keyset sur une clé d'ordre unique.
+
+    La vue peut définir `keyset_ordering`, par défaut ("-created_at", "-id").
+    Le dernier champ doit être unique (id) pour départager les égalités.
+    """
+
+    page_size = api_settings.PAGE_SIZE or 20
+    max_page_size = 100
+    page_size_query_param = "page_size"
+    cursor_query_param = "cursor"
+    ordering = ("-created_at", "-id")
+    invalid_cursor_message = "Curseur invalide"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.ordering = tuple(getattr(view, "keyset_ordering", self.ordering))
+        self.page_size = self.get_page_size(request)
+
+        queryset = queryset.order_by(*self.ordering)
+
+        cursor = request.query_params.get(self.cursor_query_param)
+        if cursor:
+            try:
+                values = self.decode_position(queryset.model, decode_cursor(cursor))
+            except (TypeError, ValueError, KeyError, DjangoValidationError):
+                raise NotFound(self.invalid_cursor_message)
+            queryset = queryset.filter(self.after_position(values))
+
+        # Une ligne de plus pour savoir s'il existe une page suivante
+        rows = list(queryset[: self.page_size + 1])
+        self.has_next = len(rows) > self.page_size
+        self.page = rows[: self.page_size]
+        return self.page
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(page_size, self.max_page_size))
+
+    def get_paginated_response(self, data):
+        return Response(
+            OrderedDict(
+                [
+                    ("next_cursor", self.get_next_cursor()),
+                    ("next", self.get_next_link()),
+                    ("results", data),
+                ]
+            )
+        )
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "properties": {
+                "next_cursor": {"type": "string", "nullable": True},
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
+
+    @staticmethod
+    def field_name(ordering_field):
+        return ordering_field.lstrip("-")
+
+    def get_next_cursor(self):
+        if not self.has_next:
+            return None
+        last = self.page[-1]
+        payload = {}
+        for ordering_field in self.ordering:
+            name = self.field_name(ordering_field)
+            # Instances de modèle ou lignes values()
+            value = last[name] if isinstance(last, dict) else getattr(last, name)
+            payload[name] = value.isoformat() if hasattr(value, "isoformat") else value
+        return encode_cursor(payload)
+
+    def get_next_link(self):
+        cursor = self.get_next_cursor()
+        if cursor is None:
+            return None
+        url = remove_query_param(self.request.build_absolute_uri(), "page")
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    def decode_position(self, model, payload):
+        """Convertir les valeurs du curseur avec les champs du modèle"""
+        values = []
+        for ordering_field in self.ordering:
+            name = self.field_name(ordering_field)
+            field = model._meta.get_field(name)
+            value = field.to_python(payload[name])
+            if value is None:
+                raise ValueError(self.invalid_cursor_message)
+            values.append(value)
+        return values
+
+    def after_position(self, values):
+        """
+        Lignes strictement après la position, dans l'ordre de tri:
+        a >= x AND ((a > x) OR (a = x AND b > y) OR ...)
+
+        La borne redondante sur le premier champ permet à la base de
+        démarrer le parcours de l'index à la position au lieu de filtrer
+        toutes les lignes précédentes.
+        """
+        condition = Q()
+        equal = {}
+        for ordering_field, value in zip(self.ordering, values):
+            name = self.field_name(ordering_field)
+            lookup = "lt" if ordering_field.startswith("-") else "gt"
+            condition |= Q(**equal, **{f"{name}__{lookup}": value})
+            equal[name] = value
+
+        first = self.ordering[0]
+        bound = "lte" if first.startswith("-") else "gte"
+        return Q(**{f"{self.field_name(first)}__{bound}": values[0]}) & condition
+
+
+class OptionalKeysetPagination(PageNumberPagination):
+    """
+    Pagination par numéro de page par défaut; pagination keyset si la
+    requête contient ?cursor=... ou ?pagination=cursor.
+    """
+
+    keyset_class = KeysetPagination
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = None
+        if self.use_keyset(request):
+            self.keyset = self.keyset_class()
+            return self.keyset.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+    def use_keyset(self, request):
+        return (
+            self.keyset_class.cursor_query_param in request.query_params
+            or request.query_params.get("pagination") == "cursor"
+        )
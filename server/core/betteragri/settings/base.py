@@ -151,6 +151,11 @@ STATIC_ROOT = BASE_DIR / "staticfiles"
 MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / "mediafiles"
 
+# Graphe routier construit par "manage.py build_routing_graph"
+ROUTING_GRAPH_PATH = config(
+    "ROUTING_GRAPH_PATH", default=str(BASE_DIR / "data" / "routing_graph.npz")
+)
+
 # Default primary key field type
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
@@ -214,3 +219,38 @@ STRIPE_PUBLIC_KEY = config("STRIPE_PUBLIC_KEY", default="")
 
 # Frontend URL
 FRONTEND_URL = config("FRONTEND_URL", default="http://localhost:3000")
+
+# Celery: file de tâches dans Redis (services worker et beat)
+CELERY_BROKER_URL = config(
+    "CELERY_BROKER_URL", default=config("REDIS_URL", default="redis://localhost:6379/0")
+)
+CELERY_TASK_IGNORE_RESULT = True
+CELERY_TIMEZONE = TIME_ZONE
+
+# Celery beat: tâches périodiques
+CELERY_BEAT_SCHEDULE = {
+    "flush-buffered-counters": {
+        "task": "apps.marketplace.tasks.flush_buffered_counters",
+        "schedule": 60.0,
+    },
+    "compute-product-rankings": {
+        "task": "apps.marketplace.tasks.compute_product_rankings",
+        "schedule": 15 * 60.0,
+    },
+    "generate-missing-image-variants": {
+        "task": "apps.marketplace.tasks.generate_missing_image_variants",
+        "schedule": 60 * 60.0,
+    },
+    "rollup-product-prices": {
+        "task": "apps.marketplace.tasks.rollup_product_prices",
+        "schedule": 60 * 60.0,
+    },
+    "update-product-recommendations": {
+        "task": "apps.marketplace.tasks.update_product_recommendations",
+        "schedule": 60 * 60.0,
+    },
+    "send-wishlist-alerts": {
+        "task": "apps.marketplace.tasks.send_wishlist_alerts",
+        "schedule": 5 * 60.0,
+    },
+}